@@ -0,0 +1,186 @@
+"""Admission control with priority lanes in front of graph invocation.
+
+Under overload every turn would otherwise enter the graph and compete equally, so a
+booking being confirmed times out alongside casual searches. `AdmissionController` caps
+the turns running at once and queues the others in three lanes, served in order:
+
+1. `booking`: turns that book, confirm, cancel or change a reservation, or answer a
+   confirmation question;
+2. `interactive`: every other user turn, typically a new search;
+3. `batch`: turns of batch jobs.
+
+Load is shed early instead of letting queued turns time out: a turn is refused when the
+total queue depth has reached its lane's threshold (batch turns are refused first,
+bookings last), or when it waited longer than `max_wait_seconds`. Refused turns get the
+fast `BUSY_RESPONSE` without entering the graph. Admitted, queued and shed turns are
+counted per lane in the `admission` counter group.
+
+Example:
+    controller = AdmissionController(AdmissionLimits(max_concurrent=8))
+    async with controller.admit(classify_turn(messages)):
+        state = await graph.ainvoke(...)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Literal, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+from travel_master.metrics import get_counters
+from travel_master.utils import get_message_text
+
+Lane = Literal["booking", "interactive", "batch"]
+LANES: Tuple[Lane, ...] = ("booking", "interactive", "batch")
+
+BUSY_RESPONSE = "Sorry, we are very busy right now. Please try again in a moment."
+
+admission_counters = get_counters("admission")
+
+_BOOKING = re.compile(
+    r"\b(?:book|reserve|confirm|cancel|change|modify|reschedule|(?:FL|HT|CR)\d{6})\b",
+    re.IGNORECASE,
+)
+_CONFIRMATION_QUESTION = re.compile(
+    r"\b(?:confirm|reply yes|shall i book|should i book)\b", re.IGNORECASE
+)
+
+
+def classify_turn(messages: Sequence[AnyMessage]) -> Lane:
+    """Choose the lane of a user turn: booking work, or an interactive request."""
+    index = next(
+        (
+            i
+            for i in range(len(messages) - 1, -1, -1)
+            if isinstance(messages[i], HumanMessage)
+        ),
+        None,
+    )
+    if index is None:
+        return "interactive"
+    if _BOOKING.search(get_message_text(messages[index])):
+        return "booking"
+    # An answer to a confirmation question, e.g. "yes"
+    previous = next(
+        (m for m in reversed(messages[:index]) if isinstance(m, AIMessage)), None
+    )
+    if previous is not None and (
+        previous.response_metadata.get("direct_command", {}).get("status") == "pending"
+        or _CONFIRMATION_QUESTION.search(get_message_text(previous))
+    ):
+        return "booking"
+    return "interactive"
+
+
+class Overloaded(Exception):
+    """A turn was refused by admission control."""
+
+    def __init__(self, lane: Lane, reason: str) -> None:
+        """Record the lane of the refused turn and why it was refused."""
+        super().__init__(f"{lane} turn shed: {reason}")
+        self.lane = lane
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    """The limits of an `AdmissionController`."""
+
+    max_concurrent: int = 16
+    """Turns running in the graph at the same time."""
+    booking_max_queued: int = 64
+    """Total queue depth at which booking turns are shed."""
+    interactive_max_queued: int = 32
+    """Total queue depth at which interactive turns are shed."""
+    batch_max_queued: int = 8
+    """Total queue depth at which batch turns are shed."""
+    max_wait_seconds: float = 10.0
+    """How long a turn may wait in the queue before it is shed."""
+
+    def max_queued(self, lane: Lane) -> int:
+        """Get the queue depth threshold of a lane."""
+        return {
+            "booking": self.booking_max_queued,
+            "interactive": self.interactive_max_queued,
+            "batch": self.batch_max_queued,
+        }[lane]
+
+
+class AdmissionController:
+    """Admit turns into the graph by priority lane, queueing or shedding the excess.
+
+    A controller belongs to one event loop; each worker process has its own.
+    """
+
+    def __init__(self, limits: AdmissionLimits = AdmissionLimits()) -> None:
+        """Create a controller with the given limits."""
+        self.limits = limits
+        self.running = 0
+        self._queues: Dict[Lane, Deque[asyncio.Future[None]]] = {
+            lane: deque() for lane in LANES
+        }
+        self.counters = admission_counters
+
+    def queued(self) -> Dict[Lane, int]:
+        """Get the number of turns waiting in each lane."""
+        return {lane: len(queue) for lane, queue in self._queues.items()}
+
+    async def acquire(self, lane: Lane) -> None:
+        """Wait for a slot for a turn of a lane.
+
+        Raises:
+            Overloaded: When the queue is too deep for the lane or the wait too long.
+        """
+        if self.running < self.limits.max_concurrent:
+            self.running += 1
+            self.counters.incr(f"{lane}.admitted")
+            return
+        if sum(self.queued().values()) >= self.limits.max_queued(lane):
+            self.counters.incr(f"{lane}.shed")
+            raise Overloaded(lane, "queue full")
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._queues[lane].append(waiter)
+        self.counters.incr(f"{lane}.queued")
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.limits.max_wait_seconds)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # The slot was handed over just as the wait ended; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._queues[lane].remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.counters.incr(f"{lane}.shed")
+            raise Overloaded(lane, "waited too long") from None
+        finally:
+            self.counters.incr(f"{lane}.wait_seconds", time.perf_counter() - started)
+        self.counters.incr(f"{lane}.admitted")
+
+    def release(self) -> None:
+        """Free a slot, handing it to the first turn of the highest priority lane waiting."""
+        for lane in LANES:
+            queue = self._queues[lane]
+            if queue:
+                # The running count is unchanged: the slot goes to the waiter
+                queue.popleft().set_result(None)
+                return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def admit(self, lane: Lane) -> AsyncIterator[None]:
+        """Hold a slot for the duration of a turn."""
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,315 @@
+"""A write-behind, append-only audit log of booking operations.
+
+With `enable_audit_log`, every run of a `book_*`, `cancel_*` or `change_*` tool (by the
+assistants or as a direct command) is recorded: when, by which conversation, the
+arguments, the result and the confirmation number it concerns. Writing each record
+synchronously would put a disk write on the booking path, so `AuditLog.record` only
+queues the record in memory. A background thread writes whatever is queued as one batch
+with a single fsync (group commit), so a burst of bookings costs one sync.
+
+Records are JSON lines in segment files under `audit_log_dir`. Every process writes its
+own segments, `audit-<pid>-00000001.jsonl`, ..., so the worker processes of a pool can
+share the directory; a new segment is started when the current one exceeds
+`audit_log_segment_bytes`. Segments are never rewritten. A failed write or sync is
+counted, logged and retried with backoff, so records are not lost to a transient disk
+error. `AuditLog.flush` waits until every record queued so far is on disk, and open logs
+are flushed and closed on interpreter exit and when a worker process of the pool stops
+(`close_audit_logs`). `AuditReader` looks records up by confirmation number through an
+index of line offsets that it extends incrementally as segments grow.
+
+Example:
+    log = open_audit_log("audit")
+    log.record("cancel_flight", {"confirmation_number": "FL123456"}, {"status": "success"})
+    log.flush()
+    AuditReader("audit").lookup("FL123456")
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Any, Deque, Dict, List, Mapping, Tuple
+
+from travel_master.metrics import get_counters
+
+logger = logging.getLogger(__name__)
+
+AUDITED_PREFIXES = ("book_", "cancel_", "change_")
+
+# Delay before retrying a failed write, doubled on each further failure up to the maximum
+RETRY_SECONDS = 0.1
+MAX_RETRY_SECONDS = 5.0
+# Attempts at writing the queued records once the log is closing, before dropping them
+CLOSE_ATTEMPTS = 3
+
+audit_counters = get_counters("audit_log")
+
+_SEGMENT = re.compile(r"^audit-(\w+)-(\d{8})\.jsonl$")
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str)
+
+_logs: Dict[str, AuditLog] = {}
+_logs_lock = threading.Lock()
+
+
+def is_audited(tool_name: str) -> bool:
+    """Check whether runs of a tool are recorded in the audit log."""
+    return tool_name.startswith(AUDITED_PREFIXES)
+
+
+def segment_paths(directory: str, writer: str | None = None) -> List[str]:
+    """Get the segment files of an audit log, or of one of its writers; oldest first per writer."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(
+        name
+        for name in os.listdir(directory)
+        if (match := _SEGMENT.match(name)) and writer in (None, match.group(1))
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+class AuditLog:
+    """An append-only log whose records are written to disk in batches by a background thread."""
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        writer: str | None = None,
+    ) -> None:
+        """Open the log in a directory and start the writer.
+
+        Args:
+            directory: The directory of the segment files.
+            segment_max_bytes: The size beyond which a new segment is started.
+            writer: The name of this writer's segments (word characters only); defaults to
+                the process ID. A log reopened under the same name appends to its latest
+                segment.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.writer = writer or str(os.getpid())
+        self.counters = audit_counters
+        segments = segment_paths(directory, self.writer)
+        match = _SEGMENT.match(os.path.basename(segments[-1])) if segments else None
+        self._sequence = int(match.group(2)) if match else 1
+        self._file = self._open_segment()
+        self._queue: Deque[bytes] = deque()
+        self._condition = threading.Condition()
+        # Records queued and records on disk, to tell when a flush is done
+        self._queued = 0
+        self._written = 0
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._write_loop, daemon=True, name="audit-log-writer"
+        )
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _open_segment(self) -> Any:
+        # Unbuffered, so a failed write can be undone by truncating the file
+        path = os.path.join(
+            self.directory, f"audit-{self.writer}-{self._sequence:08d}.jsonl"
+        )
+        return open(path, "ab", buffering=0)
+
+    def append(self, record: Mapping[str, Any]) -> None:
+        """Queue a record for writing; returns at once."""
+        line = (_encoder.encode(record) + "\n").encode("utf-8")
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("audit log is closed")
+            self._queue.append(line)
+            self._queued += 1
+            self._condition.notify_all()
+        self.counters.incr("queued")
+
+    def record(
+        self,
+        operation: str,
+        args: Mapping[str, Any],
+        result: Mapping[str, Any],
+        *,
+        thread_id: str | None = None,
+    ) -> None:
+        """Queue the record of a booking operation.
+
+        Args:
+            operation: The tool that ran, e.g. "book_hotel".
+            args: The arguments of the call.
+            result: The tool's result payload.
+            thread_id: The conversation the operation belongs to.
+        """
+        self.append(
+            {
+                "at": time.time(),
+                "thread_id": thread_id,
+                "operation": operation,
+                "confirmation_number": result.get("confirmation_number")
+                or args.get("confirmation_number"),
+                "status": result.get("status", "error"),
+                "args": dict(args),
+                "result": dict(result),
+            }
+        )
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every record queued so far is on disk; False on timeout."""
+        with self._condition:
+            target = self._queued
+            return self._condition.wait_for(
+                lambda: self._written >= target or not self._writer.is_alive(), timeout
+            )
+
+    def close(self) -> None:
+        """Write the queued records, then stop the writer and close the segment."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+        self._file.close()
+        atexit.unregister(self.close)
+
+    def _write_loop(self) -> None:
+        failures = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._closed)
+                if not self._queue and self._closed:
+                    return
+                batch = list(self._queue)
+                self._queue.clear()
+                closing = self._closed
+            # Records queued while this batch is synced go in the next one
+            try:
+                self._write(b"".join(batch))
+            except Exception:
+                failures += 1
+                self.counters.incr("write_errors")
+                logger.exception(
+                    "Writing %s audit records failed (attempt %s)", len(batch), failures
+                )
+                if not closing or failures < CLOSE_ATTEMPTS:
+                    with self._condition:
+                        self._queue.extendleft(reversed(batch))
+                    time.sleep(
+                        min(RETRY_SECONDS * 2 ** (failures - 1), MAX_RETRY_SECONDS)
+                    )
+                    continue
+                logger.error("Dropping %s audit records on close", len(batch))
+                self.counters.incr("dropped", len(batch))
+            else:
+                failures = 0
+                self.counters.incr("written", len(batch))
+                self.counters.incr("syncs")
+                if self._file.tell() >= self.segment_max_bytes:
+                    self._rotate()
+            with self._condition:
+                self._written += len(batch)
+                self._condition.notify_all()
+
+    def _write(self, data: bytes) -> None:
+        position = self._file.seek(0, os.SEEK_END)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view) :]
+            os.fsync(self._file.fileno())
+        except BaseException:
+            # Leave no partial record behind; the whole batch is written again
+            with suppress(OSError):
+                self._file.truncate(position)
+            raise
+
+    def _rotate(self) -> None:
+        self._sequence += 1
+        try:
+            segment = self._open_segment()
+        except OSError:
+            # Keep appending to the current segment; rotation is tried again after the next batch
+            logger.exception("Starting a new audit log segment failed")
+            self._sequence -= 1
+            return
+        self._file.close()
+        self._file = segment
+        self.counters.incr("rotations")
+
+
+class AuditReader:
+    """Look up audit records by confirmation number.
+
+    The index maps each confirmation number to the segments and offsets of its records.
+    It is built on first use and extended with whatever was appended since on each lookup.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Create a reader for the log in a directory."""
+        self.directory = directory
+        self._index: Dict[str, List[Tuple[str, int]]] = {}
+        # How far each segment has been indexed, in bytes
+        self._indexed: Dict[str, int] = {}
+
+    def refresh(self) -> int:
+        """Index the records appended since the last refresh and return how many there were."""
+        added = 0
+        for path in segment_paths(self.directory):
+            offset = self._indexed.get(path, 0)
+            if os.path.getsize(path) <= offset:
+                continue
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Still being written; indexed on a later refresh
+                        break
+                    number = json.loads(line).get("confirmation_number")
+                    if number:
+                        self._index.setdefault(number, []).append((path, offset))
+                    offset += len(line)
+                    added += 1
+            self._indexed[path] = offset
+        return added
+
+    def lookup(self, confirmation_number: str) -> List[Dict[str, Any]]:
+        """Get the records of a confirmation number, oldest first."""
+        self.refresh()
+        records = []
+        for path, offset in self._index.get(confirmation_number, []):
+            with open(path, "rb") as f:
+                f.seek(offset)
+                records.append(json.loads(f.readline()))
+        # The records of several writers interleave in time
+        return sorted(records, key=lambda record: record["at"])
+
+
+def open_audit_log(
+    directory: str, segment_max_bytes: int = 16 * 1024 * 1024
+) -> AuditLog:
+    """Get the audit log in a directory, shared by every booking of this process."""
+    with _logs_lock:
+        log = _logs.get(directory)
+        if log is None:
+            log = _logs[directory] = AuditLog(
+                directory, segment_max_bytes=segment_max_bytes
+            )
+        return log
+
+
+def close_audit_logs() -> None:
+    """Flush and close the audit logs opened with `open_audit_log`."""
+    with _logs_lock:
+        logs = list(_logs.values())
+        _logs.clear()
+    for log in logs:
+        log.close()
@@ -0,0 +1,346 @@
+"""Run batches of trip requests through the Travel Master.
+
+The input is a CSV or JSONL file with one trip request per row: an `id` (defaults to the
+row number) and either a `message` or, in JSONL, a list of user `messages` replayed as
+consecutive turns of one conversation. Rows are streamed from the file and run with
+bounded asyncio concurrency in a single process, so all conversations share the search
+cache, the response cache and the loaded chat models.
+
+Given a `WorkerPool`, the turns are submitted to the pool instead, in the "batch"
+admission lane: interactive conversations on the same workers go first, and a turn the
+pool sheds as busy is retried with backoff.
+
+Results are appended to a JSONL file as each conversation finishes, with per-item timing.
+The results file doubles as the checkpoint: rerunning the same command skips every id
+that already has a successful result, so an interrupted batch resumes where it stopped
+and the items that failed are tried again.
+
+Usage:
+    travel-master-batch requests.csv results.jsonl --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Set, TextIO
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.pregel import Pregel
+
+from travel_master.admission import AdmissionLimits
+from travel_master.itinerary import Itinerary
+from travel_master.metrics import get_counters
+from travel_master.profiling import profiled
+from travel_master.utils import get_message_text
+from travel_master.worker_pool import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+# Retries of a turn the worker pool sheds as busy, the first after BUSY_RETRY_SECONDS and
+# each further one after twice as long, up to MAX_BUSY_RETRY_SECONDS
+BUSY_RETRIES = 8
+BUSY_RETRY_SECONDS = 1.0
+MAX_BUSY_RETRY_SECONDS = 30.0
+
+batch_counters = get_counters("batch")
+
+
+@dataclass
+class BatchItem:
+    """One trip request of a batch."""
+
+    id: str
+    messages: List[str]
+    thread_id: str | None = None
+
+
+@dataclass
+class BatchResult:
+    """The outcome of one batch item, written as one JSONL line."""
+
+    id: str
+    status: str
+    response: str | None = None
+    itinerary: Itinerary = field(default_factory=dict)
+    error: str | None = None
+    turns: int = 0
+    started_at: float = 0.0
+    duration_seconds: float = 0.0
+    turn_seconds: List[float] = field(default_factory=list)
+
+
+def _item_from_row(row: Dict[str, Any], index: int) -> BatchItem:
+    messages = row.get("messages")
+    if isinstance(messages, str):
+        messages = [messages]
+    if not messages:
+        messages = [row.get("message") or row.get("request") or ""]
+    return BatchItem(
+        id=str(row.get("id") or index),
+        messages=[str(m) for m in messages if str(m).strip()],
+        thread_id=row.get("thread_id") or None,
+    )
+
+
+def read_items(path: str) -> Iterator[BatchItem]:
+    """Stream the items of a CSV or JSONL batch file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for index, row in enumerate(csv.DictReader(f), start=1):
+                yield _item_from_row(row, index)
+            return
+        for index, line in enumerate(f, start=1):
+            if line.strip():
+                yield _item_from_row(json.loads(line), index)
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Get the ids that already have a successful result in a results file."""
+    if not os.path.exists(path):
+        return set()
+    done: Set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record["status"] == "ok":
+                    done.add(str(record["id"]))
+            except (ValueError, KeyError, TypeError):
+                # A line cut short by an interruption; the item is simply run again
+                continue
+    return done
+
+
+async def run_item(
+    graph: Pregel[Any, Any, Any, Any],
+    item: BatchItem,
+    configurable: Dict[str, Any],
+    turn_timeout: float | None = None,
+) -> BatchResult:
+    """Replay the turns of one item as a conversation and collect the outcome."""
+    result = BatchResult(id=item.id, status="ok", started_at=time.time())
+    started = time.perf_counter()
+    state: Dict[str, Any] = {"messages": [], "itinerary": {}}
+    try:
+        if not item.messages:
+            raise ValueError("the item has no user message")
+        for text in item.messages:
+            turn_configurable = {**configurable, "thread_id": item.thread_id or item.id}
+            if turn_timeout is not None:
+                turn_configurable["turn_deadline"] = time.time() + turn_timeout
+            turn_started = time.perf_counter()
+            config: RunnableConfig = {"configurable": turn_configurable}
+            state = await profiled(graph, config).ainvoke(
+                {
+                    "messages": [*state["messages"], HumanMessage(content=text)],
+                    "itinerary": state.get("itinerary", {}),
+                },
+                config,
+            )
+            result.turn_seconds.append(round(time.perf_counter() - turn_started, 3))
+            result.turns += 1
+        final = next(
+            (m for m in reversed(state["messages"]) if isinstance(m, AIMessage)), None
+        )
+        result.response = get_message_text(final) if final else None
+        result.itinerary = state.get("itinerary") or {}
+        batch_counters.incr("succeeded")
+    except Exception as e:
+        logger.exception("Batch item %s failed", item.id)
+        result.status = "error"
+        result.error = repr(e)
+        batch_counters.incr("failed")
+    result.duration_seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+async def _submit_batch_turn(
+    pool: WorkerPool,
+    thread_id: str,
+    text: str,
+    configurable: Dict[str, Any],
+    turn_timeout: float | None,
+) -> Dict[str, Any]:
+    for attempt in range(BUSY_RETRIES + 1):
+        if attempt:
+            batch_counters.incr("busy_retries")
+            await asyncio.sleep(
+                min(BUSY_RETRY_SECONDS * 2 ** (attempt - 1), MAX_BUSY_RETRY_SECONDS)
+            )
+        turn_configurable = dict(configurable)
+        if turn_timeout is not None:
+            turn_configurable["turn_deadline"] = time.time() + turn_timeout
+        reply = await pool.submit(thread_id, text, turn_configurable, lane="batch")
+        if reply["status"] != "busy":
+            break
+    return reply
+
+
+async def run_pool_item(
+    pool: WorkerPool,
+    item: BatchItem,
+    configurable: Dict[str, Any],
+    turn_timeout: float | None = None,
+) -> BatchResult:
+    """Replay the turns of one item on a worker pool, in its batch lane, and collect the outcome."""
+    result = BatchResult(id=item.id, status="ok", started_at=time.time())
+    started = time.perf_counter()
+    try:
+        if not item.messages:
+            raise ValueError("the item has no user message")
+        for text in item.messages:
+            turn_started = time.perf_counter()
+            reply = await _submit_batch_turn(
+                pool, item.thread_id or item.id, text, configurable, turn_timeout
+            )
+            if reply["status"] != "ok":
+                raise RuntimeError(reply.get("error") or f"turn {reply['status']}")
+            result.turn_seconds.append(round(time.perf_counter() - turn_started, 3))
+            result.turns += 1
+            result.response = reply["response"]
+            result.itinerary = reply["itinerary"]
+        batch_counters.incr("succeeded")
+    except Exception as e:
+        logger.exception("Batch item %s failed", item.id)
+        result.status = "error"
+        result.error = repr(e)
+        batch_counters.incr("failed")
+    result.duration_seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _write(out: TextIO, result: BatchResult) -> None:
+    out.write(json.dumps(result.__dict__, ensure_ascii=False, default=str) + "\n")
+    out.flush()
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    *,
+    graph: Pregel[Any, Any, Any, Any] | None = None,
+    pool: WorkerPool | None = None,
+    concurrency: int = 4,
+    configurable: Dict[str, Any] | None = None,
+    turn_timeout: float | None = None,
+) -> Dict[str, int]:
+    """Run every pending item of a batch file and append the results.
+
+    Items are read lazily into a queue bounded by the concurrency, so memory use does
+    not grow with the size of the input file. With a `pool`, the turns run on the
+    worker pool in its batch admission lane rather than on `graph` in this process.
+
+    Returns:
+        Dict[str, int]: The number of items run, succeeded, failed and skipped (those
+            of the input that already had a successful result).
+    """
+    run: Callable[..., Awaitable[BatchResult]]
+    if pool is not None:
+        run = partial(run_pool_item, pool)
+    else:
+        if graph is None:
+            from travel_master.travel_master import graph as default_graph
+
+            graph = default_graph
+        run = partial(run_item, graph)
+    done = completed_ids(output_path)
+    configurable = configurable or {}
+    queue: asyncio.Queue[BatchItem | None] = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"run": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        if out.tell() and not _ends_with_newline(output_path):
+            # Terminate a line cut short by an interruption before appending
+            out.write("\n")
+
+        async def worker() -> None:
+            while (item := await queue.get()) is not None:
+                result = await run(item, configurable, turn_timeout)
+                _write(out, result)
+                counts["run"] += 1
+                counts["succeeded" if result.status == "ok" else "failed"] += 1
+                if counts["run"] % 50 == 0:
+                    logger.info("Batch progress: %s", counts)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for item in read_items(input_path):
+                if item.id in done:
+                    counts["skipped"] += 1
+                    continue
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+    return counts
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Run a batch file from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Run a batch of trip requests through the Travel Master."
+    )
+    parser.add_argument("input", help="CSV or JSONL file of trip requests")
+    parser.add_argument(
+        "output",
+        help="JSONL file the results are appended to (also the resume checkpoint)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="conversations run at the same time"
+    )
+    parser.add_argument(
+        "--turn-timeout", type=float, default=None, help="seconds allowed per turn"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="run the turns on a pool of this many worker processes, in its batch "
+        "admission lane, instead of in this process",
+    )
+    parser.add_argument(
+        "--config",
+        default="{}",
+        help="JSON object of Configuration overrides, e.g. '{\"enable_model_tiering\": true}'",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+
+    async def run() -> Dict[str, int]:
+        options: Dict[str, Any] = {
+            "concurrency": args.concurrency,
+            "configurable": json.loads(args.config),
+            "turn_timeout": args.turn_timeout,
+        }
+        if not args.workers:
+            return await run_batch(args.input, args.output, **options)
+        async with WorkerPool(args.workers, admission=AdmissionLimits()) as pool:
+            return await run_batch(args.input, args.output, pool=pool, **options)
+
+    counts = asyncio.run(run())
+    logger.info("Batch finished: %s", counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,32 @@
 Works with a chat model with tool calling support.
 """
 
-from typing import Dict, List, cast
+from typing import Any, Dict, List, cast
 
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
-from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.prebuilt import tools_condition
+from langgraph.pregel import Pregel
 
+from travel_master.car_rental_assistant.car_rental_assistant_tools import (
+    CAR_RENTAL_ASSISTANT_TOOLS,
+)
 from travel_master.configuration import Configuration
-from travel_master.car_rental_assistant.car_rental_assistant_tools import CAR_RENTAL_ASSISTANT_TOOLS
+from travel_master.history import compact_history, scope_history
+from travel_master.itinerary import render_itinerary
+from travel_master.loop_guard import loop_counters, step_limit
+from travel_master.model_tiering import TieredChatModel
 from travel_master.state import InputState, State
-from travel_master.utils import load_chat_model
+from travel_master.tool_node import TravelToolNode, route_after_tools
+
+# Initialize the model with tool binding; the concrete model is chosen per call
+model = TieredChatModel(role="sub_assistant").bind_tools(CAR_RENTAL_ASSISTANT_TOOLS)
+# The last call of a turn must answer; the tools stay declared for the tool calls in history
+answer_model = TieredChatModel(role="sub_assistant").bind_tools(
+    CAR_RENTAL_ASSISTANT_TOOLS, tool_choice="none"
+)
+TOOL_NAMES = frozenset(tool.__name__ for tool in CAR_RENTAL_ASSISTANT_TOOLS)
 
 
 async def car_rental_assistant(
@@ -32,24 +47,43 @@ async def car_rental_assistant(
     """
     configuration = Configuration.from_runnable_config(config)
 
-    # Initialize the model with tool binding
-    model = load_chat_model(configuration.sub_assistant_model).bind_tools(CAR_RENTAL_ASSISTANT_TOOLS)
-
     # Format the system prompt
     system_message = configuration.car_rental_assistant_system_prompt.format(
         system_time=configuration.get_current_time()
     )
+    itinerary = render_itinerary(state.itinerary)
+    if itinerary:
+        system_message += f"\n\n## Known Trip Details:\n{itinerary}"
+
+    # Earlier turns' tool traffic is summarized by the itinerary
+    messages = state.messages
+    if configuration.compact_assistant_history:
+        messages = compact_history(messages)
+    # Other domains' answers and the handoffs are left out of the prompt, not the state
+    if configuration.scope_assistant_history:
+        messages, context = scope_history(messages, "car_rental_assistant", TOOL_NAMES)
+        if context:
+            system_message += f"\n\n## Other Assistants:\n{context}"
+
+    # Whether this call has to answer without tools: step budget used up or deadline close
+    limit = step_limit(
+        state.messages,
+        TOOL_NAMES,
+        configuration.car_rental_assistant_max_steps,
+        configuration,
+    )
 
     # Get the model's response
     response = cast(
         AIMessage,
-        await model.ainvoke(
-            [{"role": "system", "content": system_message}, *state.messages], config
+        await (answer_model if limit else model).ainvoke(
+            [{"role": "system", "content": system_message}, *messages], config
         ),
     )
 
     # Handle the case when it's the last step and the model still wants to use a tool
-    if state.is_last_step and response.tool_calls:
+    if (state.is_last_step or limit) and response.tool_calls:
+        loop_counters.incr(f"{limit or 'recursion'}_aborts")
         return {
             "messages": [
                 AIMessage(
@@ -68,7 +102,7 @@ builder = StateGraph(State, input=InputState, config_schema=Configuration)
 
 # Define the nodes
 builder.add_node(car_rental_assistant)
-builder.add_node("tools", ToolNode(CAR_RENTAL_ASSISTANT_TOOLS))
+builder.add_node("tools", TravelToolNode(CAR_RENTAL_ASSISTANT_TOOLS))
 
 # Set the entrypoint
 builder.add_edge("__start__", "car_rental_assistant")
@@ -79,14 +113,25 @@ builder.add_conditional_edges(
     tools_condition,
 )
 
-# Add edge from tools back to car_rental_assistant
-builder.add_edge("tools", "car_rental_assistant")
-
-# Compile the graph with recursion limit
-graph = builder.compile(
-    interrupt_before=[],
-    interrupt_after=[],
+# Add edge from tools back to car_rental_assistant, unless the tool node answered directly
+builder.add_conditional_edges(
+    "tools",
+    route_after_tools,
+    {"assistant": "car_rental_assistant", "__end__": "__end__"},
 )
-# Set recursion limit
-graph = graph.with_config({"recursion_limit": 10})
-graph.name = "car_rental_assistant" 
\ No newline at end of file
+
+
+def compile_graph(checkpoint_steps: bool = True) -> Pregel[Any, Any, Any, Any]:
+    """Compile the graph; without `checkpoint_steps`, it is only checkpointed as a whole, on exit."""
+    compiled = builder.compile(
+        checkpointer=None if checkpoint_steps else False,
+        interrupt_before=[],
+        interrupt_after=[],
+    )
+    # Set recursion limit
+    compiled = compiled.with_config({"recursion_limit": 10})
+    compiled.name = "car_rental_assistant"
+    return compiled
+
+
+graph = compile_graph()
@@ -0,0 +1,517 @@
+"""A tiered checkpointer: a sharded in-memory hot tier that spills idle threads to disk.
+
+A single `InMemorySaver` holding thousands of threads is one lock and one ever-growing
+heap, while a disk saver pays I/O on every step. `TieredCheckpointSaver` keeps each
+active thread in its own `InMemorySaver`, spread over shards by thread ID. Each shard has
+its own lock and keeps its threads in least recently used order.
+
+A background thread spills threads to a local SQLite file when they have been idle for
+`idle_seconds`, or when a shard holds more than its share of `max_hot_threads` (least
+recently used first). Spilled threads are rehydrated on their next access. Steps of
+active threads therefore only touch memory, and memory stays bounded by the number of
+hot threads. A thread being written to disk stays readable, and is taken back if it is
+accessed before the write completes.
+
+How often a turn is checkpointed is set independently of the saver, with the durability
+of `travel_master.travel_master.compile_graph`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    DeltaChannelHistory,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+from travel_master.metrics import get_counters
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    spilled_at REAL NOT NULL
+)
+"""
+
+# The storage of one thread's saver: checkpoints, pending writes and channel blobs
+_ThreadData = Tuple[Dict[str, Dict[str, Any]], Dict[Any, Any], Dict[Any, Any]]
+
+
+class _Shard:
+    """The hot threads whose IDs hash to one shard, in least recently used order."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.threads: OrderedDict[str, InMemorySaver] = OrderedDict()
+        self.last_used: Dict[str, float] = {}
+        # Threads being written to disk; still served, and taken back when accessed
+        self.spilling: Dict[str, InMemorySaver] = {}
+
+
+def _export(saver: InMemorySaver, thread_id: str) -> _ThreadData:
+    # Stored values are immutable serialized tuples, so copying the containers is enough
+    return (
+        {
+            ns: dict(checkpoints)
+            for ns, checkpoints in saver.storage.get(thread_id, {}).items()
+        },
+        {key: dict(writes) for key, writes in saver.writes.items()},
+        dict(saver.blobs),
+    )
+
+
+def saver_bytes(saver: InMemorySaver) -> int:
+    """Sum the serialized checkpoints, writes and blobs an in-memory saver holds."""
+    total = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            total += sum(
+                len(checkpoint[1]) + len(metadata[1])
+                for checkpoint, metadata, _ in checkpoints.values()
+            )
+    for writes in saver.writes.values():
+        total += sum(len(write[2][1]) for write in writes.values())
+    return total + sum(len(blob[1]) for blob in saver.blobs.values())
+
+
+class TieredCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpoints in sharded memory for active threads, on disk for idle ones."""
+
+    def __init__(
+        self,
+        path: str = "checkpoints.sqlite",
+        *,
+        shards: int = 16,
+        max_hot_threads: int = 1024,
+        idle_seconds: float = 300.0,
+        spill_interval_seconds: float = 5.0,
+        serde: SerializerProtocol | None = None,
+    ) -> None:
+        """Open (or create) the disk tier at `path` and start the spill thread."""
+        super().__init__(serde=serde)
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.spill_interval_seconds = spill_interval_seconds
+        self.counters = get_counters("checkpointer")
+        self._shards = [_Shard() for _ in range(shards)]
+        self._max_per_shard = max(1, max_hot_threads // shards)
+        self._conn = sqlite3.connect(
+            path, timeout=10.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._disk_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._spiller = threading.Thread(
+            target=self._spill_loop, daemon=True, name="checkpoint-spill"
+        )
+        self._spiller.start()
+
+    # Tiers
+
+    def _shard(self, thread_id: str) -> _Shard:
+        return self._shards[zlib.crc32(thread_id.encode()) % len(self._shards)]
+
+    def _hot(self, shard: _Shard, thread_id: str) -> InMemorySaver | None:
+        """Get a hot thread's saver and mark it used; the caller holds the shard lock."""
+        saver = shard.threads.get(thread_id)
+        if saver is None:
+            saver = shard.spilling.pop(thread_id, None)
+            if saver is None:
+                return None
+            shard.threads[thread_id] = saver
+            self.counters.incr("spills_reclaimed")
+        shard.threads.move_to_end(thread_id)
+        shard.last_used[thread_id] = time.monotonic()
+        return saver
+
+    def _rehydrate(
+        self, shard: _Shard, thread_id: str, data: _ThreadData | None, create: bool
+    ) -> InMemorySaver | None:
+        """Make a thread hot from its disk copy (or empty); the caller holds the shard lock."""
+        if data is None and not create:
+            return None
+        saver = self._load(thread_id, data)
+        if data is not None:
+            self.counters.incr("rehydrated")
+        shard.threads[thread_id] = saver
+        shard.last_used[thread_id] = time.monotonic()
+        if len(shard.threads) > self._max_per_shard:
+            self._wake.set()
+        return saver
+
+    def _load(self, thread_id: str, data: _ThreadData | None) -> InMemorySaver:
+        """Build a saver holding a thread's disk copy (or nothing)."""
+        saver = InMemorySaver(serde=self.serde)
+        if data is not None:
+            storage, writes, blobs = data
+            for ns, checkpoints in storage.items():
+                saver.storage[thread_id][ns].update(checkpoints)
+            saver.writes.update(writes)
+            saver.blobs.update(blobs)
+        return saver
+
+    def _read(self, thread_id: str) -> _ThreadData | None:
+        with self._disk_lock:
+            row = self._conn.execute(
+                "SELECT data FROM threads WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def _with_thread(
+        self, thread_id: Any, fn: Callable[[InMemorySaver], T], create: bool = False
+    ) -> T | None:
+        """Run `fn` on a thread's saver under its shard lock, rehydrating it if needed."""
+        thread_id = str(thread_id)
+        shard = self._shard(thread_id)
+        with shard.lock:
+            saver = self._hot(shard, thread_id)
+            if saver is not None:
+                return fn(saver)
+        data = self._read(thread_id)
+        return self._cold(shard, thread_id, data, fn, create)
+
+    async def _awith_thread(
+        self, thread_id: Any, fn: Callable[[InMemorySaver], T], create: bool = False
+    ) -> T | None:
+        """Like `_with_thread`, reading the disk tier off the event loop."""
+        thread_id = str(thread_id)
+        shard = self._shard(thread_id)
+        with shard.lock:
+            saver = self._hot(shard, thread_id)
+            if saver is not None:
+                return fn(saver)
+        data = await asyncio.to_thread(self._read, thread_id)
+        return self._cold(shard, thread_id, data, fn, create)
+
+    def _cold(
+        self,
+        shard: _Shard,
+        thread_id: str,
+        data: _ThreadData | None,
+        fn: Callable[[InMemorySaver], T],
+        create: bool,
+    ) -> T | None:
+        with shard.lock:
+            # Another caller may have made the thread hot while the disk was read
+            saver = self._hot(shard, thread_id) or self._rehydrate(
+                shard, thread_id, data, create
+            )
+            return fn(saver) if saver is not None else None
+
+    # Spilling
+
+    def _spill_loop(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.spill_interval_seconds)
+            self._wake.clear()
+            if self._closed.is_set():
+                break
+            try:
+                self.spill()
+            except Exception:
+                logger.exception("Spilling idle checkpoint threads failed")
+
+    def spill(self, idle_seconds: float | None = None) -> int:
+        """Spill the threads that are idle or over their shard's share; returns how many."""
+        idle = self.idle_seconds if idle_seconds is None else idle_seconds
+        spilled = 0
+        for shard in self._shards:
+            while True:
+                with shard.lock:
+                    thread_id = next(iter(shard.threads), None)
+                    if thread_id is None:
+                        break
+                    over = len(shard.threads) > self._max_per_shard
+                    if (
+                        not over
+                        and time.monotonic() - shard.last_used[thread_id] < idle
+                    ):
+                        break
+                    saver = shard.threads.pop(thread_id)
+                    del shard.last_used[thread_id]
+                    shard.spilling[thread_id] = saver
+                    data = _export(saver, thread_id)
+                self._spill_one(shard, thread_id, saver, data)
+                spilled += 1
+        return spilled
+
+    def _spill_one(
+        self, shard: _Shard, thread_id: str, saver: InMemorySaver, data: _ThreadData
+    ) -> None:
+        try:
+            payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._disk_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO threads (thread_id, data, spilled_at) VALUES (?, ?, ?)",
+                    (thread_id, payload, time.time()),
+                )
+        except Exception:
+            with shard.lock:
+                if shard.spilling.pop(thread_id, None) is saver:
+                    shard.threads[thread_id] = saver
+                    shard.last_used[thread_id] = time.monotonic()
+            raise
+        with shard.lock:
+            # Unless it was accessed meanwhile, the thread now only lives on disk
+            if shard.spilling.get(thread_id) is saver:
+                del shard.spilling[thread_id]
+            else:
+                # Taken back (it moves on in memory) or deleted while being written: the
+                # copy just written is stale, and must not be rehydrated after a restart.
+                # Deleted under the shard lock, so a later spill of the thread is kept
+                with self._disk_lock:
+                    self._conn.execute(
+                        "DELETE FROM threads WHERE thread_id = ?", (thread_id,)
+                    )
+                return
+        self.counters.incr("spilled")
+        self.counters.incr("spilled_bytes", len(payload))
+
+    def hot_threads(self) -> int:
+        """Count the threads held in memory."""
+        return sum(len(shard.threads) + len(shard.spilling) for shard in self._shards)
+
+    def memory_bytes(self) -> int:
+        """Sum the serialized checkpoint data held in memory (walks every hot thread)."""
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                savers = [*shard.threads.values(), *shard.spilling.values()]
+                total += sum(saver_bytes(saver) for saver in savers)
+        return total
+
+    def close(self) -> None:
+        """Stop the spill thread and close the disk tier; hot threads are not written."""
+        self._closed.set()
+        self._wake.set()
+        self._spiller.join()
+        with self._disk_lock:
+            self._conn.close()
+
+    # BaseCheckpointSaver
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Get a checkpoint tuple, rehydrating the thread if it was spilled."""
+        return self._with_thread(
+            config["configurable"]["thread_id"], lambda s: s.get_tuple(config)
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Get a checkpoint tuple, rehydrating the thread if it was spilled."""
+        return await self._awith_thread(
+            config["configurable"]["thread_id"], lambda s: s.get_tuple(config)
+        )
+
+    def _list_all(
+        self,
+        filter: Dict[str, Any] | None,
+        before: RunnableConfig | None,
+        limit: int | None,
+    ) -> List[CheckpointTuple]:
+        # Spilled threads are read into a throw-away saver, without making them hot again
+        found: List[CheckpointTuple] = []
+        with self._disk_lock:
+            spilled = [
+                row[0] for row in self._conn.execute("SELECT thread_id FROM threads")
+            ]
+        hot = [
+            thread_id
+            for shard in self._shards
+            for thread_id in (*shard.threads, *shard.spilling)
+        ]
+        for thread_id in dict.fromkeys([*hot, *spilled]):
+            config: RunnableConfig = {"configurable": {"thread_id": thread_id}}
+            shard = self._shard(thread_id)
+            with shard.lock:
+                saver = shard.threads.get(thread_id) or shard.spilling.get(thread_id)
+                items = (
+                    list(saver.list(config, filter=filter, before=before, limit=limit))
+                    if saver
+                    else None
+                )
+            if items is None:
+                data = self._read(thread_id)
+                if data is None:
+                    continue
+                items = list(
+                    self._load(thread_id, data).list(
+                        config, filter=filter, before=before, limit=limit
+                    )
+                )
+            found.extend(items)
+            if limit is not None and len(found) >= limit:
+                return found[:limit]
+        return found
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints of one thread, or of every thread when no config is given."""
+        if config is None:
+            yield from self._list_all(filter, before, limit)
+            return
+        items = self._with_thread(
+            config["configurable"]["thread_id"],
+            lambda s: list(s.list(config, filter=filter, before=before, limit=limit)),
+        )
+        yield from items or []
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """List checkpoints of one thread, or of every thread when no config is given."""
+        items: List[CheckpointTuple] | None
+        if config is None:
+            items = await asyncio.to_thread(self._list_all, filter, before, limit)
+        else:
+            items = await self._awith_thread(
+                config["configurable"]["thread_id"],
+                lambda s: list(
+                    s.list(config, filter=filter, before=before, limit=limit)
+                ),
+            )
+        for item in items or []:
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint in the thread's hot saver."""
+        return self._with_thread(
+            config["configurable"]["thread_id"],
+            lambda s: s.put(config, checkpoint, metadata, new_versions),
+            create=True,
+        )  # type: ignore[return-value]
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint in the thread's hot saver."""
+        return await self._awith_thread(
+            config["configurable"]["thread_id"],
+            lambda s: s.put(config, checkpoint, metadata, new_versions),
+            create=True,
+        )  # type: ignore[return-value]
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the pending writes of a task in the thread's hot saver."""
+        self._with_thread(
+            config["configurable"]["thread_id"],
+            lambda s: s.put_writes(config, writes, task_id, task_path),
+            create=True,
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the pending writes of a task in the thread's hot saver."""
+        await self._awith_thread(
+            config["configurable"]["thread_id"],
+            lambda s: s.put_writes(config, writes, task_id, task_path),
+            create=True,
+        )
+
+    def get_delta_channel_history(
+        self, *, config: RunnableConfig, channels: Sequence[str]
+    ) -> Dict[str, DeltaChannelHistory]:
+        """Collect the writes of delta channels from the thread's saver."""
+        history = self._with_thread(
+            config["configurable"]["thread_id"],
+            lambda s: dict(
+                s.get_delta_channel_history(config=config, channels=channels)
+            ),
+        )
+        return history if history is not None else {c: {"writes": []} for c in channels}
+
+    async def aget_delta_channel_history(
+        self, *, config: RunnableConfig, channels: Sequence[str]
+    ) -> Dict[str, DeltaChannelHistory]:
+        """Collect the writes of delta channels from the thread's saver."""
+        history = await self._awith_thread(
+            config["configurable"]["thread_id"],
+            lambda s: dict(
+                s.get_delta_channel_history(config=config, channels=channels)
+            ),
+        )
+        return history if history is not None else {c: {"writes": []} for c in channels}
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete a thread from both tiers."""
+        thread_id = str(thread_id)
+        shard = self._shard(thread_id)
+        with shard.lock:
+            shard.threads.pop(thread_id, None)
+            shard.last_used.pop(thread_id, None)
+            shard.spilling.pop(thread_id, None)
+        with self._disk_lock:
+            self._conn.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Delete a thread from both tiers."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        """Get the next channel version, in the same format as `InMemorySaver`."""
+        return InMemorySaver.get_next_version(self, current, channel)  # type: ignore[arg-type]
@@ -0,0 +1,420 @@
+"""Deterministic handling of explicit cancel and change commands.
+
+Messages like "cancel FL123456" or "change CR654321 pickup to the 20th" carry everything
+the tool needs, and the confirmation number prefix identifies the domain. With
+`direct_commands` enabled, such messages skip the supervisor and the assistants: the
+command is parsed without a model, validated like any tool call, and confirmed with the
+user first. A "yes" on the next turn runs the tool and answers from the response
+templates (see `travel_master.responses`); a "no" leaves the booking alone.
+
+The pending command is kept in the metadata of the confirmation question, so nothing
+beyond the message history is needed between the two turns. Anything the parser does not
+fully understand, and any other reply to the question, goes to the supervisor as before.
+"""
+
+from __future__ import annotations
+
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolCall
+from langchain_core.runnables import RunnableConfig
+
+from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+    cancel_hotel,
+    change_hotel,
+)
+from travel_master.car_rental_assistant.car_rental_assistant_tools import (
+    cancel_car,
+    change_car,
+)
+from travel_master.configuration import Configuration
+from travel_master.flight_assistant.flight_assistant_tools import (
+    cancel_flight,
+    change_flight,
+)
+from travel_master.itinerary import itinerary_update
+from travel_master.metrics import get_counters
+from travel_master.response_cache import _split_turn
+from travel_master.responses import render_tool_response
+from travel_master.state import State
+from travel_master.tool_node import TravelToolNode, _loads
+from travel_master.utils import get_message_text
+from travel_master.validation import CONFIRMATION_PREFIXES, ArgumentError, parse_date
+
+command_counters = get_counters("commands")
+
+_DOMAINS = {prefix: domain for domain, prefix in CONFIRMATION_PREFIXES.items()}
+_ASSISTANTS = {
+    "flight": "flight_assistant",
+    "hotel": "accommodation_assistant",
+    "car": "car_rental_assistant",
+}
+_BOOKING_NAMES = {
+    "flight": "flight booking",
+    "hotel": "hotel booking",
+    "car": "car rental booking",
+}
+
+_COMMAND = re.compile(
+    r"^\s*(?:please\s+)?"
+    r"(?P<verb>cancel|change|modify|move|reschedule)\s+(?:my\s+|the\s+)?"
+    r"(?:(?:flight|hotel|car|rental|booking|reservation)\s+)*"
+    r"(?P<prefix>FL|HT|CR)[\s-]?(?P<digits>\d{6})\b(?P<rest>.*)$",
+    re.IGNORECASE | re.DOTALL,
+)
+_CANCEL_REST = re.compile(
+    r"^[\s,]*(?:(?:because|reason:?)\s+(?P<reason>.+?))?[\s.!]*(?:please)?[\s.!]*$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Commas inside dates ("May 20, 2031") do not separate clauses
+_CLAUSE_SEPARATOR = re.compile(r"\s*(?:;|\band\b|,(?=\s*[a-z]))\s*", re.IGNORECASE)
+_CLAUSE = re.compile(
+    r"^(?:the\s+|my\s+)?(?P<field>[a-z][a-z -]*?)"
+    r"\s+(?:to|for|on)\s+(?P<value>.+?)[\s.!]*$",
+    re.IGNORECASE,
+)
+_COUNT_CLAUSE = re.compile(
+    r"^(?:to|for)\s+(?P<value>\d{1,2})\s+(?P<field>[a-z]+?)[\s.!]*$", re.IGNORECASE
+)
+_DAY_OF_MONTH = re.compile(r"^(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)?$", re.IGNORECASE)
+_MONTH_DAY = re.compile(
+    r"^(?:([a-z]+)\s+(\d{1,2})(?:st|nd|rd|th)?"
+    r"|(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([a-z]+))$",
+    re.IGNORECASE,
+)
+_COUNT = re.compile(r"^(\d{1,2})(?:\s+[a-z]+)?$", re.IGNORECASE)
+_CONFIRM = re.compile(
+    r"^\s*(?:yes|y|yeah|yep|sure|ok|okay|confirm(?:ed)?|go ahead|please do|do it)"
+    r"(?:[\s,.!]+(?:please|thanks|thank you|go ahead|do it|confirm(?:ed)?))*[\s.!]*$",
+    re.IGNORECASE,
+)
+_DECLINE = re.compile(
+    r"^\s*(?:no|n|nope|don't|do not|never mind|keep it)"
+    r"(?:[\s,.!]+thanks|[\s,.!]+thank you)?[\s.!]*$",
+    re.IGNORECASE,
+)
+
+_MONTHS = {
+    name.lower(): index
+    for names in (calendar.month_name, calendar.month_abbr)
+    for index, name in enumerate(names)
+    if name
+}
+
+# Field names users write in change commands, per domain: (argument, kind)
+_CHANGE_FIELDS: Dict[str, Dict[str, Tuple[str, str]]] = {
+    "flight": {
+        "departure": ("new_departure_date", "date"),
+        "departure date": ("new_departure_date", "date"),
+        "outbound": ("new_departure_date", "date"),
+        "outbound flight": ("new_departure_date", "date"),
+        "return": ("new_return_date", "date"),
+        "return date": ("new_return_date", "date"),
+        "return flight": ("new_return_date", "date"),
+        "passengers": ("new_passengers", "count"),
+    },
+    "hotel": {
+        "check-in": ("new_check_in_date", "date"),
+        "check in": ("new_check_in_date", "date"),
+        "checkin": ("new_check_in_date", "date"),
+        "check-in date": ("new_check_in_date", "date"),
+        "check in date": ("new_check_in_date", "date"),
+        "arrival": ("new_check_in_date", "date"),
+        "check-out": ("new_check_out_date", "date"),
+        "check out": ("new_check_out_date", "date"),
+        "checkout": ("new_check_out_date", "date"),
+        "check-out date": ("new_check_out_date", "date"),
+        "check out date": ("new_check_out_date", "date"),
+        "guests": ("new_guests", "count"),
+        "rooms": ("new_rooms", "count"),
+    },
+    "car": {
+        "pickup": ("new_pickup_date", "date"),
+        "pick-up": ("new_pickup_date", "date"),
+        "pick up": ("new_pickup_date", "date"),
+        "pickup date": ("new_pickup_date", "date"),
+        "pick-up date": ("new_pickup_date", "date"),
+        "dropoff": ("new_dropoff_date", "date"),
+        "drop-off": ("new_dropoff_date", "date"),
+        "drop off": ("new_dropoff_date", "date"),
+        "dropoff date": ("new_dropoff_date", "date"),
+        "drop-off date": ("new_dropoff_date", "date"),
+        "return": ("new_dropoff_date", "date"),
+        "return date": ("new_dropoff_date", "date"),
+        "pickup time": ("new_pickup_time", "time"),
+        "pick-up time": ("new_pickup_time", "time"),
+        "dropoff time": ("new_dropoff_time", "time"),
+        "drop-off time": ("new_dropoff_time", "time"),
+    },
+}
+# The date that starts the date range each end date belongs to
+_RANGE_STARTS = {
+    "new_return_date": "new_departure_date",
+    "new_check_out_date": "new_check_in_date",
+    "new_dropoff_date": "new_pickup_date",
+}
+_COUNT_FIELDS = {
+    "flight": {"passengers", "passenger"},
+    "hotel": {"guests", "guest", "rooms", "room"},
+}
+
+_tool_node = TravelToolNode(
+    [cancel_flight, change_flight, cancel_hotel, change_hotel, cancel_car, change_car]
+)
+
+
+@dataclass(frozen=True)
+class Command:
+    """A cancel or change command parsed from a user message."""
+
+    tool_name: str
+    args: Dict[str, Any]
+
+    @property
+    def domain(self) -> str:
+        """The booking domain: flight, hotel or car."""
+        return self.tool_name.partition("_")[2]
+
+    def describe(self) -> str:
+        """Describe the command for the confirmation question."""
+        action, _, _ = self.tool_name.partition("_")
+        booking = (
+            f"your {_BOOKING_NAMES[self.domain]} {self.args['confirmation_number']}"
+        )
+        if action == "cancel":
+            return f"cancel {booking}"
+        changes = ", ".join(
+            f"{k[len('new_') :].replace('_', ' ')} to {v}"
+            for k, v in self.args.items()
+            if k.startswith("new_")
+        )
+        return f"change {booking} ({changes})"
+
+
+def resolve_date(text: str, today: date) -> str:
+    """Resolve a date like "2030-05-20", "the 20th" or "May 20" to YYYY-MM-DD.
+
+    Dates without a month or year are taken to be the next such day on or after `today`
+    (for the end of a date range, the start of the range).
+    """
+    text = " ".join(text.replace(",", " ").split())
+    if match := _DAY_OF_MONTH.match(text):
+        day = int(match.group(1))
+        year, month = today.year, today.month
+        for _ in range(13):
+            if (
+                day <= calendar.monthrange(year, month)[1]
+                and date(year, month, day) >= today
+            ):
+                return date(year, month, day).isoformat()
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        raise ArgumentError(f"'{text}' is not a valid day of the month")
+    if (match := _MONTH_DAY.match(text)) and (
+        _MONTHS.get((match.group(1) or match.group(4)).lower())
+    ):
+        month = _MONTHS[(match.group(1) or match.group(4)).lower()]
+        day = int(match.group(2) or match.group(3))
+        for year in (today.year, today.year + 1):
+            try:
+                resolved = date(year, month, day)
+            except ValueError as e:
+                raise ArgumentError(f"'{text}' is not a valid date") from e
+            if resolved >= today:
+                return resolved.isoformat()
+    return parse_date(text).isoformat()
+
+
+def _change_args(domain: str, rest: str, today: date) -> Dict[str, Any] | None:
+    args: Dict[str, Any] = {}
+    dates: List[str] = []
+    for clause in filter(None, _CLAUSE_SEPARATOR.split(rest.strip(" .!"))):
+        if (match := _COUNT_CLAUSE.match(clause)) and match.group(
+            "field"
+        ).lower() in _COUNT_FIELDS.get(domain, ()):
+            field_name = match.group("field").lower().rstrip("s") + "s"
+            args[_CHANGE_FIELDS[domain][field_name][0]] = int(match.group("value"))
+            continue
+        match = _CLAUSE.match(clause)
+        if match is None:
+            return None
+        field_name = re.sub(r"\s+date$", " date", match.group("field").lower().strip())
+        spec = _CHANGE_FIELDS[domain].get(field_name)
+        if spec is None or spec[0] in args:
+            return None
+        argument, kind = spec
+        value = match.group("value").strip()
+        try:
+            if kind == "date":
+                # Resolved once every clause is read: an end date follows its start
+                args[argument] = value
+                dates.append(argument)
+            elif kind == "count":
+                count = _COUNT.match(value)
+                if count is None:
+                    return None
+                args[argument] = int(count.group(1))
+            else:
+                args[argument] = value
+        except ArgumentError:
+            return None
+    # Starts first, so "return to May 27" is resolved against the new departure date
+    for argument in sorted(dates, key=lambda argument: argument in _RANGE_STARTS):
+        start = _RANGE_STARTS.get(argument)
+        earliest = date.fromisoformat(args[start]) if start in dates else today
+        try:
+            args[argument] = resolve_date(args[argument], earliest)
+        except ArgumentError:
+            return None
+    return args or None
+
+
+def parse_command(text: str, today: date) -> Command | None:
+    """Parse an explicit, unambiguous cancel or change command.
+
+    Returns None for anything else, including commands with parts the parser does not
+    understand, so those messages are left to the models.
+    """
+    match = _COMMAND.match(text)
+    if match is None:
+        return None
+    domain = _DOMAINS[match.group("prefix").upper()]
+    number = f"{match.group('prefix').upper()}{match.group('digits')}"
+    rest = match.group("rest")
+    if match.group("verb").lower() == "cancel":
+        cancel = _CANCEL_REST.match(rest)
+        if cancel is None:
+            return None
+        args: Dict[str, Any] = {"confirmation_number": number}
+        if cancel.group("reason"):
+            args["reason"] = cancel.group("reason").strip()
+        return Command(f"cancel_{domain}", args)
+    changes = _change_args(domain, rest, today)
+    if changes is None:
+        return None
+    return Command(f"change_{domain}", {"confirmation_number": number, **changes})
+
+
+def pending_command(history: List[AnyMessage]) -> Command | None:
+    """Get the command the previous turn asked the user to confirm, if any."""
+    last_ai = next((m for m in reversed(history) if isinstance(m, AIMessage)), None)
+    if last_ai is None:
+        return None
+    pending = last_ai.response_metadata.get("direct_command")
+    if not pending or pending.get("status") != "pending":
+        return None
+    return Command(pending["tool_name"], dict(pending["args"]))
+
+
+def _reply(command: Command, status: str, content: str) -> AIMessage:
+    return AIMessage(
+        content=content,
+        name=_ASSISTANTS[command.domain],
+        response_metadata={
+            "direct_command": {
+                "tool_name": command.tool_name,
+                "args": command.args,
+                "status": status,
+            }
+        },
+    )
+
+
+async def handle_command(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Confirm, run or decline an explicit command without calling the models."""
+    configuration = Configuration.from_runnable_config(config)
+    history, human, turn = _split_turn(list(state.messages))
+    if not configuration.direct_commands or human is None or turn:
+        return {"messages": []}
+    text = get_message_text(human)
+
+    pending = pending_command(history)
+    if pending is not None and _CONFIRM.match(text):
+        call: ToolCall = {
+            "name": pending.tool_name,
+            "args": pending.args,
+            "id": f"direct_{pending.args['confirmation_number']}",
+            "type": "tool_call",
+        }
+        output = await _tool_node.run_tool(call, config)
+        result = _loads(output.content)
+        content = (
+            render_tool_response(pending.tool_name, pending.args, result)
+            if output.status != "error"
+            else None
+        )
+        if content is None:
+            # Let the assistants deal with the failure
+            command_counters.incr("failed")
+            return {"messages": []}
+        command_counters.incr("executed")
+        return {
+            "messages": [_reply(pending, "executed", content)],
+            "itinerary": itinerary_update(pending.tool_name, pending.args, result),
+        }
+    if pending is not None and _DECLINE.match(text):
+        command_counters.incr("declined")
+        action = "cancelled" if pending.tool_name.startswith("cancel_") else "changed"
+        booking = (
+            f"{_BOOKING_NAMES[pending.domain]} {pending.args['confirmation_number']}"
+        )
+        return {
+            "messages": [
+                _reply(
+                    pending, "declined", f"OK, your {booking} has not been {action}."
+                )
+            ]
+        }
+
+    today = datetime.fromisoformat(configuration.get_current_time()).date()
+    command = parse_command(text, today)
+    if command is None:
+        return {"messages": []}
+    call, errors = _tool_node.validate(
+        {
+            "name": command.tool_name,
+            "args": command.args,
+            "id": None,
+            "type": "tool_call",
+        },
+        configuration,
+    )
+    if errors:
+        # The assistants explain what is wrong with the request
+        command_counters.incr("rejected")
+        return {"messages": []}
+    command = Command(command.tool_name, call["args"])
+    command_counters.incr("confirmations")
+    return {
+        "messages": [
+            _reply(
+                command,
+                "pending",
+                f"Please confirm: should I {command.describe()}? "
+                "Reply yes to proceed or no to keep it as it is.",
+            )
+        ]
+    }
+
+
+def route_turn(state: State, config: RunnableConfig) -> str:
+    """Send the turn to the command handler if it may be a command or a confirmation."""
+    if not Configuration.from_runnable_config(config).direct_commands:
+        return "response_cache_lookup"
+    history, human, _ = _split_turn(list(state.messages))
+    if human is None:
+        return "response_cache_lookup"
+    if _COMMAND.match(get_message_text(human)) or pending_command(history) is not None:
+        return "direct_command"
+    return "response_cache_lookup"
+
+
+def route_after_command(state: State) -> str:
+    """End the turn when the command handler answered it."""
+    last = state.messages[-1] if state.messages else None
+    if isinstance(last, AIMessage) and last.response_metadata.get("direct_command"):
+        return "__end__"
+    return "response_cache_lookup"
@@ -2,19 +2,26 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field, fields
-from datetime import datetime
-from typing import Annotated, Optional
+import time
+from dataclasses import dataclass, field, fields, replace
+from datetime import datetime, tzinfo
+from functools import cache, lru_cache
+from typing import Annotated, Any, Callable, Dict, FrozenSet, Optional, Tuple
 
 import pytz
 from langchain_core.runnables import RunnableConfig, ensure_config
 
 from travel_master import prompts
 
+_Resolver = Tuple[FrozenSet[str], Callable[[Tuple[Tuple[str, Any], ...]], "Configuration"]]
 
-@dataclass(kw_only=True)
+
+@dataclass(kw_only=True, frozen=True)
 class Configuration:
-    """The configuration for the agent."""
+    """The configuration for the agent.
+
+    Instances are immutable, so a resolved configuration can be shared by concurrent runs.
+    """
 
     flight_assistant_system_prompt: str = field(
         default=prompts.FLIGHT_ASSISTANT_SYSTEM_PROMPT,
@@ -56,6 +63,68 @@ class Configuration:
         },
     )
 
+    small_model: Annotated[str, {"__template_metadata__": {"kind": "llm"}}] = field(
+        default="azure_openai/gpt-4.1-nano",
+        metadata={
+            "description": "The cheaper, faster model used for simple turns when model tiering is enabled. "
+            "Should be in the form: provider/model-name."
+        },
+    )
+
+    fallback_model: Annotated[str, {"__template_metadata__": {"kind": "llm"}}] = field(
+        default="azure_openai/gpt-4.1-mini",
+        metadata={
+            "description": "The model a call is retried on when the selected model times out. "
+            "Should be in the form: provider/model-name."
+        },
+    )
+
+    enable_model_tiering: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to pick the model per call from cheap turn features, sending "
+            "simple routing and confirmation turns to the small model."
+        },
+    )
+
+    model_call_timeout_seconds: float = field(
+        default=30.0,
+        metadata={
+            "description": "How long to wait for a model response before retrying on the fallback model."
+        },
+    )
+
+    tiering_simple_max_words: int = field(
+        default=8,
+        metadata={
+            "description": "User messages up to this many words that are unlikely to need tools "
+            "are handled by the small model."
+        },
+    )
+
+    tiering_max_small_history_tokens: int = field(
+        default=4000,
+        metadata={
+            "description": "Calls with a longer history (approximate tokens) always use the default model."
+        },
+    )
+
+    tiering_deadline_pressure_seconds: float = field(
+        default=5.0,
+        metadata={
+            "description": "When less than this much time is left before the turn deadline, "
+            "calls are sent to the small model."
+        },
+    )
+
+    turn_deadline: float | None = field(
+        default=None,
+        metadata={
+            "description": "Optional UNIX timestamp by which the current turn should be answered. "
+            "Usually set per run by the caller."
+        },
+    )
+
     timezone: str = field(
         default="Australia/Brisbane",
         metadata={
@@ -85,15 +154,301 @@ class Configuration:
         },
     )
 
+    search_cache_ttl_seconds: int = field(
+        default=900,
+        metadata={
+            "description": "How long search results are reused from the search cache, in seconds."
+        },
+    )
+
+    enable_search_prefetch: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to speculatively warm the search cache with the hotel and car "
+            "searches that usually follow a round-trip flight search."
+        },
+    )
+
+    search_prefetch_max_concurrency: int = field(
+        default=2,
+        metadata={
+            "description": "The maximum number of prefetch searches running at the same time. "
+            "Prefetches beyond this cap are skipped."
+        },
+    )
+
+    search_prefetch_budget_per_minute: int = field(
+        default=30,
+        metadata={
+            "description": "The maximum number of prefetch searches started in any rolling minute."
+        },
+    )
+
+    enable_search_index: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether search results are kept in a local full-text index, and searches "
+            "answered from it when it has enough fresh hits."
+        },
+    )
+
+    search_index_path: str = field(
+        default="search_index.sqlite",
+        metadata={"description": "Path of the SQLite file holding the local search index."},
+    )
+
+    search_index_max_age_seconds: int = field(
+        default=6 * 3600,
+        metadata={
+            "description": "How old an indexed document may be and still answer a search, in seconds."
+        },
+    )
+
+    search_index_min_hits: int = field(
+        default=3,
+        metadata={
+            "description": "Fresh local hits needed to answer a search without the network. With "
+            "fewer, the hits top up the network results."
+        },
+    )
+
+    search_index_retention_seconds: int = field(
+        default=7 * 86400,
+        metadata={
+            "description": "How long documents are kept in the local search index before compaction "
+            "deletes them, in seconds."
+        },
+    )
+
+    enable_result_ranking: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether search tools rank their results by normalized price and the "
+            "user's preferences, returning only the best candidates."
+        },
+    )
+
+    ranking_top_k: int = field(
+        default=3,
+        metadata={
+            "description": "The number of candidates search tools return when ranking is enabled."
+        },
+    )
+
+    ranking_currency: str = field(
+        default="USD",
+        metadata={
+            "description": "The currency ranked search results are priced in."
+        },
+    )
+
+    enable_response_cache: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to answer generic, tool-free turns from the local semantic "
+            "response cache instead of calling the models."
+        },
+    )
+
+    response_cache_similarity_threshold: float = field(
+        default=0.85,
+        metadata={
+            "description": "The minimum cosine similarity between two user messages for a cached "
+            "response to be reused."
+        },
+    )
+
+    response_cache_ttl_seconds: int = field(
+        default=3600,
+        metadata={
+            "description": "How long a cached response stays valid, in seconds."
+        },
+    )
+
+    response_cache_max_entries: int = field(
+        default=256,
+        metadata={
+            "description": "The maximum number of cached responses; the least recently used are evicted."
+        },
+    )
+
+    response_cache_min_words: int = field(
+        default=3,
+        metadata={
+            "description": "User messages with fewer words than this bypass the response cache, "
+            "since they rarely stand on their own."
+        },
+    )
+
+    compact_assistant_history: bool = field(
+        default=True,
+        metadata={
+            "description": "Whether assistants drop the tool calls and tool results of earlier turns "
+            "from their prompt, relying on the structured itinerary for those details."
+        },
+    )
+
+    scope_assistant_history: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether assistants only see the user messages and their own domain's "
+            "messages, with a one-line summary of each other assistant's latest answer."
+        },
+    )
+
+    direct_tool_responses: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether booking, cancellation and change results are answered from a "
+            "template right after the tool call, saving the assistant's second model call."
+        },
+    )
+
+    parallel_tool_calls: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether the models may request several tool calls in one step: the "
+            "supervisor handing off to several assistants at once, so that requests spanning flights, "
+            "hotels and cars are worked on at the same time, and assistants running several tools."
+        },
+    )
+
+    max_concurrent_tool_calls: int = field(
+        default=4,
+        metadata={
+            "description": "The maximum number of tool calls of one assistant step running at the "
+            "same time; further calls wait for a free slot."
+        },
+    )
+
+    enable_audit_log: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether bookings, cancellations and changes are recorded in the "
+            "append-only audit log, written to disk in the background."
+        },
+    )
+
+    audit_log_dir: str = field(
+        default="audit",
+        metadata={"description": "Directory of the audit log's segment files."},
+    )
+
+    audit_log_segment_bytes: int = field(
+        default=16 * 1024 * 1024,
+        metadata={"description": "Size at which the audit log starts a new segment file, in bytes."},
+    )
+
+    enable_loop_detection: bool = field(
+        default=True,
+        metadata={
+            "description": "Whether tool calls repeating an earlier call of the same turn are answered "
+            "with the earlier result instead of running the tool again."
+        },
+    )
+
+    loop_max_repeats: int = field(
+        default=1,
+        metadata={
+            "description": "How many repeats of a tool call are answered from the earlier result before "
+            "the assistant's turn is aborted as a loop."
+        },
+    )
+
+    flight_assistant_max_steps: int = field(
+        default=5,
+        metadata={
+            "description": "The maximum number of model calls the flight assistant makes in one turn."
+        },
+    )
+
+    accommodation_assistant_max_steps: int = field(
+        default=5,
+        metadata={
+            "description": "The maximum number of model calls the accommodation assistant makes in one turn."
+        },
+    )
+
+    car_rental_assistant_max_steps: int = field(
+        default=5,
+        metadata={
+            "description": "The maximum number of model calls the car rental assistant makes in one turn."
+        },
+    )
+
+    assistant_step_seconds: float = field(
+        default=3.0,
+        metadata={
+            "description": "The assumed duration of one assistant step until model latencies have been "
+            "measured; assistants stop calling tools when the turn deadline leaves less than two steps."
+        },
+    )
+
+    direct_commands: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether explicit cancel and change commands with a confirmation number "
+            "(e.g. 'cancel FL123456') are parsed, confirmed and run without calling the models."
+        },
+    )
+
+    profile: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to profile this run with the sampling profiler and write its "
+            "collapsed stacks to the profiling output directory."
+        },
+    )
+
+    profiling_sample_rate: float = field(
+        default=0.0,
+        metadata={
+            "description": "Fraction of runs profiled at random, in addition to runs that set `profile`."
+        },
+    )
+
+    profiling_interval_ms: float = field(
+        default=5.0,
+        metadata={"description": "Milliseconds between the stack samples of a profiled run."},
+    )
+
+    profiling_output_dir: str = field(
+        default="profiles",
+        metadata={"description": "Directory the collapsed stack files of profiled runs are written to."},
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
     ) -> Configuration:
-        """Create a Configuration instance from a RunnableConfig object."""
-        config = ensure_config(config)
-        configurable = config.get("configurable") or {}
-        _fields = {f.name for f in fields(cls) if f.init}
-        return cls(**{k: v for k, v in configurable.items() if k in _fields})
+        """Create a Configuration instance from a RunnableConfig object.
+
+        Resolved configurations are memoized by their overrides, so repeated calls with
+        the same configurable values return the same (frozen) instance. The turn deadline
+        differs on every turn, so it is left out of the memo and set on a copy.
+        """
+        # An explicit "configurable" replaces the inherited one as a whole (as in
+        # ensure_config), so merging with the context config is only needed without one
+        configurable = config.get("configurable") if config is not None else None
+        if configurable is None:
+            configurable = ensure_config(config).get("configurable") or {}
+        names, resolve = _resolver(cls)
+        overrides = tuple(sorted((k, v) for k, v in configurable.items() if k in names))
+        try:
+            configuration = resolve(overrides)
+        except TypeError:
+            # An unhashable override value; resolve it without the cache
+            configuration = cls(**dict(overrides))
+        deadline = configurable.get("turn_deadline")
+        if deadline is None:
+            return configuration
+        return replace(configuration, turn_deadline=deadline)
+
+    def seconds_until_deadline(self) -> float | None:
+        """Get the seconds left before the turn deadline, or None if there is no deadline."""
+        if self.turn_deadline is None:
+            return None
+        return self.turn_deadline - time.time()
 
     def get_current_time(self) -> str:
         """Get the current time in the configured timezone.
@@ -101,5 +456,21 @@ class Configuration:
         Returns:
             str: Current timestamp in ISO format with timezone information.
         """
-        tz = pytz.timezone(self.timezone)
-        return datetime.now(tz).isoformat()
+        return datetime.now(_timezone(self.timezone)).isoformat()
+
+
+def _resolver(cls: type[Configuration]) -> _Resolver:
+    # Per class: the memoized field names and constructor, keyed by the overrides
+    resolver = _resolvers.get(cls)
+    if resolver is None:
+        names = frozenset(f.name for f in fields(cls) if f.init and f.name != "turn_deadline")
+        resolver = _resolvers[cls] = (names, lru_cache(maxsize=256)(lambda overrides: cls(**dict(overrides))))
+    return resolver
+
+
+@cache
+def _timezone(name: str) -> tzinfo:
+    return pytz.timezone(name)
+
+
+_resolvers: Dict[type[Configuration], _Resolver] = {}
@@ -2,17 +2,44 @@
 
 import json
 from datetime import datetime, timedelta
-from typing import Any, Callable, Dict, List, Optional, cast
+from typing import Any, Callable, List, Optional, cast
 import random
 
 import aiohttp
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import InjectedToolArg
 from pydantic import BaseModel, Field
 from typing_extensions import Annotated
 
 from travel_master.configuration import Configuration
+from travel_master.gazetteer import describe_location, normalize_location
+from travel_master.prefetch import prefetcher
+from travel_master.ranking import Preferences, rank_candidates, ranking_currency
+from travel_master.results import (
+    BookingResult,
+    CancellationResult,
+    ChangeResult,
+    FlightSearchResult,
+    ToolFailure,
+    compact_search_results,
+    to_json,
+)
+from travel_master.search_index import indexed_search
+
+
+def build_flight_search_query(
+    origin: str,
+    destination: str,
+    departure_date: str,
+    return_date: str | None = None,
+    passengers: int = 1,
+) -> str:
+    """Build the web search query used by `search_flights`."""
+    search_query = f"flights from {describe_location(origin)} to {describe_location(destination)} {departure_date}"
+    if return_date:
+        search_query += f" return {return_date}"
+    search_query += f" {passengers} passenger{'s' if passengers > 1 else ''} best deals airlines"
+    return search_query
 
 
 async def search_flights(
@@ -21,9 +48,11 @@ async def search_flights(
     departure_date: str,
     return_date: Optional[str] = None,
     passengers: int = 1,
+    max_price: float | None = None,
+    max_stops: int | None = None,
     *,
     config: Annotated[RunnableConfig, InjectedToolArg]
-) -> Dict[str, Any]:
+) -> str:
     """Search for flights using real web search.
 
     Args:
@@ -32,52 +61,64 @@ async def search_flights(
         departure_date: Departure date (YYYY-MM-DD format)
         return_date: Return date for round trip (YYYY-MM-DD format, optional)
         passengers: Number of passengers (default: 1)
+        max_price: Budget per passenger, if the user gave one (used to rank results)
+        max_stops: Maximum number of stops, if the user gave one (used to rank results)
 
     Returns:
-        Dict[str, Any]: Search results with flight options
+        str: Search results with flight options as compact JSON
     """
     try:
         configuration = Configuration.from_runnable_config(config)
         
+        # Normalize locations to canonical city codes so equivalent searches share a cache key
+        origin = normalize_location(origin)
+        destination = normalize_location(destination)
+        
         # Build search query for flights
         trip_type = "round trip" if return_date else "one way"
-        search_query = f"flights from {origin} to {destination} {departure_date}"
-        if return_date:
-            search_query += f" return {return_date}"
-        search_query += f" {passengers} passenger{'s' if passengers > 1 else ''} best deals airlines"
+        search_query = build_flight_search_query(
+            origin, destination, departure_date, return_date, passengers
+        )
+        
+        # Use Tavily for real flight search (served from the local index or cache when possible)
+        search_results = await indexed_search(
+            "flight", search_query, f"{origin}-{destination}", departure_date, configuration
+        )
         
-        # Use Tavily for real flight search
-        wrapped = TavilySearchResults(max_results=configuration.max_search_results)
-        search_results = await wrapped.ainvoke({"query": search_query})
+        # Warm the cache for the hotel and car searches that usually follow
+        if configuration.enable_search_prefetch:
+            prefetcher.prefetch_after_flight_search(
+                destination=destination,
+                departure_date=departure_date,
+                return_date=return_date,
+                passengers=passengers,
+                configuration=configuration,
+            )
         
-        return {
-            "status": "success",
-            "search_query": search_query,
-            "trip_type": trip_type,
-            "origin": origin,
-            "destination": destination,
-            "departure_date": departure_date,
-            "return_date": return_date,
-            "passengers": passengers,
-            "results": search_results,
-            "message": f"Found flight options for {trip_type} from {origin} to {destination}"
-        }
+        results = compact_search_results(search_results)
+        currency = None
+        if configuration.enable_result_ranking:
+            currency = ranking_currency(configuration.ranking_currency)
+            results = rank_candidates(
+                "flight",
+                results,
+                Preferences(max_price=max_price, max_stops=max_stops),
+                top_k=configuration.ranking_top_k,
+                currency=currency,
+            )
+        
+        return to_json(FlightSearchResult(origin, destination, trip_type, results, currency))
         
     except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Flight search failed: {str(e)}",
-            "origin": origin,
-            "destination": destination
-        }
+        return to_json(ToolFailure(f"Flight search failed: {e}"))
 
 
-def book_flight(
+async def book_flight(
     flight_id: str,
     passenger_name: str,
     email: str,
     phone: str
-) -> Dict[str, Any]:
+) -> str:
     """Book a flight (dummy function for demonstration).
 
     Args:
@@ -87,30 +128,23 @@ def book_flight(
         phone: Contact phone number
 
     Returns:
-        Dict[str, Any]: Booking confirmation details
+        str: Booking confirmation details as compact JSON
     """
     # Generate dummy booking confirmation
     confirmation_number = f"FL{random.randint(100000, 999999)}"
     booking_reference = f"TM{random.randint(10000, 99999)}"
     
-    return {
-        "status": "success",
-        "booking_confirmed": True,
-        "confirmation_number": confirmation_number,
-        "booking_reference": booking_reference,
-        "flight_id": flight_id,
-        "passenger_name": passenger_name,
-        "email": email,
-        "phone": phone,
-        "booking_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "message": f"Flight booking confirmed! Confirmation number: {confirmation_number}. You will receive an email confirmation at {email}."
-    }
-
-
-def cancel_flight(
+    return to_json(
+        BookingResult(
+            confirmation_number, booking_reference, datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+    )
+
+
+async def cancel_flight(
     confirmation_number: str,
     reason: Optional[str] = None
-) -> Dict[str, Any]:
+) -> str:
     """Cancel a flight booking (dummy function for demonstration).
 
     Args:
@@ -118,29 +152,23 @@ def cancel_flight(
         reason: Optional cancellation reason
 
     Returns:
-        Dict[str, Any]: Cancellation confirmation details
+        str: Cancellation confirmation details as compact JSON
     """
     cancellation_id = f"CX{random.randint(100000, 999999)}"
     
-    return {
-        "status": "success",
-        "cancellation_confirmed": True,
-        "cancellation_id": cancellation_id,
-        "confirmation_number": confirmation_number,
-        "reason": reason,
-        "cancellation_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "refund_status": "pending",
-        "refund_timeline": "5-7 business days",
-        "message": f"Flight booking {confirmation_number} has been cancelled. Cancellation ID: {cancellation_id}. Refund will be processed within 5-7 business days."
-    }
-
-
-def change_flight(
+    return to_json(
+        CancellationResult(
+            cancellation_id, "pending", "5-7 business days", datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+    )
+
+
+async def change_flight(
     confirmation_number: str,
     new_departure_date: Optional[str] = None,
     new_return_date: Optional[str] = None,
     new_passengers: Optional[int] = None
-) -> Dict[str, Any]:
+) -> str:
     """Change a flight booking (dummy function for demonstration).
 
     Args:
@@ -150,32 +178,14 @@ def change_flight(
         new_passengers: New number of passengers
 
     Returns:
-        Dict[str, Any]: Change confirmation details
+        str: Change confirmation details as compact JSON
     """
     change_id = f"CH{random.randint(100000, 999999)}"
     change_fee = random.randint(50, 200)
     
-    changes_made = []
-    if new_departure_date:
-        changes_made.append(f"Departure date changed to {new_departure_date}")
-    if new_return_date:
-        changes_made.append(f"Return date changed to {new_return_date}")
-    if new_passengers:
-        changes_made.append(f"Number of passengers changed to {new_passengers}")
-    
-    return {
-        "status": "success",
-        "change_confirmed": True,
-        "change_id": change_id,
-        "confirmation_number": confirmation_number,
-        "changes_made": changes_made,
-        "change_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "change_fee": change_fee,
-        "new_departure_date": new_departure_date,
-        "new_return_date": new_return_date,
-        "new_passengers": new_passengers,
-        "message": f"Flight booking {confirmation_number} has been changed. Change ID: {change_id}. Change fee: ${change_fee}."
-    }
+    return to_json(
+        ChangeResult(change_id, change_fee, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    )
 
 
 FLIGHT_ASSISTANT_TOOLS: List[Callable[..., Any]] = [
@@ -0,0 +1,160 @@
+"""Offline airport and city gazetteer used to normalize locations.
+
+The same trip arrives as "NYC", "New York", "JFK" or "new york city". Normalizing every
+location argument to one canonical IATA city code before a search query is built keeps
+search cache keys (and the queries themselves) from fragmenting.
+
+The bundled data file holds one `alias<TAB>CODE<TAB>Name<TAB>Qualifiers` record per
+line, sorted by alias. The qualifiers are the `|`-separated names (and abbreviations) of
+the place's country and region that a "City, Region, Country" style input may add. The
+file is memory-mapped rather than parsed into Python objects, so processes serving the
+graph share its pages, and the sorted records double as a compact prefix index: exact
+lookups and prefix completions are binary searches over the mapped bytes.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+DEFAULT_GAZETTEER_PATH = Path(__file__).parent / "data" / "gazetteer.tsv"
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+@dataclass(frozen=True)
+class Place:
+    """A canonical location entry."""
+
+    code: str
+    name: str
+    qualifiers: Tuple[str, ...] = ()
+
+    def is_qualified_by(self, text: str) -> bool:
+        """Check whether each comma-separated part of a suffix names this place's country or region."""
+        known = {normalize_key(qualifier) for qualifier in self.qualifiers}
+        parts = [normalize_key(part) for part in text.split(",")]
+        return all(part in known for part in parts if part)
+
+
+def normalize_key(text: str) -> str:
+    """Normalize free text into the lookup key format used by the gazetteer."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(_NON_ALNUM.sub(" ", text).split())
+
+
+class Gazetteer:
+    """A lazily loaded, memory-mapped location index."""
+
+    def __init__(self, path: Path = DEFAULT_GAZETTEER_PATH) -> None:
+        """Create a gazetteer backed by a sorted TSV file (loaded on first use)."""
+        self.path = path
+        self._mm: mmap.mmap | None = None
+        self._offsets: array[int] = array("I")
+        self._lock = threading.Lock()
+
+    def _load(self) -> mmap.mmap:
+        with self._lock:
+            if self._mm is None:
+                with open(self.path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                offsets = array("I")
+                start = 0
+                size = len(mm)
+                while start < size:
+                    offsets.append(start)
+                    end = mm.find(b"\n", start)
+                    start = size if end == -1 else end + 1
+                self._offsets = offsets
+                self._mm = mm
+            return self._mm
+
+    def __len__(self) -> int:
+        """Return the number of alias records."""
+        self._load()
+        return len(self._offsets)
+
+    def _key_at(self, mm: mmap.mmap, index: int) -> bytes:
+        start = self._offsets[index]
+        return mm[start : mm.find(b"\t", start)]
+
+    def _place_at(self, mm: mmap.mmap, index: int) -> Place:
+        start = self._offsets[index]
+        end = mm.find(b"\n", start)
+        _, code, name, qualifiers = (
+            mm[start : end if end != -1 else len(mm)].decode().split("\t")
+        )
+        return Place(code, name, tuple(qualifiers.split("|")))
+
+    def _lower_bound(self, mm: mmap.mmap, key: bytes) -> int:
+        lo, hi = 0, len(self._offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mm, mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, text: str) -> Place | None:
+        """Find the place matching a name, alias, or airport code exactly.
+
+        "Paris, France" style inputs fall back to the part before the first comma, but only
+        when the rest names the place's country or region: "Paris, Texas" is not found.
+        """
+        mm = self._load()
+        place = self._exact(mm, text)
+        city, _, suffix = text.partition(",")
+        if place is None and suffix:
+            place = self._exact(mm, city)
+            if place is not None and not place.is_qualified_by(suffix):
+                return None
+        return place
+
+    def _exact(self, mm: mmap.mmap, text: str) -> Place | None:
+        key = normalize_key(text).encode()
+        if not key:
+            return None
+        index = self._lower_bound(mm, key)
+        if index < len(self._offsets) and self._key_at(mm, index) == key:
+            return self._place_at(mm, index)
+        return None
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Place]:
+        """List the distinct places with an alias starting with the given prefix."""
+        mm = self._load()
+        key = normalize_key(prefix).encode()
+        places: List[Place] = []
+        index = self._lower_bound(mm, key)
+        while index < len(self._offsets) and len(places) < limit:
+            if not self._key_at(mm, index).startswith(key):
+                break
+            place = self._place_at(mm, index)
+            if place not in places:
+                places.append(place)
+            index += 1
+        return places
+
+
+_default_gazetteer = Gazetteer()
+
+
+def normalize_location(text: str) -> str:
+    """Normalize a location to its canonical city code, leaving unknown places as given."""
+    place = _default_gazetteer.lookup(text)
+    return place.code if place else text.strip()
+
+
+def describe_location(location: str) -> str:
+    """Render a location for a search query, e.g. "PAR" -> "Paris (PAR)"."""
+    place = _default_gazetteer.lookup(location)
+    if place is None or place.code != location:
+        return location
+    return f"{place.name} ({place.code})"
@@ -0,0 +1,149 @@
+"""Helpers for trimming the message history an assistant sends to its model."""
+
+from __future__ import annotations
+
+from typing import AbstractSet, Dict, List, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from travel_master.metrics import get_counters
+from travel_master.utils import get_message_text
+
+history_counters = get_counters("history")
+
+# Tools of the supervisor's handoffs, to and back from the assistants
+HANDOFF_PREFIXES = ("transfer_to_", "transfer_back_to_")
+
+
+def current_turn_start(messages: Sequence[AnyMessage]) -> int:
+    """Get the index of the latest user message (0 if there is none)."""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return index
+    return 0
+
+
+def compact_history(messages: Sequence[AnyMessage]) -> List[AnyMessage]:
+    """Drop tool traffic from previous turns.
+
+    The current turn (from the latest user message on) is kept intact. Earlier turns keep
+    only the user messages and the final prose answers; the tool calls and the raw tool
+    results behind them are summarized by the structured itinerary instead.
+    """
+    start = current_turn_start(messages)
+    older = [
+        m
+        for m in messages[:start]
+        if isinstance(m, HumanMessage)
+        or (isinstance(m, AIMessage) and not m.tool_calls and m.content)
+    ]
+    return [*older, *messages[start:]]
+
+
+def count_tool_messages(messages: Sequence[AnyMessage]) -> int:
+    """Count the tool results in a message list."""
+    return sum(1 for m in messages if isinstance(m, ToolMessage))
+
+
+def _is_handoff(message: AnyMessage) -> bool:
+    if isinstance(message, ToolMessage):
+        return (message.name or "").startswith(HANDOFF_PREFIXES)
+    return isinstance(message, AIMessage) and any(
+        call["name"].startswith(HANDOFF_PREFIXES) for call in message.tool_calls
+    )
+
+
+def message_owners(messages: Sequence[AnyMessage]) -> List[str | None]:
+    """Attribute each message to whoever produced it.
+
+    Returns "user" for user messages, "handoff" for the handoff tool calls and results,
+    the assistant's name for its messages and None when it cannot be told. Assistants'
+    answers are unnamed, but the supervisor adds a named handoff back right after them.
+    """
+    owners: List[str | None] = []
+    for index, message in enumerate(messages):
+        if isinstance(message, HumanMessage):
+            owners.append("user")
+        elif _is_handoff(message):
+            owners.append("handoff")
+        elif isinstance(message, AIMessage) and message.name:
+            owners.append(message.name)
+        else:
+            following = messages[index + 1] if index + 1 < len(messages) else None
+            if (
+                isinstance(message, AIMessage)
+                and following is not None
+                and following.name
+                and _is_handoff(following)
+            ):
+                owners.append(following.name)
+            else:
+                owners.append(None)
+    return owners
+
+
+def scoped_history(
+    messages: Sequence[AnyMessage], assistant_name: str, tool_names: AbstractSet[str]
+) -> List[AnyMessage]:
+    """Keep the user messages and an assistant's own messages.
+
+    The other assistants' answers, the supervisor's answers (which repeat them) and the
+    handoffs are dropped; so are tool calls and results of tools the assistant does not
+    have. Messages that cannot be attributed are kept.
+    """
+    scoped: List[AnyMessage] = []
+    for message, owner in zip(messages, message_owners(messages)):
+        if owner in ("user", assistant_name):
+            scoped.append(message)
+        elif owner is None:
+            if isinstance(message, ToolMessage):
+                if message.name in tool_names:
+                    scoped.append(message)
+            elif not isinstance(message, AIMessage) or all(
+                call["name"] in tool_names for call in message.tool_calls
+            ):
+                scoped.append(message)
+    return scoped
+
+
+def cross_domain_context(
+    messages: Sequence[AnyMessage], assistant_name: str, max_chars: int = 200
+) -> str:
+    """Summarize the other assistants' latest answers, one short line each."""
+    latest: Dict[str, str] = {}
+    for message, owner in zip(messages, message_owners(messages)):
+        if (
+            owner
+            and owner.endswith("_assistant")
+            and owner != assistant_name
+            and isinstance(message, AIMessage)
+        ):
+            text = " ".join(get_message_text(message).split())
+            if text:
+                latest[owner] = (
+                    text if len(text) <= max_chars else text[: max_chars - 3] + "..."
+                )
+    return "\n".join(f"- {owner}: {text}" for owner, text in latest.items())
+
+
+def scope_history(
+    messages: Sequence[AnyMessage], assistant_name: str, tool_names: AbstractSet[str]
+) -> Tuple[List[AnyMessage], str]:
+    """Get an assistant's scoped history and cross-domain context header.
+
+    The approximate prompt tokens of the history before and after scoping are counted per
+    assistant in the `history` counter group.
+    """
+    scoped = scoped_history(messages, assistant_name, tool_names)
+    context = cross_domain_context(messages, assistant_name)
+    history_counters.incr(
+        f"{assistant_name}.prompt_tokens_full", count_tokens_approximately(messages)
+    )
+    history_counters.incr(
+        f"{assistant_name}.prompt_tokens_scoped",
+        count_tokens_approximately(scoped)
+        + (count_tokens_approximately([context]) if context else 0),
+    )
+    history_counters.incr(f"{assistant_name}.prompts")
+    return scoped, context
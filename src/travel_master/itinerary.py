@@ -0,0 +1,135 @@
+"""Structured itinerary shared by the supervisor and all assistants.
+
+Instead of re-reading the whole transcript to recover the destination, dates, number of
+travellers and confirmation numbers, assistants read a compact itinerary kept in the
+graph state. The tool node fills it in from tool arguments and results as they arrive,
+and `merge_itinerary` is the reducer that combines partial updates.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping
+
+Itinerary = Dict[str, Any]
+"""A flat mapping of trip details plus a `bookings` mapping keyed by confirmation number."""
+
+_DOMAINS = {"flight": "flight", "hotel": "hotel", "car": "car"}
+
+
+def merge_itinerary(left: Itinerary | None, right: Itinerary | None) -> Itinerary:
+    """Merge a partial itinerary update into the current itinerary.
+
+    Missing or None values in the update never clear known details. Bookings are merged
+    per confirmation number, so a cancellation only updates the status of its booking.
+    """
+    merged: Itinerary = dict(left or {})
+    for key, value in (right or {}).items():
+        if value is None:
+            continue
+        if key == "bookings":
+            bookings = dict(merged.get("bookings") or {})
+            for number, details in value.items():
+                bookings[number] = {**bookings.get(number, {}), **details}
+            merged["bookings"] = bookings
+        else:
+            merged[key] = value
+    return merged
+
+
+def _changes(args: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        k[len("new_") :]: v
+        for k, v in args.items()
+        if k.startswith("new_") and v is not None
+    }
+
+
+def itinerary_update(
+    tool_name: str, args: Mapping[str, Any], result: Mapping[str, Any]
+) -> Itinerary:
+    """Derive the itinerary update for a successful tool call.
+
+    Search results echo the normalized search parameters, so they are preferred over the
+    raw arguments the model passed.
+    """
+    action, _, domain_name = tool_name.partition("_")
+    domain = _DOMAINS.get(domain_name.rstrip("s"))
+    if domain is None or result.get("status") == "error":
+        return {}
+
+    def value(key: str, arg: str | None = None) -> Any:
+        return result.get(key, args.get(arg or key))
+
+    if action == "search" and domain == "flight":
+        return {
+            "origin": value("origin"),
+            "destination": value("destination"),
+            "departure_date": value("departure_date"),
+            "return_date": value("return_date"),
+            "travellers": value("passengers"),
+        }
+    if action == "search" and domain == "hotel":
+        return {
+            "hotel_location": value("location"),
+            "check_in_date": value("check_in_date"),
+            "check_out_date": value("check_out_date"),
+            "travellers": value("guests"),
+            "rooms": value("rooms"),
+        }
+    if action == "search" and domain == "car":
+        return {
+            "car_location": value("location"),
+            "pickup_date": value("pickup_date"),
+            "dropoff_date": value("dropoff_date"),
+            "car_type": value("car_type"),
+        }
+
+    number = result.get("confirmation_number") or args.get("confirmation_number")
+    if not number:
+        return {}
+    if action == "book":
+        booking = {"domain": domain, "status": "booked", "item": value(f"{domain}_id")}
+        return {
+            "bookings": {number: {k: v for k, v in booking.items() if v is not None}}
+        }
+    if action == "cancel":
+        return {"bookings": {number: {"domain": domain, "status": "cancelled"}}}
+    if action == "change":
+        return {
+            "bookings": {
+                number: {"domain": domain, "status": "changed", **_changes(args)}
+            }
+        }
+    return {}
+
+
+def render_itinerary(itinerary: Itinerary | None) -> str:
+    """Render the itinerary as a few short lines for a system prompt."""
+    if not itinerary:
+        return ""
+    it = itinerary
+    lines: List[str] = []
+    if it.get("destination"):
+        trip = f"Flights: {it.get('origin', '?')} -> {it['destination']} departing {it.get('departure_date', '?')}"
+        if it.get("return_date"):
+            trip += f", returning {it['return_date']}"
+        lines.append(trip)
+    if it.get("hotel_location"):
+        lines.append(
+            f"Hotel: {it['hotel_location']} {it.get('check_in_date', '?')} to {it.get('check_out_date', '?')}"
+        )
+    if it.get("car_location"):
+        lines.append(
+            f"Car: {it.get('car_type') or 'car'} in {it['car_location']} {it.get('pickup_date', '?')} to {it.get('dropoff_date', '?')}"
+        )
+    if it.get("travellers"):
+        lines.append(f"Travellers: {it['travellers']}")
+    for number, booking in (it.get("bookings") or {}).items():
+        extra = ", ".join(
+            f"{k}={v}" for k, v in booking.items() if k not in ("domain", "status")
+        )
+        lines.append(
+            f"Booking {number}: {booking.get('domain', '?')} {booking.get('status', '?')}"
+            + (f" ({extra})" if extra else "")
+        )
+    return "\n".join(f"- {line}" for line in lines)
@@ -0,0 +1,452 @@
+"""Load test the Travel Master with simulated multi-turn conversations.
+
+Virtual users replay realistic conversation scripts (search, refine, book, then change
+or cancel) against the graph in-process or against a running LangGraph server. By
+default the models and the search backend are the simulated ones from
+`travel_master.simulation`, with configurable latency distributions, so a run measures
+the orchestration itself: graph execution, tool node, caches and state handling.
+`--real-models` and `--real-search` swap in the configured models and search backend.
+
+Concurrency is ramped through stages; each stage keeps its number of virtual users busy
+for a fixed time and reports throughput, turn latency percentiles, errors and the
+memory of the process. The saturation point is the last stage after which adding users
+stopped raising throughput (or pushed the p95 latency over the limit).
+
+Usage:
+    travel-master-loadtest --stages 10,100,1000 --stage-seconds 30 --model-latency lognormal:0.4,1.5
+    travel-master-loadtest --target http://localhost:2024 --stages 1,8,64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.pregel import Pregel
+
+from travel_master.profiling import profiled
+from travel_master.simulation import (
+    SIMULATED_CONFIGURABLE,
+    LatencyDistribution,
+    install,
+)
+
+if TYPE_CHECKING:
+    from langgraph_sdk.schema import Config
+
+logger = logging.getLogger(__name__)
+
+CITIES = (
+    "Paris",
+    "Rome",
+    "London",
+    "New York",
+    "Tokyo",
+    "Madrid",
+    "Berlin",
+    "Sydney",
+    "Barcelona",
+    "Amsterdam",
+)
+
+
+def _day(start: date, offset: int) -> str:
+    return (start + timedelta(days=offset)).isoformat()
+
+
+def make_script(rng: random.Random) -> List[str]:
+    """Draw the user turns of one conversation."""
+    origin, destination = rng.sample(CITIES, 2)
+    start = date.today() + timedelta(days=rng.randint(14, 180))
+    nights = rng.randint(2, 10)
+    kind = rng.choice(("flight", "flight", "hotel", "car"))
+    if kind == "flight":
+        return [
+            f"Find flights from {origin} to {destination} on {_day(start, 0)} returning {_day(start, nights)}",
+            f"What about flights from {origin} to {destination} on {_day(start, 1)} returning {_day(start, nights + 1)}",
+            "Book the cheapest flight",
+            rng.choice(
+                (f"Change my flight to {_day(start, 2)}", "Cancel my flight booking")
+            ),
+        ]
+    if kind == "hotel":
+        return [
+            f"Find a hotel in {destination} from {_day(start, 0)} to {_day(start, nights)}",
+            f"Any other hotel in {destination} from {_day(start, 0)} to {_day(start, nights - 1)}",
+            "Book that hotel",
+            rng.choice(
+                (
+                    f"Change my hotel check-in to {_day(start, 1)}",
+                    "Cancel my hotel booking",
+                )
+            ),
+        ]
+    return [
+        f"Find a rental car in {destination} from {_day(start, 0)} to {_day(start, nights)}",
+        "Book that car",
+        "Cancel my car rental",
+    ]
+
+
+class InProcessTarget:
+    """Runs conversations on a graph in this process, carrying their state between turns."""
+
+    measures_memory = True
+
+    def __init__(
+        self, graph: Pregel[Any, Any, Any, Any], configurable: Dict[str, Any]
+    ) -> None:
+        """Create a target for a compiled graph."""
+        self.graph = graph
+        self.configurable = configurable
+
+    async def start(self, conversation_id: str) -> Dict[str, Any]:
+        """Start a conversation."""
+        return {"thread_id": conversation_id, "messages": [], "itinerary": {}}
+
+    async def turn(self, session: Dict[str, Any], text: str) -> None:
+        """Run one user turn."""
+        config: RunnableConfig = {
+            "configurable": {**self.configurable, "thread_id": session["thread_id"]}
+        }
+        state = await profiled(self.graph, config).ainvoke(
+            {
+                "messages": [*session["messages"], HumanMessage(content=text)],
+                "itinerary": session["itinerary"],
+            },
+            config,
+        )
+        session["messages"] = state["messages"]
+        session["itinerary"] = state.get("itinerary") or {}
+
+
+class ServerTarget:
+    """Runs conversations as threads on a LangGraph server."""
+
+    measures_memory = False
+
+    def __init__(
+        self, url: str, assistant_id: str, configurable: Dict[str, Any]
+    ) -> None:
+        """Create a target for the server at the given URL."""
+        from langgraph_sdk import get_client
+
+        self.client = get_client(url=url)
+        self.assistant_id = assistant_id
+        self.configurable = configurable
+
+    async def start(self, conversation_id: str) -> Dict[str, Any]:
+        """Create the conversation's thread."""
+        thread = await self.client.threads.create(
+            metadata={"loadtest": conversation_id}
+        )
+        return {"thread_id": thread["thread_id"]}
+
+    async def turn(self, session: Dict[str, Any], text: str) -> None:
+        """Run one user turn and wait for it to finish."""
+        thread_id: str = session["thread_id"]
+        config: Config = {"configurable": self.configurable}
+        payload: Dict[str, Any] = {"messages": [{"role": "user", "content": text}]}
+        result = await self.client.runs.wait(
+            thread_id,
+            self.assistant_id,
+            input=payload,
+            config=config,
+        )
+        if isinstance(result, dict) and result.get("__error__"):
+            raise RuntimeError(result["__error__"])
+
+
+@dataclass
+class StageReport:
+    """The measurements of one load test stage."""
+
+    concurrency: int
+    seconds: float = 0.0
+    turns: int = 0
+    errors: int = 0
+    conversations: int = 0
+    turns_per_second: float = 0.0
+    p50_ms: float | None = None
+    p95_ms: float | None = None
+    p99_ms: float | None = None
+    max_ms: float | None = None
+    rss_mb: float | None = None
+    rss_growth_mb: float | None = None
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+
+def percentile(values: Sequence[float], q: float) -> float | None:
+    """Get the nearest-rank percentile `q` (0-100) of some values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), -(-len(ordered) * q // 100)))
+    return ordered[int(rank) - 1]
+
+
+def rss_mb() -> float:
+    """Get the resident memory of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # Peak rather than current memory where /proc is unavailable (kB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def saturation_point(
+    stages: Sequence[StageReport],
+    min_gain: float = 0.1,
+    max_p95_ms: float | None = None,
+) -> int | None:
+    """Get the concurrency beyond which throughput stopped growing by at least `min_gain`.
+
+    A stage whose p95 latency exceeds `max_p95_ms` or that had errors also counts as
+    saturated. Returns None when every stage still scaled.
+    """
+    best: StageReport | None = None
+    for stage in stages:
+        overloaded = stage.errors > 0 or (
+            max_p95_ms is not None
+            and stage.p95_ms is not None
+            and stage.p95_ms > max_p95_ms
+        )
+        if best is not None and (
+            overloaded
+            or stage.turns_per_second < best.turns_per_second * (1 + min_gain)
+        ):
+            return best.concurrency
+        if overloaded:
+            return None
+        best = stage
+    return None
+
+
+async def run_stage(
+    target: Any,
+    concurrency: int,
+    seconds: float,
+    *,
+    rng: random.Random,
+    think_time: LatencyDistribution = LatencyDistribution(),
+    baseline_rss: float | None = None,
+) -> StageReport:
+    """Keep `concurrency` virtual users in conversation for `seconds` and measure the turns.
+
+    Users finish the turn they are in when the time is up, so a stage runs slightly
+    longer than `seconds` under load.
+    """
+    report = StageReport(concurrency=concurrency)
+    started = time.perf_counter()
+    deadline = started + seconds
+    serial = 0
+
+    async def user(index: int) -> None:
+        nonlocal serial
+        while time.perf_counter() < deadline:
+            serial += 1
+            report.conversations += 1
+            try:
+                session = await target.start(f"loadtest-{concurrency}-{index}-{serial}")
+            except Exception:
+                logger.exception("Failed to start a conversation")
+                report.errors += 1
+                continue
+            for text in make_script(rng):
+                if time.perf_counter() >= deadline:
+                    return
+                turn_started = time.perf_counter()
+                try:
+                    await target.turn(session, text)
+                except Exception:
+                    logger.exception("Load test turn failed")
+                    report.errors += 1
+                    break
+                report.latencies.append(time.perf_counter() - turn_started)
+                report.turns += 1
+                if (pause := think_time.sample()) > 0:
+                    await asyncio.sleep(pause)
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    report.seconds = round(time.perf_counter() - started, 3)
+    report.turns_per_second = (
+        round(report.turns / report.seconds, 2) if report.seconds else 0.0
+    )
+    for name, q in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99), ("max_ms", 100)):
+        value = percentile(report.latencies, q)
+        setattr(report, name, None if value is None else round(value * 1000, 1))
+    if target.measures_memory:
+        gc.collect()
+        report.rss_mb = round(rss_mb(), 1)
+        if baseline_rss is not None:
+            report.rss_growth_mb = round(report.rss_mb - baseline_rss, 1)
+    return report
+
+
+async def run_load_test(
+    target: Any,
+    stages: Sequence[int],
+    stage_seconds: float,
+    *,
+    think_time: LatencyDistribution = LatencyDistribution(),
+    seed: int = 0,
+) -> List[StageReport]:
+    """Run the stages one after the other with increasing concurrency."""
+    rng = random.Random(seed)
+    gc.collect()
+    baseline = rss_mb() if target.measures_memory else None
+    reports = []
+    for concurrency in stages:
+        report = await run_stage(
+            target,
+            concurrency,
+            stage_seconds,
+            rng=rng,
+            think_time=think_time,
+            baseline_rss=baseline,
+        )
+        logger.info(
+            "Stage %s", {k: v for k, v in asdict(report).items() if k != "latencies"}
+        )
+        reports.append(report)
+    return reports
+
+
+def format_report(stages: Sequence[StageReport], saturation: int | None) -> str:
+    """Render the stage reports as a table."""
+    lines = [
+        f"{'users':>6} {'turns':>7} {'err':>5} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>8} {'growth':>7}"
+    ]
+
+    def cell(value: float | None, width: int) -> str:
+        return f"{'-' if value is None else value:>{width}}"
+
+    for s in stages:
+        lines.append(
+            f"{s.concurrency:>6} {s.turns:>7} {s.errors:>5} {s.turns_per_second:>8} {cell(s.p50_ms, 8)} "
+            f"{cell(s.p95_ms, 8)} {cell(s.p99_ms, 8)} {cell(s.rss_mb, 8)} {cell(s.rss_growth_mb, 7)}"
+        )
+    lines.append(
+        f"Saturation point: {saturation} concurrent users"
+        if saturation is not None
+        else "Saturation point: not reached"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Run a load test from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Load test the Travel Master with simulated conversations."
+    )
+    parser.add_argument(
+        "--target",
+        default="in-process",
+        help="'in-process' or the URL of a LangGraph server",
+    )
+    parser.add_argument(
+        "--assistant-id", default="travel_master", help="graph to run on a server"
+    )
+    parser.add_argument(
+        "--stages",
+        default="1,10,100,1000",
+        help="comma-separated concurrent users per stage",
+    )
+    parser.add_argument(
+        "--stage-seconds", type=float, default=30.0, help="duration of each stage"
+    )
+    parser.add_argument(
+        "--model-latency",
+        default="lognormal:0.5,1.5",
+        help="simulated model call latency",
+    )
+    parser.add_argument(
+        "--search-latency", default="lognormal:0.8,2.0", help="simulated search latency"
+    )
+    parser.add_argument(
+        "--think-time", default="fixed:0", help="pause of a user between turns"
+    )
+    parser.add_argument(
+        "--search-recording",
+        help="JSONL of recorded searches ({query, results}) to replay",
+    )
+    parser.add_argument(
+        "--real-models",
+        action="store_true",
+        help="use the configured models instead of simulated ones",
+    )
+    parser.add_argument(
+        "--real-search",
+        action="store_true",
+        help="use the configured search backend instead of the simulated one",
+    )
+    parser.add_argument(
+        "--max-p95-ms",
+        type=float,
+        help="p95 latency above which a stage counts as saturated",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the stage reports to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    configurable = {} if args.real_models else dict(SIMULATED_CONFIGURABLE)
+    if args.target == "in-process":
+        install(
+            LatencyDistribution.parse(args.model_latency),
+            LatencyDistribution.parse(args.search_latency),
+            recording_path=args.search_recording,
+            search=not args.real_search,
+        )
+        from travel_master.travel_master import graph
+
+        target: Any = InProcessTarget(graph, configurable)
+    else:
+        # Model and search latencies are those of the server's backends
+        target = ServerTarget(args.target, args.assistant_id, configurable)
+
+    stages = [int(s) for s in args.stages.split(",") if s]
+    reports = asyncio.run(
+        run_load_test(
+            target,
+            stages,
+            args.stage_seconds,
+            think_time=LatencyDistribution.parse(args.think_time),
+            seed=args.seed,
+        )
+    )
+    saturation = saturation_point(reports, max_p95_ms=args.max_p95_ms)
+    sys.stdout.write(format_report(reports, saturation) + "\n")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "stages": [
+                        {k: v for k, v in asdict(r).items() if k != "latencies"}
+                        for r in reports
+                    ],
+                    "saturation_point": saturation,
+                },
+                f,
+                indent=1,
+            )
+
+
+if __name__ == "__main__":
+    main()
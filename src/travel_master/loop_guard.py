@@ -0,0 +1,124 @@
+"""Loop detection for tool calls and per-assistant step budgets.
+
+A confused model can repeat the same tool call (typically a `search_*` call with the same
+arguments) until the recursion limit ends the turn with a generic apology. The tool node
+fingerprints every call against the calls already answered in the current turn of the
+thread: exact repeats, and near repeats that only differ in case, spacing or punctuation,
+are answered with the prior result instead of running the tool again. A call repeated
+more than `loop_max_repeats` times aborts the assistant's turn.
+
+Each assistant also has a budget of model calls per turn (`<assistant>_max_steps`),
+further limited by the turn deadline: when the time left only allows one more model
+call, that call must answer without tools (the assistants make it with
+`tool_choice="none"`). Counters of repeats and aborts are kept in
+the `loop_guard` group.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, Mapping, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+from travel_master.configuration import Configuration
+from travel_master.history import current_turn_start
+from travel_master.metrics import get_counters
+from travel_master.model_tiering import tiering_counters
+
+loop_counters = get_counters("loop_guard")
+
+_PUNCTUATION = re.compile(r"[^\w\s-]")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(_PUNCTUATION.sub(" ", value.casefold()).split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def fingerprint(name: str, args: Mapping[str, Any], near: bool = False) -> str:
+    """Fingerprint a tool call; near fingerprints ignore case, spacing and punctuation."""
+    # Arguments left as None run with the tool's defaults
+    values = {k: _normalize(v) if near else v for k, v in args.items() if v is not None}
+    return f"{name}:{json.dumps(values, sort_keys=True, default=str)}"
+
+
+@dataclass(frozen=True)
+class Repeat:
+    """A tool call that was already answered earlier in the turn."""
+
+    prior: ToolMessage
+    exact: bool
+    count: int
+    """How many times the call has been answered in the turn so far."""
+
+
+def find_repeat(
+    messages: Sequence[AnyMessage], name: str, args: Mapping[str, Any]
+) -> Repeat | None:
+    """Find the earlier successful answer to the same (or nearly the same) call in this turn."""
+    turn = messages[current_turn_start(messages) :]
+    exact, near = fingerprint(name, args), fingerprint(name, args, near=True)
+    calls: Dict[str, Tuple[str, str]] = {}
+    for message in turn:
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                if call["name"] == name and call["id"]:
+                    calls[call["id"]] = (
+                        fingerprint(name, call["args"]),
+                        fingerprint(name, call["args"], near=True),
+                    )
+    prior: ToolMessage | None = None
+    is_exact, count = False, 0
+    for message in turn:
+        if not isinstance(message, ToolMessage) or message.status == "error":
+            continue
+        fingerprints = calls.get(message.tool_call_id)
+        if fingerprints is None or fingerprints[1] != near:
+            continue
+        count += 1
+        prior = prior or message
+        is_exact = is_exact or fingerprints[0] == exact
+    if prior is None:
+        return None
+    return Repeat(prior, is_exact, count)
+
+
+def mean_step_seconds(configuration: Configuration) -> float:
+    """Estimate the duration of one assistant step from the sub-assistant model latencies seen so far."""
+    calls = tiering_counters.get("sub_assistant.calls")
+    if not calls:
+        return configuration.assistant_step_seconds
+    return tiering_counters.get("sub_assistant.latency_seconds") / calls
+
+
+def step_limit(
+    messages: Sequence[AnyMessage],
+    tool_names: Collection[str],
+    max_steps: int,
+    configuration: Configuration,
+) -> str | None:
+    """Check whether the model call an assistant is making is its last one this turn.
+
+    Returns:
+        Optional[str]: "steps" when the assistant's step budget is used up, "deadline"
+        when the turn deadline leaves no time for another call, else None.
+    """
+    turn = messages[current_turn_start(messages) :]
+    used = sum(
+        1
+        for m in turn
+        if isinstance(m, AIMessage)
+        and any(call["name"] in tool_names for call in m.tool_calls)
+    )
+    if used + 1 >= max_steps:
+        return "steps"
+    remaining = configuration.seconds_until_deadline()
+    if remaining is not None and remaining < 2 * mean_step_seconds(configuration):
+        return "deadline"
+    return None
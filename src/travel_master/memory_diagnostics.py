@@ -0,0 +1,259 @@
+"""Memory diagnostics for long-lived worker processes.
+
+`MemoryDiagnostics` traces allocations with `tracemalloc` and periodically snapshots
+them, grouping traced memory by the package that allocated it (`travel_master`,
+LangChain/LangGraph, aiohttp/httpx, ...) and logging the growth of each group since the
+previous snapshot. It can also track the conversation states a process keeps in memory,
+reporting how many messages and characters they hold and which threads are largest.
+
+The full report, including the allocation sites that grew most since tracing started,
+is available on demand: logged on a signal (`install_signal`, SIGUSR1 by default) or
+served as JSON by a local HTTP endpoint (`serve`).
+
+Tracing slows allocations down noticeably, so diagnostics are off unless started, e.g.
+with `WorkerPool(memory_diagnostics=True)`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from travel_master.utils import get_message_text
+
+logger = logging.getLogger(__name__)
+
+# Traced memory is attributed to the first group whose package appears in the file path
+MODULE_GROUPS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("travel_master", ("travel_master",)),
+    (
+        "langchain",
+        (
+            "langchain",
+            "langchain_core",
+            "langchain_community",
+            "langchain_openai",
+            "langgraph",
+            "langsmith",
+        ),
+    ),
+    ("http", ("aiohttp", "httpx", "httpcore", "openai", "tavily")),
+    ("pydantic", ("pydantic", "pydantic_core")),
+)
+
+
+def module_group(filename: str) -> str:
+    """Get the group of the package a source file belongs to."""
+    parts = filename.replace("\\", "/").split("/")
+    for group, packages in MODULE_GROUPS:
+        if any(package in parts for package in packages):
+            return group
+    return "other"
+
+
+def group_sizes(snapshot: tracemalloc.Snapshot) -> Dict[str, int]:
+    """Sum the traced bytes of a snapshot by module group."""
+    sizes: Dict[str, int] = {}
+    for stat in snapshot.statistics("filename"):
+        group = module_group(stat.traceback[0].filename)
+        sizes[group] = sizes.get(group, 0) + stat.size
+    return sizes
+
+
+def thread_state_size(state: Mapping[str, Any]) -> Tuple[int, int]:
+    """Get the number of messages and of message characters in a conversation state."""
+    messages = state.get("messages") or []
+    return len(messages), sum(len(get_message_text(m)) for m in messages)
+
+
+class MemoryDiagnostics:
+    """Periodic tracemalloc snapshots, grouped by module, with on-demand reports."""
+
+    def __init__(
+        self, interval_seconds: float = 300.0, frames: int = 1, top: int = 15
+    ) -> None:
+        """Configure diagnostics; tracing starts with `start()`.
+
+        Args:
+            interval_seconds: Time between periodic snapshots.
+            frames: Stack frames recorded per allocation; more frames give better
+                attribution at a higher tracing cost.
+            top: Number of allocation sites in the top diffs.
+        """
+        self.interval_seconds = interval_seconds
+        self.frames = frames
+        self.top = top
+        self.baseline: tracemalloc.Snapshot | None = None
+        self.baseline_groups: Dict[str, int] = {}
+        self.last_groups: Dict[str, int] = {}
+        self.history: List[Dict[str, Any]] = []
+        self._states: Mapping[str, Mapping[str, Any]] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._server: ThreadingHTTPServer | None = None
+        self._started_tracing = False
+
+    def start(self) -> None:
+        """Start tracing and the periodic snapshots."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self.baseline = self._snapshot()
+        self.baseline_groups = self.last_groups = group_sizes(self.baseline)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="memory-diagnostics"
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the snapshots, the endpoint and, if it was started here, tracing."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def track_states(self, states: Mapping[str, Mapping[str, Any]]) -> None:
+        """Report on the conversation states held in a mapping of thread ID to state."""
+        self._states = states
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+
+    def sample(self) -> Dict[str, Any]:
+        """Take a snapshot and record the traced bytes per group and their growth."""
+        groups = group_sizes(self._snapshot())
+        record = {
+            "time": time.time(),
+            "groups": groups,
+            "growth": {
+                g: size - self.last_groups.get(g, 0) for g, size in groups.items()
+            },
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+        }
+        self.last_groups = groups
+        self.history.append(record)
+        del self.history[:-100]
+        return record
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            record = self.sample()
+            logger.info(
+                "Traced memory by module (growth since last snapshot): %s",
+                ", ".join(
+                    f"{g}={s / 2**20:.1f}MB ({record['growth'][g] / 2**20:+.2f})"
+                    for g, s in sorted(record["groups"].items())
+                ),
+            )
+
+    def top_diffs(self, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Get the allocation sites whose traced memory grew most since tracing started."""
+        if self.baseline is None:
+            return []
+        stats = self._snapshot().compare_to(self.baseline, "lineno")
+        return [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "group": module_group(stat.traceback[0].filename),
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[: limit or self.top]
+            if stat.size_diff > 0
+        ]
+
+    def state_report(self, largest: int = 5) -> Dict[str, Any]:
+        """Summarize the tracked conversation states."""
+        if self._states is None:
+            return {}
+        sizes = {
+            thread_id: thread_state_size(state)
+            for thread_id, state in list(self._states.items())
+        }
+        return {
+            "threads": len(sizes),
+            "messages": sum(m for m, _ in sizes.values()),
+            "characters": sum(c for _, c in sizes.values()),
+            "largest": [
+                {"thread_id": thread_id, "messages": m, "characters": c}
+                for thread_id, (m, c) in sorted(
+                    sizes.items(), key=lambda item: item[1][1], reverse=True
+                )[:largest]
+            ],
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Get the current memory report."""
+        record = self.sample()
+        return {
+            "pid": os.getpid(),
+            "traced_bytes": record["traced_bytes"],
+            "groups": record["groups"],
+            "group_growth_since_start": {
+                g: size - self.baseline_groups.get(g, 0)
+                for g, size in record["groups"].items()
+            },
+            "top_diffs": self.top_diffs(),
+            "thread_states": self.state_report(),
+        }
+
+    def install_signal(
+        self, signum: int = getattr(signal, "SIGUSR1", signal.SIGTERM)
+    ) -> None:
+        """Log the report when the process receives a signal (main thread only)."""
+        signal.signal(
+            signum,
+            lambda *_: logger.info("Memory report: %s", json.dumps(self.report())),
+        )
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """Serve the report as JSON on a local HTTP endpoint and return its port."""
+        diagnostics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                body = json.dumps(diagnostics.report(), indent=1).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(
+            target=self._server.serve_forever,
+            daemon=True,
+            name="memory-diagnostics-http",
+        ).start()
+        return self._server.server_address[1]
+
+
+def format_sizes(sizes: Mapping[str, int], groups: Sequence[str] = ()) -> str:
+    """Render byte sizes per group in MB."""
+    return ", ".join(
+        f"{g}={sizes.get(g, 0) / 2**20:.2f}MB" for g in (groups or sorted(sizes))
+    )
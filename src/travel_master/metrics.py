@@ -0,0 +1,57 @@
+"""Lightweight in-process counters for runtime diagnostics."""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Counters:
+    """A thread-safe group of named numeric counters."""
+
+    def __init__(self, namespace: str) -> None:
+        """Create an empty counter group for the given namespace."""
+        self.namespace = namespace
+        self._values: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: float = 1.0) -> None:
+        """Increment a counter by the given amount."""
+        with self._lock:
+            self._values[name] += amount
+
+    def get(self, name: str) -> float:
+        """Get the current value of a counter (0 if it was never incremented)."""
+        with self._lock:
+            return self._values.get(name, 0.0)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Get a copy of all counters in this group."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """Reset all counters in this group."""
+        with self._lock:
+            self._values.clear()
+
+
+_REGISTRY: Dict[str, Counters] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_counters(namespace: str) -> Counters:
+    """Get (or create) the counter group registered under a namespace."""
+    with _REGISTRY_LOCK:
+        counters = _REGISTRY.get(namespace)
+        if counters is None:
+            counters = _REGISTRY[namespace] = Counters(namespace)
+        return counters
+
+
+def snapshot_all() -> Dict[str, Dict[str, float]]:
+    """Get a snapshot of every registered counter group."""
+    with _REGISTRY_LOCK:
+        groups = list(_REGISTRY.values())
+    return {group.namespace: group.snapshot() for group in groups}
@@ -0,0 +1,480 @@
+"""Cost- and latency-aware selection of the chat model for each call.
+
+`TieredChatModel` stands in for a concrete chat model in the supervisor and the
+sub-assistants. On every call it resolves the active `Configuration`, extracts a few
+cheap features of the conversation (turn complexity, history size, whether tools are
+likely, remaining turn deadline) and routes the call to either the role's default model
+or the configured small model. Async calls (and streams whose first chunk does not come
+in time) that exceed the timeout are retried once on the fallback model; a blocking sync
+call cannot be abandoned, so sync calls have no timeout. Per-tier call, latency, timeout
+and cost counters are recorded so the policy thresholds can be tuned, as well as per-role
+call and latency counters (`<role>.calls`, `<role>.latency_seconds`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Sequence,
+    Tuple,
+)
+
+from langchain_core.callbacks import (
+    AsyncCallbackManager,
+    AsyncCallbackManagerForLLMRun,
+    CallbackManager,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    BaseMessageChunk,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+from langgraph.constants import TAG_NOSTREAM
+from pydantic import PrivateAttr
+
+from travel_master.configuration import Configuration
+from travel_master.metrics import get_counters
+from travel_master.utils import get_message_text, load_chat_model
+
+Role = Literal["supervisor", "sub_assistant"]
+Tier = Literal["small", "default", "fallback"]
+
+# USD per million (input, output) tokens, used for the per-tier cost counters
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_CONFIRMATION_REPLY = re.compile(
+    r"^\s*(yes|yeah|yep|y|no|nope|ok|okay|sure|confirm(ed)?|go ahead|please do|"
+    r"do it|thanks?|thank you|cheers|correct|that'?s (right|correct|fine))\b",
+    re.IGNORECASE,
+)
+_TOOL_HINTS = re.compile(
+    r"\b(search|find|look ?up|book|reserve|cancel|change|modify|reschedule|"
+    r"flights?|hotels?|car|rental|price|available|availability)\b",
+    re.IGNORECASE,
+)
+_BOOKING_IDENTIFIER = re.compile(r"\b(?:FL|HT|CR)\d{6}\b", re.IGNORECASE)
+_DOMAINS = {
+    "flight": re.compile(r"\b(flights?|fly|airline|airport)\b", re.IGNORECASE),
+    "hotel": re.compile(
+        r"\b(hotels?|accommodation|stay|room|lodging)\b", re.IGNORECASE
+    ),
+    "car": re.compile(r"\b(car|rental|vehicle|drive)\b", re.IGNORECASE),
+}
+
+tiering_counters = get_counters("model_tiering")
+
+# The config of the call being generated; `_generate` does not receive it directly
+_call_config: ContextVar[RunnableConfig | None] = ContextVar(
+    "_call_config", default=None
+)
+
+
+@dataclass(frozen=True)
+class TurnFeatures:
+    """Cheap features of a model call used by the tiering policy."""
+
+    words: int
+    domains: int
+    history_tokens: int
+    tools_likely: bool
+    confirmation_reply: bool
+    after_tool_result: bool
+    remaining_seconds: float | None
+
+
+def extract_features(
+    messages: Sequence[BaseMessage], configuration: Configuration
+) -> TurnFeatures:
+    """Extract the tiering features of a model call."""
+    last_human = next(
+        (m for m in reversed(messages) if isinstance(m, HumanMessage)), None
+    )
+    text = get_message_text(last_human) if last_human else ""
+    return TurnFeatures(
+        words=len(text.split()),
+        domains=sum(1 for pattern in _DOMAINS.values() if pattern.search(text)),
+        history_tokens=count_tokens_approximately(messages),
+        tools_likely=bool(_TOOL_HINTS.search(text) or _BOOKING_IDENTIFIER.search(text)),
+        confirmation_reply=bool(_CONFIRMATION_REPLY.match(text))
+        and len(text.split()) <= 6,
+        after_tool_result=bool(messages) and isinstance(messages[-1], ToolMessage),
+        remaining_seconds=configuration.seconds_until_deadline(),
+    )
+
+
+def choose_tier(
+    features: TurnFeatures, role: Role, configuration: Configuration
+) -> Tier:
+    """Pick the model tier for a call.
+
+    The small tier handles calls that are cheap to get right: turns under deadline
+    pressure, the supervisor relaying a finished assistant answer, short confirmation
+    replies, and short small-talk turns. Large histories, multi-domain requests and turns
+    that are likely to need tool calls stay on the default model.
+    """
+    remaining = features.remaining_seconds
+    if (
+        remaining is not None
+        and remaining < configuration.tiering_deadline_pressure_seconds
+    ):
+        return "small"
+    if role == "supervisor" and features.after_tool_result:
+        return "small"
+    if features.history_tokens > configuration.tiering_max_small_history_tokens:
+        return "default"
+    if features.confirmation_reply:
+        return "small"
+    if features.tools_likely or features.domains > 1:
+        return "default"
+    if features.words <= configuration.tiering_simple_max_words:
+        return "small"
+    return "default"
+
+
+def estimate_cost(model_name: str, message: BaseMessage) -> float:
+    """Estimate the USD cost of a response from its token usage."""
+    usage: UsageMetadata | None = getattr(message, "usage_metadata", None)
+    prices = MODEL_PRICES.get(model_name.split("/", 1)[-1])
+    if not usage or not prices:
+        return 0.0
+    return (
+        usage["input_tokens"] * prices[0] + usage["output_tokens"] * prices[1]
+    ) / 1_000_000
+
+
+class TieredChatModel(BaseChatModel):
+    """A chat model that routes each call to a model tier chosen per call."""
+
+    role: Role
+    tools: List[Any] = []
+    tool_kwargs: Dict[str, Any] = {}
+
+    _bound: Dict[str, Runnable[Any, BaseMessage]] = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "tiered"
+
+    def bind_tools(
+        self,
+        tools: Sequence[Any],
+        *,
+        parallel_tool_calls: bool | None = None,
+        **kwargs: Any,
+    ) -> TieredChatModel:
+        """Bind tools to every tier this model routes to.
+
+        Tools whose metadata sets `parallel_tool_calls` are only offered on calls made with
+        the `parallel_tool_calls` configuration.
+        """
+        if parallel_tool_calls is not None:
+            kwargs["parallel_tool_calls"] = parallel_tool_calls
+        bound = self.model_copy(update={"tools": list(tools), "tool_kwargs": kwargs})
+        bound._bound = {}
+        return bound
+
+    def invoke(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> AIMessage:
+        """Invoke the model, making the call's config visible to the tier selection."""
+        token = _call_config.set(ensure_config(config))
+        try:
+            return super().invoke(input, config, stop=stop, **kwargs)
+        finally:
+            _call_config.reset(token)
+
+    async def ainvoke(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> AIMessage:
+        """Invoke the model, making the call's config visible to the tier selection."""
+        token = _call_config.set(ensure_config(config))
+        try:
+            return await super().ainvoke(input, config, stop=stop, **kwargs)
+        finally:
+            _call_config.reset(token)
+
+    def stream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> Iterator[AIMessageChunk]:
+        """Stream the model, making the call's config visible to the tier selection."""
+        token = _call_config.set(ensure_config(config))
+        try:
+            yield from super().stream(input, config, stop=stop, **kwargs)
+        finally:
+            _call_config.reset(token)
+
+    async def astream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[AIMessageChunk]:
+        """Stream the model, making the call's config visible to the tier selection."""
+        token = _call_config.set(ensure_config(config))
+        try:
+            async for chunk in super().astream(input, config, stop=stop, **kwargs):
+                yield chunk
+        finally:
+            _call_config.reset(token)
+
+    def _configuration(self) -> Configuration:
+        return Configuration.from_runnable_config(_call_config.get() or ensure_config())
+
+    def default_model_name(self, configuration: Configuration) -> str:
+        """Get the configured model for this role."""
+        if self.role == "supervisor":
+            return configuration.supervisor_model
+        return configuration.sub_assistant_model
+
+    def select(
+        self, messages: Sequence[BaseMessage], configuration: Configuration
+    ) -> Tuple[Tier, str]:
+        """Choose the tier and model name for a call."""
+        default = self.default_model_name(configuration)
+        if not configuration.enable_model_tiering:
+            return "default", default
+        tier = choose_tier(
+            extract_features(messages, configuration), self.role, configuration
+        )
+        return tier, configuration.small_model if tier == "small" else default
+
+    def _model(
+        self, name: str, configuration: Configuration
+    ) -> Runnable[Any, BaseMessage]:
+        parallel = configuration.parallel_tool_calls
+        key = f"{name}:{'parallel' if parallel else 'serial'}"
+        model = self._bound.get(key)
+        if model is None:
+            chat_model = load_chat_model(name)
+            model = chat_model
+            tools = [
+                t
+                for t in self.tools
+                if parallel
+                or not (getattr(t, "metadata", None) or {}).get("parallel_tool_calls")
+            ]
+            if tools:
+                tool_kwargs = dict(self.tool_kwargs)
+                # The supervisor's tool node ends the step at the first handoff, so it fans
+                # out through a single handoff call instead; only some providers take the flag
+                if (
+                    "parallel_tool_calls"
+                    in inspect.signature(chat_model.bind_tools).parameters
+                ):
+                    tool_kwargs["parallel_tool_calls"] = (
+                        parallel and self.role == "sub_assistant"
+                    )
+                model = chat_model.bind_tools(tools, **tool_kwargs)
+            self._bound[key] = model
+        return model
+
+    def _record(
+        self, tier: Tier, name: str, started: float, response: BaseMessage
+    ) -> None:
+        seconds = time.perf_counter() - started
+        tiering_counters.incr(f"{tier}.calls")
+        tiering_counters.incr(f"{tier}.latency_seconds", seconds)
+        tiering_counters.incr(f"{tier}.cost_usd", estimate_cost(name, response))
+        tiering_counters.incr(f"{self.role}.calls")
+        tiering_counters.incr(f"{self.role}.latency_seconds", seconds)
+
+    @staticmethod
+    def _timeout(configuration: Configuration) -> float:
+        timeout = configuration.model_call_timeout_seconds
+        remaining = configuration.seconds_until_deadline()
+        if remaining is not None:
+            timeout = max(min(timeout, remaining), 1.0)
+        return timeout
+
+    @staticmethod
+    def _child_config(
+        run_manager: CallbackManagerForLLMRun | AsyncCallbackManagerForLLMRun | None,
+    ) -> RunnableConfig | None:
+        if run_manager is None:
+            # Streams get no run manager (BaseChatModel.astream does not pass it on): hand the
+            # call's callbacks to the inner run as they are
+            call_config = _call_config.get()
+            if not call_config or not call_config.get("callbacks"):
+                return None
+            return {"callbacks": call_config["callbacks"], "tags": [TAG_NOSTREAM]}
+        # LLM run managers have no get_child(); this is what ParentRunManager.get_child does
+        child = (
+            AsyncCallbackManager
+            if isinstance(run_manager, AsyncCallbackManagerForLLMRun)
+            else CallbackManager
+        )(handlers=[], parent_run_id=run_manager.run_id)
+        child.set_handlers(run_manager.inheritable_handlers)
+        child.add_tags(run_manager.inheritable_tags)
+        child.add_metadata(run_manager.inheritable_metadata)
+        # The tiered model's own run streams the tokens; the inner run must not repeat them
+        child.add_tags([TAG_NOSTREAM], inherit=False)
+        return {"callbacks": child}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        configuration = self._configuration()
+        tier, name = self.select(messages, configuration)
+        started = time.perf_counter()
+        # No timeout or fallback: a blocking call cannot be abandoned
+        response = self._model(name, configuration).invoke(
+            messages, self._child_config(run_manager), stop=stop, **kwargs
+        )
+        self._record(tier, name, started, response)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        configuration = self._configuration()
+        tier, name = self.select(messages, configuration)
+        started = time.perf_counter()
+        response: BaseMessageChunk | None = None
+        for chunk in self._model(name, configuration).stream(
+            messages, self._child_config(run_manager), stop=stop, **kwargs
+        ):
+            message = _as_chunk(chunk)
+            response = message if response is None else response + message
+            yield ChatGenerationChunk(message=message)
+        if response is not None:
+            self._record(tier, name, started, response)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        configuration = self._configuration()
+        tier, name = self.select(messages, configuration)
+        config = self._child_config(run_manager)
+        started = time.perf_counter()
+        stream = self._model(name, configuration).astream(
+            messages, config, stop=stop, **kwargs
+        )
+        try:
+            # Only the wait for the first chunk is bounded; a started answer is not thrown away
+            chunk = await asyncio.wait_for(
+                anext(stream, None), self._timeout(configuration)
+            )
+        except TimeoutError:
+            tiering_counters.incr(f"{tier}.timeouts")
+            tier, name = "fallback", configuration.fallback_model
+            started = time.perf_counter()
+            stream = self._model(name, configuration).astream(
+                messages, config, stop=stop, **kwargs
+            )
+            chunk = await anext(stream, None)
+        response: BaseMessageChunk | None = None
+        while chunk is not None:
+            message = _as_chunk(chunk)
+            response = message if response is None else response + message
+            yield ChatGenerationChunk(message=message)
+            chunk = await anext(stream, None)
+        if response is not None:
+            self._record(tier, name, started, response)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        configuration = self._configuration()
+        tier, name = self.select(messages, configuration)
+        config = self._child_config(run_manager)
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self._model(name, configuration).ainvoke(
+                    messages, config, stop=stop, **kwargs
+                ),
+                self._timeout(configuration),
+            )
+        except TimeoutError:
+            tiering_counters.incr(f"{tier}.timeouts")
+            tier, name = "fallback", configuration.fallback_model
+            started = time.perf_counter()
+            response = await self._model(name, configuration).ainvoke(
+                messages, config, stop=stop, **kwargs
+            )
+        self._record(tier, name, started, response)
+        if not isinstance(response, AIMessage):
+            response = AIMessage(content=response.content)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+
+def _as_chunk(message: BaseMessage) -> BaseMessageChunk:
+    if isinstance(message, BaseMessageChunk):
+        return message
+    return AIMessageChunk(content=message.content)
+
+
+def tier_report() -> Dict[str, Dict[str, float]]:
+    """Summarize calls, mean latency, timeouts and cost per tier."""
+    snapshot = tiering_counters.snapshot()
+    report: Dict[str, Dict[str, float]] = {}
+    for tier in ("small", "default", "fallback"):
+        calls = snapshot.get(f"{tier}.calls", 0.0)
+        report[tier] = {
+            "calls": calls,
+            "mean_latency_seconds": snapshot.get(f"{tier}.latency_seconds", 0.0) / calls
+            if calls
+            else 0.0,
+            "timeouts": snapshot.get(f"{tier}.timeouts", 0.0),
+            "cost_usd": snapshot.get(f"{tier}.cost_usd", 0.0),
+        }
+    return report
@@ -0,0 +1,133 @@
+"""Speculative prefetching of the searches a user is likely to ask for next.
+
+After a flight search, the next turns are usually a hotel search and then a car search
+for the same destination and dates. When enabled, the prefetcher warms the search cache
+for those queries in the background so the follow-up tool calls are served from cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Set
+
+from travel_master.configuration import Configuration
+from travel_master.metrics import get_counters
+from travel_master.search_cache import SearchCache, search_cache
+
+
+class SearchPrefetcher:
+    """Warms the search cache for likely follow-up searches.
+
+    Prefetching is bounded by a concurrency cap (extra prefetches are skipped rather than
+    queued, since a late warm-up is worthless) and a rolling per-minute budget of
+    backend calls.
+    """
+
+    def __init__(self, cache: SearchCache = search_cache) -> None:
+        """Create a prefetcher in front of a search cache."""
+        self.cache = cache
+        self.counters = get_counters("prefetch")
+        self._in_flight = 0
+        self._recent: Deque[float] = deque()
+        self._tasks: Set[asyncio.Task[Any]] = set()
+
+    def prefetch_after_flight_search(
+        self,
+        *,
+        destination: str,
+        departure_date: str,
+        return_date: str | None,
+        passengers: int,
+        configuration: Configuration,
+    ) -> int:
+        """Schedule the hotel and car searches matching a completed flight search.
+
+        Only round trips are prefetched, since the return date is needed as the
+        check-out and drop-off date. The hotel search is prefetched as `search_hotels`
+        builds it with its default guests and, when the passengers differ, for them too.
+
+        Returns:
+            int: The number of prefetches scheduled.
+        """
+        if not return_date:
+            return 0
+
+        # Imported lazily: the tool modules import this module
+        from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+            build_hotel_search_query,
+        )
+        from travel_master.car_rental_assistant.car_rental_assistant_tools import (
+            build_car_search_query,
+        )
+
+        queries = dict.fromkeys(
+            [
+                build_hotel_search_query(destination, departure_date, return_date),
+                build_car_search_query(destination, departure_date, return_date),
+                build_hotel_search_query(
+                    destination, departure_date, return_date, guests=max(passengers, 1)
+                ),
+            ]
+        )
+        scheduled = 0
+        for query in queries:
+            if self.schedule(query, configuration):
+                scheduled += 1
+        return scheduled
+
+    def schedule(self, query: str, configuration: Configuration) -> bool:
+        """Schedule a single background search if the caps allow it."""
+        max_results = configuration.max_search_results
+        if self.cache.make_key(query, max_results) in self.cache:
+            self.counters.incr("skipped_cached")
+            return False
+        if self._in_flight >= configuration.search_prefetch_max_concurrency:
+            self.counters.incr("skipped_concurrency")
+            return False
+        if not self._take_budget(configuration.search_prefetch_budget_per_minute):
+            self.counters.incr("skipped_budget")
+            return False
+
+        self._in_flight += 1
+        self.counters.incr("scheduled")
+        task = asyncio.create_task(
+            self._run(query, max_results, configuration.search_cache_ttl_seconds)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, query: str, max_results: int, ttl: float) -> None:
+        try:
+            await self.cache.search(query, max_results, ttl, prefetched=True)
+            self.counters.incr("completed")
+        except Exception:
+            self.counters.incr("failed")
+        finally:
+            self._in_flight -= 1
+
+    def _take_budget(self, budget_per_minute: int) -> bool:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 60:
+            self._recent.popleft()
+        if len(self._recent) >= budget_per_minute:
+            return False
+        self._recent.append(now)
+        return True
+
+    async def drain(self) -> None:
+        """Wait for all scheduled prefetches to finish."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def hit_ratio(self) -> float:
+        """Get the fraction of completed prefetches later used by a real search."""
+        completed = self.counters.get("completed")
+        if not completed:
+            return 0.0
+        return self.cache.counters.get("prefetch_hits") / completed
+
+
+prefetcher = SearchPrefetcher()
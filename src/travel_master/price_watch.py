@@ -0,0 +1,275 @@
+"""Background price watches for flight and hotel searches.
+
+A watch is created from the parameters of a `search_flights` or `search_hotels` call and
+persisted to a JSON file. The scheduler periodically re-runs the searches: watches that
+share a normalized query are grouped so each distinct search runs once per interval,
+and the distinct searches run with bounded concurrency. Each run goes to the search
+backend (a cached result would hold the previous run's prices), and its results are
+stored in the search cache for the user searches in between. After each run every
+watch holds its latest lowest price and the precomputed difference to the price it was
+created with, so reporting a price drop needs no further work.
+
+Usage:
+    python -m travel_master.price_watch watches.json --interval 3600
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Literal, Mapping
+
+from travel_master.gazetteer import normalize_location
+from travel_master.metrics import get_counters
+from travel_master.pricing import min_price
+from travel_master.search_cache import SearchCache, search_cache
+
+logger = logging.getLogger(__name__)
+
+WatchKind = Literal["flight", "hotel"]
+
+
+@dataclass
+class PriceWatch:
+    """A persisted watch on the price of a flight or hotel search."""
+
+    id: str
+    kind: WatchKind
+    params: Dict[str, Any]
+    query: str
+    currency: str = "USD"
+    created_at: float = field(default_factory=time.time)
+    baseline_price: float | None = None
+    last_price: float | None = None
+    last_checked: float | None = None
+    min_price_diff: float | None = None
+    """The latest lowest price minus the baseline; negative when the price dropped."""
+    active: bool = True
+
+
+def build_watch_query(kind: WatchKind, params: Mapping[str, Any]) -> str:
+    """Build the normalized search query of a watch from search tool arguments."""
+    if kind == "flight":
+        from travel_master.flight_assistant.flight_assistant_tools import (
+            build_flight_search_query,
+        )
+
+        return build_flight_search_query(
+            normalize_location(params["origin"]),
+            normalize_location(params["destination"]),
+            params["departure_date"],
+            params.get("return_date"),
+            params.get("passengers", 1),
+        )
+    from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+        build_hotel_search_query,
+    )
+
+    return build_hotel_search_query(
+        normalize_location(params["location"]),
+        params["check_in_date"],
+        params["check_out_date"],
+        params.get("guests", 2),
+        params.get("rooms", 1),
+        params.get("accommodation_type", "hotel"),
+    )
+
+
+class WatchStore:
+    """Price watches persisted to a JSON file, rewritten atomically on every change."""
+
+    def __init__(self, path: str) -> None:
+        """Load the watches stored at the given path, if any."""
+        self.path = path
+        self._lock = threading.Lock()
+        self.watches: Dict[str, PriceWatch] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for record in json.load(f):
+                    self.watches[record["id"]] = PriceWatch(**record)
+
+    def save(self) -> None:
+        """Write all watches to disk."""
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump([asdict(w) for w in self.watches.values()], f, indent=1)
+            os.replace(tmp, self.path)
+
+    def create(
+        self,
+        kind: WatchKind,
+        params: Mapping[str, Any],
+        baseline_price: float | None = None,
+        currency: str = "USD",
+    ) -> PriceWatch:
+        """Create and persist a watch from `search_flights`/`search_hotels` arguments."""
+        watch = PriceWatch(
+            id=uuid.uuid4().hex[:12],
+            kind=kind,
+            params=dict(params),
+            query=build_watch_query(kind, params),
+            currency=currency,
+            baseline_price=baseline_price,
+        )
+        self.watches[watch.id] = watch
+        self.save()
+        return watch
+
+    def cancel(self, watch_id: str) -> None:
+        """Deactivate a watch."""
+        self.watches[watch_id].active = False
+        self.save()
+
+    def active(self) -> List[PriceWatch]:
+        """Get the active watches."""
+        return [w for w in self.watches.values() if w.active]
+
+
+class PriceWatchScheduler:
+    """Re-runs the searches behind active watches in grouped, bounded batches."""
+
+    def __init__(
+        self,
+        store: WatchStore,
+        *,
+        cache: SearchCache = search_cache,
+        interval_seconds: float = 3600.0,
+        max_concurrency: int = 4,
+        max_results: int = 10,
+    ) -> None:
+        """Create a scheduler for the watches in a store."""
+        self.store = store
+        self.cache = cache
+        self.interval_seconds = interval_seconds
+        self.max_concurrency = max_concurrency
+        self.max_results = max_results
+        self.counters = get_counters("price_watch")
+
+    def groups(self) -> Dict[str, List[PriceWatch]]:
+        """Group the active watches by the cache key of their query."""
+        grouped: Dict[str, List[PriceWatch]] = defaultdict(list)
+        for watch in self.store.active():
+            grouped[self.cache.make_key(watch.query, self.max_results)].append(watch)
+        return grouped
+
+    async def run_once(self) -> List[PriceWatch]:
+        """Run each distinct search once and update its watches.
+
+        Returns:
+            List[PriceWatch]: The watches whose price dropped below their baseline.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def check(watches: List[PriceWatch]) -> None:
+            async with semaphore:
+                try:
+                    # Always fresh; a TTL of one interval lets user searches in between reuse it
+                    results = await self.cache.search(
+                        watches[0].query,
+                        self.max_results,
+                        self.interval_seconds,
+                        refresh=True,
+                    )
+                except Exception:
+                    logger.exception("Price watch search failed: %s", watches[0].query)
+                    self.counters.incr("failed_searches")
+                    return
+            self.counters.incr("searches")
+            now = time.time()
+            for watch in watches:
+                price = min_price(results, watch.currency)
+                watch.last_checked = now
+                if price is None:
+                    continue
+                if watch.baseline_price is None:
+                    watch.baseline_price = price
+                watch.last_price = price
+                watch.min_price_diff = round(price - watch.baseline_price, 2)
+
+        groups = self.groups()
+        self.counters.incr("watches_checked", sum(len(w) for w in groups.values()))
+        await asyncio.gather(*(check(watches) for watches in groups.values()))
+        self.store.save()
+        dropped = [w for w in self.store.active() if (w.min_price_diff or 0) < 0]
+        self.counters.incr("price_drops", len(dropped))
+        return dropped
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Summarize every active watch with its precomputed price difference."""
+        return [
+            {
+                "id": w.id,
+                "kind": w.kind,
+                "query": w.query,
+                "baseline_price": w.baseline_price,
+                "last_price": w.last_price,
+                "min_price_diff": w.min_price_diff,
+                "currency": w.currency,
+                "last_checked": w.last_checked,
+            }
+            for w in self.store.active()
+        ]
+
+    async def run_forever(self, stop: asyncio.Event | None = None) -> None:
+        """Run the watches every interval until `stop` is set."""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            started = time.monotonic()
+            for watch in await self.run_once():
+                logger.info(
+                    "Price drop for watch %s: %s %s (%+.2f)",
+                    watch.id,
+                    watch.last_price,
+                    watch.currency,
+                    watch.min_price_diff,
+                )
+            remaining = self.interval_seconds - (time.monotonic() - started)
+            try:
+                await asyncio.wait_for(stop.wait(), max(remaining, 0))
+            except TimeoutError:
+                pass
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Run the price watch scheduler from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Re-run the searches behind persisted price watches."
+    )
+    parser.add_argument("store", help="JSON file of price watches")
+    parser.add_argument(
+        "--interval", type=float, default=3600.0, help="seconds between runs"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="searches run at the same time"
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="run the watches once and exit"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    scheduler = PriceWatchScheduler(
+        WatchStore(args.store),
+        interval_seconds=args.interval,
+        max_concurrency=args.concurrency,
+    )
+    if args.once:
+        asyncio.run(scheduler.run_once())
+        logger.info("Watches: %s", json.dumps(scheduler.report()))
+    else:
+        asyncio.run(scheduler.run_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Extraction of prices from web search results."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, List
+
+_SYMBOLS = {"$": "USD", "US$": "USD", "€": "EUR", "£": "GBP", "A$": "AUD", "¥": "JPY"}
+
+_PRICE = re.compile(
+    r"(?P<symbol>US\$|A\$|[$€£¥])\s?(?P<amount>\d{1,3}(?:,\d{3})+|\d+)(?P<cents>\.\d{1,2})?"
+    r"|(?P<code>USD|EUR|GBP|AUD|JPY)\s?(?P<amount2>\d{1,3}(?:,\d{3})+|\d+)(?P<cents2>\.\d{1,2})?",
+)
+
+
+# What a price is quoted for, from the words right after (or "total" right before) it
+_UNIT_AFTER = re.compile(
+    r"\s*(?:/\s*|per\s+|a\s+|an\s+|each\s+)?(?P<unit>night|day|person|passenger|pp)\b|\s*(?P<rate>nightly|daily)\b",
+    re.IGNORECASE,
+)
+_TOTAL_BEFORE = re.compile(
+    r"\btotal(?:\s+(?:price|cost|of))?:?\s*(?:from\s+)?$", re.IGNORECASE
+)
+_UNITS = {
+    "night": "night",
+    "nightly": "night",
+    "day": "day",
+    "daily": "day",
+    "person": "person",
+    "passenger": "person",
+    "pp": "person",
+}
+
+
+@dataclass(frozen=True)
+class Price:
+    """An amount of money found in a search result.
+
+    `unit` is what the amount is quoted for when the text says so: "night", "day",
+    "person" or "total".
+    """
+
+    amount: float
+    currency: str
+    unit: str | None = None
+
+
+def _unit(text: str, start: int, end: int) -> str | None:
+    after = _UNIT_AFTER.match(text, end)
+    if after:
+        return _UNITS[(after.group("unit") or after.group("rate")).lower()]
+    if _TOTAL_BEFORE.search(text, max(0, start - 20), start):
+        return "total"
+    return None
+
+
+def extract_prices(text: str) -> List[Price]:
+    """Find the prices mentioned in a piece of text."""
+    prices: List[Price] = []
+    for match in _PRICE.finditer(text):
+        if match.group("symbol"):
+            currency = _SYMBOLS[match.group("symbol")]
+            digits, cents = match.group("amount"), match.group("cents")
+        else:
+            currency = match.group("code")
+            digits, cents = match.group("amount2"), match.group("cents2")
+        amount = float(digits.replace(",", "") + (cents or ""))
+        if amount > 0:
+            prices.append(
+                Price(amount, currency, _unit(text, match.start(), match.end()))
+            )
+    return prices
+
+
+def _texts(results: Any) -> Iterable[str]:
+    if isinstance(results, str):
+        yield results
+    elif isinstance(results, dict):
+        for key in ("title", "content"):
+            if isinstance(results.get(key), str):
+                yield results[key]
+    elif isinstance(results, list):
+        for result in results:
+            yield from _texts(result)
+
+
+def min_price(results: Any, currency: str = "USD") -> float | None:
+    """Get the lowest price in a given currency across search results, or None."""
+    amounts = [
+        price.amount
+        for text in _texts(results)
+        for price in extract_prices(text)
+        if price.currency == currency
+    ]
+    return min(amounts) if amounts else None
@@ -0,0 +1,312 @@
+"""Opt-in sampling profiler for individual runs of the Travel Master graph.
+
+A run is profiled when its configurable sets `profile=True`, or at random with
+probability `profiling_sample_rate`: `profiled(graph, config)` picks the graph to run,
+and the LangGraph server does so per run through `travel_master.travel_master.make_graph`.
+
+While a profiled run executes, a sampler thread records the Python stack of the event
+loop thread every `profiling_interval_ms`. Each sample is attributed to the asyncio task
+that was running, tagged with the path of the graph node it executes (e.g.
+`supervisor/flight_assistant/tools`), or `graph` for the graph's own work between
+nodes. Tasks created while profiling inherit the tag of the task that created them, so
+model and tool calls count towards their node. Samples of other conversations sharing
+the loop, and idle time, are left out.
+
+When the run ends the samples are written to `profiling_output_dir` in the collapsed
+stack format (one `frame;frame;... count` line per distinct stack, node path first),
+which flamegraph.pl, speedscope and similar tools render as flame graphs.
+
+Runs that are not profiled execute the plain graph, with no callback handler attached,
+so the profiler adds nothing to them beyond the sampling decision.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, Hashable, List, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langgraph.pregel import Pregel
+
+from travel_master.configuration import Configuration
+from travel_master.metrics import get_counters
+
+logger = logging.getLogger(__name__)
+
+profiling_counters = get_counters("profiling")
+
+_current_tasks: Dict[Any, Any] = getattr(asyncio.tasks, "_current_tasks", {})
+
+_switch_lock = threading.Lock()
+_active_profiles = 0
+_default_switch_interval = sys.getswitchinterval()
+
+# The profiles running on each event loop, and the task factory they replaced
+_loop_profiles: Dict[Any, List[RunProfile]] = {}
+_previous_factories: Dict[Any, Any] = {}
+
+
+def _sampling_started(interval_seconds: float) -> None:
+    # The sampler only runs when the profiled thread hands over the GIL, which a busy
+    # thread does every switch interval (5ms by default); shorten it while sampling so
+    # short bursts of CPU work between awaits are seen too
+    global _active_profiles
+    with _switch_lock:
+        _active_profiles += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval_seconds / 5))
+
+
+def _sampling_stopped() -> None:
+    global _active_profiles
+    with _switch_lock:
+        _active_profiles -= 1
+        if not _active_profiles:
+            sys.setswitchinterval(_default_switch_interval)
+
+
+def _tagging_task_factory(
+    loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any
+) -> Any:
+    previous = _previous_factories.get(loop)
+    task = (
+        previous(loop, coro, **kwargs)
+        if previous
+        else asyncio.Task(coro, loop=loop, **kwargs)
+    )
+    parent = _current_tasks.get(loop)
+    if parent is not None:
+        for profile in _loop_profiles.get(loop, ()):
+            if (path := profile.tasks.get(parent)) is not None:
+                profile.tasks[task] = path
+    return task
+
+
+def _watch_tasks(loop: asyncio.AbstractEventLoop, profile: RunProfile) -> None:
+    if loop not in _loop_profiles:
+        _previous_factories[loop] = loop.get_task_factory()
+        loop.set_task_factory(_tagging_task_factory)
+    _loop_profiles.setdefault(loop, []).append(profile)
+
+
+def _unwatch_tasks(loop: asyncio.AbstractEventLoop, profile: RunProfile) -> None:
+    profiles = _loop_profiles[loop]
+    profiles.remove(profile)
+    if not profiles:
+        del _loop_profiles[loop]
+        loop.set_task_factory(_previous_factories.pop(loop))
+
+
+def node_path(metadata: Dict[str, Any] | None) -> str | None:
+    """Get the path of graph nodes a run belongs to from its callback metadata."""
+    namespace = (metadata or {}).get("langgraph_checkpoint_ns")
+    if not namespace:
+        return None
+    return "/".join(part.split(":", 1)[0] for part in namespace.split("|"))
+
+
+def _current_task() -> Any:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class RunProfile:
+    """The samples of one profiled run, collected by a sampler thread."""
+
+    def __init__(
+        self,
+        run_id: UUID,
+        interval_seconds: float,
+        output_dir: str,
+        thread_id: str | None = None,
+    ) -> None:
+        """Start sampling the calling thread (and the event loop running on it, if any)."""
+        self.run_id = run_id
+        self.interval_seconds = interval_seconds
+        self.output_dir = output_dir
+        self.thread_id = thread_id
+        self.samples: Counter[str] = Counter()
+        self.tasks: Dict[Any, str] = {}
+        self.runs: Dict[Hashable, Tuple[Any, str | None]] = {}
+        self.started = time.perf_counter()
+        try:
+            self._loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, daemon=True, name="run-profiler"
+        )
+        _sampling_started(interval_seconds)
+        if self._loop is not None:
+            _watch_tasks(self._loop, self)
+        self._sampler.start()
+
+    def enter(self, key: Hashable, path: str | None) -> None:
+        """Tag the current task with the node path of a run starting in it."""
+        task = _current_task()
+        if path is None or task is None:
+            # Sync runs in executor threads are not attributed
+            return
+        self.runs[key] = (task, self.tasks.get(task))
+        self.tasks[task] = path
+
+    def exit(self, key: Hashable) -> None:
+        """Restore the tag the current task had before a run started in it."""
+        entry = self.runs.pop(key, None)
+        if entry is None:
+            return
+        task, previous = entry
+        if previous is None:
+            self.tasks.pop(task, None)
+        else:
+            self.tasks[task] = previous
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            if self._loop is not None:
+                # Only samples taken while one of this run's tasks is executing count
+                path = self.tasks.get(_current_tasks.get(self._loop))
+                if path is None:
+                    continue
+            else:
+                path = "run"
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[
+                ";".join([*(f"node:{n}" for n in path.split("/")), *reversed(stack)])
+            ] += 1
+
+    def stop(self) -> str | None:
+        """Stop sampling and write the collapsed stacks; returns the file written."""
+        self._stop.set()
+        self._sampler.join()
+        _sampling_stopped()
+        if self._loop is not None:
+            _unwatch_tasks(self._loop, self)
+        seconds = time.perf_counter() - self.started
+        profiling_counters.incr("runs")
+        profiling_counters.incr("samples", sum(self.samples.values()))
+        if not self.samples:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.thread_id or 'run'}-{self.run_id.hex[:8]}.collapsed"
+        path = os.path.join(self.output_dir, name.replace(os.sep, "_"))
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        by_node: Counter[str] = Counter()
+        for stack, count in self.samples.items():
+            by_node[
+                "/".join(
+                    s[len("node:") :] for s in stack.split(";") if s.startswith("node:")
+                )
+            ] += count
+        logger.info(
+            "Profiled run %s (%.2fs, %d samples) to %s; samples by node: %s",
+            self.run_id,
+            seconds,
+            sum(self.samples.values()),
+            path,
+            dict(by_node.most_common()),
+        )
+        return path
+
+
+class ProfilingHandler(BaseCallbackHandler):
+    """Profiles the graph invocation it is attached to, tagging tasks with node paths."""
+
+    run_inline = True
+
+    def __init__(
+        self, interval_seconds: float, output_dir: str, thread_id: str | None = None
+    ) -> None:
+        """Create a handler for one invocation; sampling starts with its root run."""
+        self.interval_seconds = interval_seconds
+        self.output_dir = output_dir
+        self.thread_id = thread_id
+        self.profile: RunProfile | None = None
+        self.path: str | None = None
+
+    def on_chain_start(
+        self,
+        serialized: Any,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: Dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Start sampling with the root run, or tag the task a node starts in."""
+        if self.profile is None and parent_run_id is None:
+            self.profile = RunProfile(
+                run_id, self.interval_seconds, self.output_dir, self.thread_id
+            )
+            # Time the root task spends outside of nodes is the graph's own work
+            self.profile.enter(run_id, "graph")
+        elif self.profile is not None:
+            self.profile.enter(run_id, node_path(metadata))
+
+    def _end(self, run_id: UUID) -> None:
+        if self.profile is None:
+            return
+        if run_id == self.profile.run_id:
+            self.path = self.profile.stop()
+        else:
+            self.profile.exit(run_id)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Untag the task of a finished run, writing the profile when the invocation ends."""
+        self._end(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Untag the task of a failed run, writing the profile when the invocation ends."""
+        self._end(run_id)
+
+
+def profiled(
+    graph: Pregel[Any, Any, Any, Any], config: RunnableConfig | None = None
+) -> Pregel[Any, Any, Any, Any]:
+    """Get the graph to run with a config: instrumented for profiling if the run is sampled.
+
+    Runs that are not profiled get the graph itself, so the profiler costs nothing for
+    them; profiled runs get a copy of the graph carrying a `ProfilingHandler`.
+    """
+    configuration = Configuration.from_runnable_config(config or {})
+    if not (
+        configuration.profile or random.random() < configuration.profiling_sample_rate
+    ):
+        return graph
+    handler = ProfilingHandler(
+        configuration.profiling_interval_ms / 1000,
+        configuration.profiling_output_dir,
+        ((config or {}).get("configurable") or {}).get("thread_id"),
+    )
+    return graph.with_config(callbacks=[handler])
@@ -27,6 +27,7 @@ FLIGHT_ASSISTANT_SYSTEM_PROMPT = """You are a Flight Assistant, a specialized AI
 - Handle both one-way and round-trip searches
 - Support multiple passengers
 - Provide comprehensive flight options with pricing and airline information
+- Pass the user's budget (max_price) and maximum stops (max_stops) when they give them
 
 ### 2. Flight Booking (book_flight)
 - Process flight bookings with passenger details
@@ -77,6 +78,7 @@ ACCOMMODATION_ASSISTANT_SYSTEM_PROMPT = """You are an Accommodation Assistant, a
 - Support various accommodation types (hotels, resorts, apartments, etc.)
 - Handle multiple guests and room requirements
 - Provide comprehensive options with pricing and amenity information
+- Pass the user's budget (max_price) and minimum star rating (min_stars) when they give them
 
 ### 2. Hotel Booking (book_hotel)
 - Process accommodation bookings with guest details
@@ -128,6 +130,7 @@ CAR_RENTAL_ASSISTANT_SYSTEM_PROMPT = """You are a Car Rental Assistant, a specia
 - Handle different pickup/drop-off locations and times
 - Consider driver age for pricing and availability
 - Provide comprehensive rental options with pricing
+- Pass the user's budget (max_price) when they give one
 
 ### 2. Car Booking (book_car)
 - Process car rental bookings with driver details
@@ -0,0 +1,260 @@
+"""Deterministic ranking of search candidates.
+
+Web search results quote prices in mixed currencies, some per night or per day and some
+for the whole stay, and left alone the model has to compare them by eye. With
+`enable_result_ranking`, the search tools pass their results through `rank_candidates`:
+
+1. Prices are extracted from each candidate (see `travel_master.pricing`), converted to
+   `ranking_currency` with the offline rates in `data/fx_rates.tsv`, and nightly or daily
+   rates are multiplied by the `nights` / `rental_days` of the search. Hotel and car prices
+   that do not say what they are for are taken to be nightly or daily rates, as listings
+   usually quote them that way. Flight prices are per traveller.
+2. Stars, number of stops and car class are read from the text.
+3. All candidates are scored at once with NumPy against the preferences passed to the
+   search (budget, minimum stars, maximum stops, car class). Only the `ranking_top_k`
+   best are returned, best first and annotated with the normalized price.
+
+Ties keep the search engine's order, so the same results always rank the same way.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Mapping, Sequence
+
+import numpy as np
+
+from travel_master.pricing import extract_prices
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FX_PATH = Path(__file__).parent / "data" / "fx_rates.tsv"
+
+Domain = Literal["flight", "hotel", "car"]
+
+# Score weights of each criterion; a violated preference costs more than any criterion earns
+WEIGHTS: Dict[str, float] = {"price": 1.0, "stars": 0.5, "stops": 0.5, "car_class": 0.5}
+VIOLATION_PENALTY = 2.0
+
+_STARS = re.compile(r"\b([1-5](?:\.5)?)[\s-]?stars?\b", re.IGNORECASE)
+_STOPS = re.compile(r"\b(?:(non-?stop|direct)|(\d|one|two)\s+stops?)\b", re.IGNORECASE)
+_STOP_WORDS = {"one": 1, "two": 2}
+_CAR_CLASSES = {
+    "economy": "economy",
+    "mini": "economy",
+    "compact": "compact",
+    "midsize": "midsize",
+    "mid-size": "midsize",
+    "intermediate": "midsize",
+    "full-size": "full-size",
+    "fullsize": "full-size",
+    "full size": "full-size",
+    "standard": "full-size",
+    "suv": "suv",
+    "luxury": "luxury",
+    "premium": "luxury",
+    "van": "van",
+    "minivan": "van",
+}
+_CAR_CLASS = re.compile(
+    r"\b("
+    + "|".join(sorted(map(re.escape, _CAR_CLASSES), key=len, reverse=True))
+    + r")\b",
+    re.IGNORECASE,
+)
+
+
+@cache
+def load_fx_rates(path: str = str(DEFAULT_FX_PATH)) -> Dict[str, float]:
+    """Load the offline FX table: the value of one unit of each currency in USD."""
+    rates: Dict[str, float] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                currency, usd = line.split("\t")[:2]
+                rates[currency.strip()] = float(usd)
+    return rates
+
+
+def ranking_currency(currency: str, fx: Mapping[str, float] | None = None) -> str:
+    """Get the currency to normalize prices to: the given one, or USD if the FX table lacks it."""
+    fx = load_fx_rates() if fx is None else fx
+    code = currency.strip().upper()
+    if code in fx:
+        return code
+    _warn_unknown_currency(currency)
+    return "USD"
+
+
+@cache
+def _warn_unknown_currency(currency: str) -> None:
+    logger.warning(
+        "No FX rate for ranking currency %r; prices are ranked in USD", currency
+    )
+
+
+def car_class(text: str | None) -> str | None:
+    """Get the canonical car class mentioned in a text, if any."""
+    match = _CAR_CLASS.search(text or "")
+    return _CAR_CLASSES[match.group(1).lower()] if match else None
+
+
+@dataclass(frozen=True)
+class Preferences:
+    """What the user asked for; None means no preference."""
+
+    max_price: float | None = None
+    min_stars: float | None = None
+    max_stops: int | None = None
+    car_class: str | None = None
+
+
+def _stops(text: str) -> int | None:
+    match = _STOPS.search(text)
+    if match is None:
+        return None
+    if match.group(1):
+        return 0
+    return _STOP_WORDS.get(match.group(2).lower()) or int(match.group(2))
+
+
+def _stars(text: str) -> float | None:
+    match = _STARS.search(text)
+    return float(match.group(1)) if match else None
+
+
+def _array(values: Sequence[float | None]) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values])
+
+
+def _text(result: Any) -> str:
+    if isinstance(result, dict):
+        return " ".join(str(result[k]) for k in ("title", "content") if result.get(k))
+    return str(result)
+
+
+def normalized_prices(
+    domain: Domain,
+    texts: Sequence[str],
+    units: int = 1,
+    currency: str = "USD",
+    fx: Mapping[str, float] | None = None,
+) -> np.ndarray:
+    """Get the lowest normalized price quoted by each text (NaN when there is none)."""
+    fx = load_fx_rates() if fx is None else fx
+    currency = ranking_currency(currency, fx)
+    owners: List[int] = []
+    amounts: List[float] = []
+    rates: List[float] = []
+    per_unit: List[bool] = []
+    for index, text in enumerate(texts):
+        for price in extract_prices(text):
+            if price.currency not in fx:
+                continue
+            owners.append(index)
+            amounts.append(price.amount)
+            rates.append(fx[price.currency])
+            per_unit.append(
+                domain != "flight"
+                and (price.unit in ("night", "day") or price.unit is None)
+            )
+    lowest = np.full(len(texts), np.inf)
+    if owners:
+        totals = np.asarray(amounts) * np.asarray(rates) / fx[currency]
+        totals = np.where(np.asarray(per_unit), totals * max(units, 1), totals)
+        np.minimum.at(lowest, np.asarray(owners), totals)
+    return np.where(np.isinf(lowest), np.nan, lowest)
+
+
+def score_candidates(
+    prices: np.ndarray,
+    stars: np.ndarray,
+    stops: np.ndarray,
+    class_match: np.ndarray,
+    preferences: Preferences,
+) -> np.ndarray:
+    """Score candidates from their features (NaN where unknown); higher is better."""
+    scores = np.zeros(len(prices))
+    known = ~np.isnan(prices)
+    if known.any():
+        # Relative to the cheapest candidate, so close prices score close
+        cheapest = np.nanmin(prices)
+        scores += WEIGHTS["price"] * np.where(
+            known, cheapest / np.where(known, prices, 1.0), 0.0
+        )
+        if preferences.max_price is not None:
+            scores -= VIOLATION_PENALTY * (
+                known & (np.nan_to_num(prices) > preferences.max_price)
+            )
+    scores += WEIGHTS["stars"] * np.nan_to_num(stars / 5.0)
+    if preferences.min_stars is not None:
+        scores -= VIOLATION_PENALTY * (
+            np.nan_to_num(stars, nan=np.inf) < preferences.min_stars
+        )
+    scores += WEIGHTS["stops"] * np.nan_to_num(1.0 / (1.0 + stops))
+    if preferences.max_stops is not None:
+        scores -= VIOLATION_PENALTY * (
+            np.nan_to_num(stops, nan=-1) > preferences.max_stops
+        )
+    scores += WEIGHTS["car_class"] * np.nan_to_num(class_match)
+    return scores
+
+
+def rank_candidates(
+    domain: Domain,
+    results: Any,
+    preferences: Preferences,
+    *,
+    units: int = 1,
+    top_k: int = 3,
+    currency: str = "USD",
+    fx: Mapping[str, float] | None = None,
+) -> Any:
+    """Rank search results and keep the `top_k` best, annotated with their features.
+
+    Args:
+        domain: The kind of search the results come from.
+        results: The compacted search results; anything but a list is returned as is.
+        preferences: The user's preferences to score against.
+        units: Nights (hotels) or rental days (cars) that nightly or daily rates cover.
+        top_k: How many candidates to keep.
+        currency: The currency prices are normalized to.
+        fx: The FX table to use instead of the offline one.
+    """
+    if not isinstance(results, list) or not results:
+        return results
+    texts = [_text(result) for result in results]
+    prices = normalized_prices(domain, texts, units, currency, fx)
+    stars = [_stars(t) if domain == "hotel" else None for t in texts]
+    stops = [_stops(t) if domain == "flight" else None for t in texts]
+    classes = [car_class(t) if domain == "car" else None for t in texts]
+    wanted = car_class(preferences.car_class)
+    class_match = [
+        None if c is None or wanted is None else c == wanted for c in classes
+    ]
+
+    scores = score_candidates(
+        prices, _array(stars), _array(stops), _array(class_match), preferences
+    )
+    ranked: List[Any] = []
+    for index in np.argsort(-scores, kind="stable")[:top_k]:
+        result = results[index]
+        if not isinstance(result, dict):
+            ranked.append(result)
+            continue
+        features = {
+            "price": None
+            if np.isnan(prices[index])
+            else round(float(prices[index]), 2),
+            "stars": stars[index],
+            "stops": stops[index],
+            "car_class": classes[index],
+        }
+        ranked.append(
+            {**result, **{k: v for k, v in features.items() if v is not None}}
+        )
+    return ranked
@@ -0,0 +1,290 @@
+"""Local semantic cache of final responses for generic, tool-free turns.
+
+Questions like "what's your cancellation policy" need no tool call, yet each one costs a
+supervisor and a sub-assistant LLM call. This cache stores the final response of such
+turns and serves it again for similar messages handled by the same assistant. The cache
+is shared by every conversation of the process, so only the opening turn of a conversation
+is stored: a later answer may draw on what the user said before ("yes, your Rome dates
+work") and must not be served to another conversation.
+
+Similarity is computed on feature-hashed vectors (normalized word unigrams/bigrams plus
+character trigrams), so no external embedding service is involved. Turns that mention a
+booking identifier, are too short to stand on their own, or answer a question from the
+previous turn always bypass the cache. With an optional `SharedCache` tier attached,
+responses stored by other worker processes are pulled in before each lookup.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableConfig
+
+from travel_master.configuration import Configuration
+from travel_master.metrics import get_counters
+from travel_master.shared_cache import SharedCache
+from travel_master.state import State
+from travel_master.utils import get_message_text
+
+VECTOR_DIMENSIONS = 1 << 12
+
+BOOKING_IDENTIFIER = re.compile(
+    r"\b(?:FL|HT|CR|TM|CX|CH)[\s-]?\d{5,6}\b", re.IGNORECASE
+)
+_WORD = re.compile(r"[a-z0-9']+")
+
+SparseVector = Dict[int, float]
+
+
+def hash_vector(text: str) -> SparseVector:
+    """Embed text as an L2-normalized, feature-hashed sparse vector."""
+    words = _WORD.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    joined = f" {' '.join(words)} "
+    features += [joined[i : i + 3] for i in range(len(joined) - 2)]
+
+    vector: SparseVector = {}
+    for feature in features:
+        digest = zlib.crc32(feature.encode())
+        index = digest % VECTOR_DIMENSIONS
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[index] = vector.get(index, 0.0) + sign
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {i: v / norm for i, v in vector.items()} if norm else {}
+
+
+def cosine_similarity(a: SparseVector, b: SparseVector) -> float:
+    """Compute the cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(i, 0.0) for i, v in a.items())
+
+
+@dataclass
+class _Entry:
+    vector: SparseVector
+    content: str
+    name: str | None
+    expires_at: float
+
+
+class SemanticResponseCache:
+    """A size-bounded, TTL-limited cache of responses looked up by similarity."""
+
+    def __init__(self) -> None:
+        """Create an empty cache."""
+        self.counters = get_counters("response_cache")
+        self.shared: SharedCache | None = None
+        self._entries: OrderedDict[Tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._synced_rowid = 0
+
+    def _sync(self, max_entries: int | None) -> None:
+        """Pull the responses other processes stored in the shared tier."""
+        if self.shared is None:
+            return
+        now, monotonic = time.time(), time.monotonic()
+        for rowid, _, value, expires_at in self.shared.since(
+            "response", self._synced_rowid
+        ):
+            self._synced_rowid = rowid
+            key = (value["scope"], value["text"])
+            with self._lock:
+                self._entries[key] = _Entry(
+                    hash_vector(value["text"]),
+                    value["content"],
+                    value["name"],
+                    monotonic + expires_at - now,
+                )
+                self._entries.move_to_end(key)
+                if max_entries is not None:
+                    self._evict(max_entries)
+
+    def _evict(self, max_entries: int) -> None:
+        """Drop the least recently used entries beyond the bound; call with the lock held."""
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+            self.counters.incr("evictions")
+
+    def lookup(
+        self, scope: str, text: str, threshold: float, max_entries: int | None = None
+    ) -> Tuple[_Entry, float] | None:
+        """Find the most similar unexpired response stored under a scope.
+
+        The responses pulled from the shared tier count towards `max_entries`, like the
+        ones stored locally.
+        """
+        self._sync(max_entries)
+        vector = hash_vector(text)
+        now = time.monotonic()
+        best: Tuple[Tuple[str, str], _Entry, float] | None = None
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.expires_at <= now:
+                    del self._entries[key]
+                    continue
+                if key[0] != scope:
+                    continue
+                similarity = cosine_similarity(vector, entry.vector)
+                if similarity >= threshold and (best is None or similarity > best[2]):
+                    best = (key, entry, similarity)
+            if best is None:
+                return None
+            self._entries.move_to_end(best[0])
+            return best[1], best[2]
+
+    def store(
+        self,
+        scope: str,
+        text: str,
+        content: str,
+        name: str | None,
+        ttl: float,
+        max_entries: int,
+    ) -> None:
+        """Store a response, evicting the least recently used entries beyond the bound."""
+        key = (scope, " ".join(text.lower().split()))
+        with self._lock:
+            self._entries[key] = _Entry(
+                hash_vector(text), content, name, time.monotonic() + ttl
+            )
+            self._entries.move_to_end(key)
+            self._evict(max_entries)
+        if self.shared is not None:
+            self.shared.put(
+                "response",
+                f"{scope}|{key[1]}",
+                {"scope": scope, "text": key[1], "content": content, "name": name},
+                ttl,
+            )
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = SemanticResponseCache()
+
+
+def _split_turn(
+    messages: List[AnyMessage],
+) -> Tuple[List[AnyMessage], HumanMessage | None, List[AnyMessage]]:
+    """Split messages into the history, the latest user message, and the turn after it."""
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, HumanMessage):
+            return messages[:index], message, messages[index + 1 :]
+    return messages, None, []
+
+
+def _active_assistant(history: List[AnyMessage]) -> str:
+    for message in reversed(history):
+        if isinstance(message, AIMessage) and message.name:
+            return message.name
+    return "supervisor"
+
+
+def _should_bypass(
+    text: str, history: List[AnyMessage], configuration: Configuration
+) -> bool:
+    if BOOKING_IDENTIFIER.search(text):
+        return True
+    if len(_WORD.findall(text.lower())) < configuration.response_cache_min_words:
+        return True
+    # Replies to a question from the previous turn ("yes", "the cheaper one") depend on context
+    last_ai = next((m for m in reversed(history) if isinstance(m, AIMessage)), None)
+    return last_ai is not None and get_message_text(last_ai).rstrip().endswith("?")
+
+
+async def lookup_cached_response(
+    state: State, config: RunnableConfig
+) -> Dict[str, List[AIMessage]]:
+    """Answer the latest user message from the response cache when possible."""
+    configuration = Configuration.from_runnable_config(config)
+    if not configuration.enable_response_cache:
+        return {"messages": []}
+    history, human, _ = _split_turn(list(state.messages))
+    if human is None:
+        return {"messages": []}
+    text = get_message_text(human)
+    if _should_bypass(text, history, configuration):
+        response_cache.counters.incr("bypassed")
+        return {"messages": []}
+
+    found = response_cache.lookup(
+        _active_assistant(history),
+        text,
+        configuration.response_cache_similarity_threshold,
+        configuration.response_cache_max_entries,
+    )
+    if found is None:
+        response_cache.counters.incr("misses")
+        return {"messages": []}
+    entry, similarity = found
+    response_cache.counters.incr("hits")
+    return {
+        "messages": [
+            AIMessage(
+                content=entry.content,
+                name=entry.name,
+                response_metadata={
+                    "cache": "semantic",
+                    "similarity": round(similarity, 4),
+                },
+            )
+        ]
+    }
+
+
+async def store_response(
+    state: State, config: RunnableConfig
+) -> Dict[str, List[AnyMessage]]:
+    """Store the final response of a turn that needed no domain tool call."""
+    configuration = Configuration.from_runnable_config(config)
+    if not configuration.enable_response_cache:
+        return {"messages": []}
+    history, human, turn = _split_turn(list(state.messages))
+    if human is None or not turn or not isinstance(turn[-1], AIMessage):
+        return {"messages": []}
+    text = get_message_text(human)
+    if _should_bypass(text, history, configuration):
+        return {"messages": []}
+    # Earlier turns (or trip details carried in with the input) may shape the answer
+    if any(not isinstance(m, SystemMessage) for m in history) or state.itinerary:
+        return {"messages": []}
+    # Handoffs between the supervisor and its assistants are tool calls too; anything else
+    # means the answer depended on live data or changed a booking
+    if any(
+        isinstance(m, ToolMessage) and not (m.name or "").startswith("transfer_")
+        for m in turn
+    ):
+        return {"messages": []}
+
+    final = turn[-1]
+    if final.tool_calls or BOOKING_IDENTIFIER.search(get_message_text(final)):
+        return {"messages": []}
+    response_cache.store(
+        _active_assistant(history),
+        text,
+        get_message_text(final),
+        final.name,
+        configuration.response_cache_ttl_seconds,
+        configuration.response_cache_max_entries,
+    )
+    response_cache.counters.incr("stored")
+    return {"messages": []}
@@ -0,0 +1,98 @@
+"""Templated responses for tools with deterministic output.
+
+Booking, cancellation and change tools return everything the user needs to see, so with
+`direct_tool_responses` enabled the tool node answers from these templates and the
+assistant graph ends without a second model call to turn the result into prose.
+"""
+
+from __future__ import annotations
+
+from string import Formatter
+from typing import Any, Dict, Mapping, Tuple
+
+_BOOKED = (
+    "- Confirmation number: {confirmation_number}",
+    "- Booking reference: {booking_reference}",
+    "- A confirmation email will be sent to {email}.",
+)
+_CANCELLED = (
+    "- Cancellation ID: {cancellation_id}",
+    "- Cancellation fee: ${cancellation_fee}",
+    "- Refund: {refund_status}, expected within {refund_timeline}.",
+)
+_CHANGED = (
+    "- Changes: {changes}",
+    "- Change ID: {change_id}",
+    "- Change fee: ${change_fee}",
+)
+
+# Each line is rendered only when every field it uses is known
+TEMPLATES: Dict[str, Tuple[str, ...]] = {
+    "book_flight": (
+        "Your flight {flight_id} is booked for {passenger_name}.",
+        *_BOOKED,
+    ),
+    "book_hotel": (
+        "Your {room_type} at {hotel_id} is booked for {guest_name}.",
+        *_BOOKED,
+    ),
+    "book_car": (
+        "Your rental car {car_id} is booked for {driver_name}.",
+        "- Pickup location: {pickup_location}",
+        *_BOOKED,
+    ),
+    "cancel_flight": (
+        "Your flight booking {confirmation_number} has been cancelled.",
+        *_CANCELLED,
+    ),
+    "cancel_hotel": (
+        "Your hotel booking {confirmation_number} has been cancelled.",
+        *_CANCELLED,
+    ),
+    "cancel_car": (
+        "Your car rental booking {confirmation_number} has been cancelled.",
+        *_CANCELLED,
+    ),
+    "change_flight": (
+        "Your flight booking {confirmation_number} has been changed.",
+        *_CHANGED,
+    ),
+    "change_hotel": (
+        "Your hotel booking {confirmation_number} has been changed.",
+        *_CHANGED,
+    ),
+    "change_car": (
+        "Your car rental booking {confirmation_number} has been changed.",
+        *_CHANGED,
+    ),
+}
+
+DIRECT_RESPONSE_TOOLS = frozenset(TEMPLATES)
+
+_FIELDS: Dict[str, Tuple[str, ...]] = {
+    line: tuple(name for _, name, _, _ in Formatter().parse(line) if name)
+    for lines in TEMPLATES.values()
+    for line in lines
+}
+
+
+def render_tool_response(
+    tool_name: str, args: Mapping[str, Any], result: Mapping[str, Any]
+) -> str | None:
+    """Render the templated response for a successful tool call, if the tool has one."""
+    lines = TEMPLATES.get(tool_name)
+    if lines is None or result.get("status") == "error":
+        return None
+    # Results do not echo the call's arguments, so both are needed to render a response
+    values = {**args, **{k: v for k, v in result.items() if v is not None}}
+    values["changes"] = "; ".join(
+        f"{k[len('new_') :].replace('_', ' ')} {v}"
+        for k, v in args.items()
+        if k.startswith("new_") and v is not None
+    )
+    rendered = [
+        line.format(**values)
+        for line in lines
+        if all(values.get(name) not in (None, "") for name in _FIELDS[line])
+    ]
+    return "\n".join(rendered) if rendered else None
@@ -0,0 +1,125 @@
+"""Typed result records returned by the assistant tools.
+
+Tools return one of these slotted records serialized with `to_json`: compact JSON with a
+fixed field order and None values omitted. Inputs the tool call already carries (dates,
+names, contact details, confirmation numbers) are not echoed back, and there is no prose
+`message`; consumers that need the full picture combine the call's arguments with its
+result (see `travel_master.itinerary` and `travel_master.responses`).
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Tuple, Type
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str)
+_field_names: Dict[Type[Any], Tuple[str, ...]] = {}
+
+SEARCH_RESULT_KEYS = ("title", "url", "content")
+
+
+@dataclass(slots=True)
+class FlightSearchResult:
+    """Flight options for a search; `origin`/`destination` are the normalized locations.
+
+    `currency` is set when the results were ranked, and is the currency of their `price`.
+    """
+
+    origin: str
+    destination: str
+    trip_type: str
+    results: Any
+    currency: str | None = None
+    status: str = "success"
+
+
+@dataclass(slots=True)
+class HotelSearchResult:
+    """Accommodation options for a search; `location` is the normalized location.
+
+    `currency` is set when the results were ranked, and is the currency of their `price`.
+    """
+
+    location: str
+    nights: int
+    results: Any
+    currency: str | None = None
+    status: str = "success"
+
+
+@dataclass(slots=True)
+class CarSearchResult:
+    """Car rental options for a search; `location` is the normalized location.
+
+    `currency` is set when the results were ranked, and is the currency of their `price`.
+    """
+
+    location: str
+    rental_days: int
+    results: Any
+    currency: str | None = None
+    status: str = "success"
+
+
+@dataclass(slots=True)
+class BookingResult:
+    """A confirmed booking."""
+
+    confirmation_number: str
+    booking_reference: str
+    booking_date: str
+    status: str = "success"
+
+
+@dataclass(slots=True)
+class CancellationResult:
+    """A cancelled booking."""
+
+    cancellation_id: str
+    refund_status: str
+    refund_timeline: str
+    cancellation_date: str
+    cancellation_fee: int | None = None
+    status: str = "success"
+
+
+@dataclass(slots=True)
+class ChangeResult:
+    """A changed booking; the changes themselves are the `new_*` arguments of the call."""
+
+    change_id: str
+    change_fee: int
+    change_date: str
+    status: str = "success"
+
+
+@dataclass(slots=True)
+class ToolFailure:
+    """A tool call that failed."""
+
+    message: str
+    status: str = "error"
+
+
+def compact_search_results(results: Any) -> Any:
+    """Keep only the title, URL and content of each web search result."""
+    if not isinstance(results, list):
+        return results
+    return [
+        {k: r[k] for k in SEARCH_RESULT_KEYS if r.get(k) is not None}
+        if isinstance(r, dict)
+        else r
+        for r in results
+    ]
+
+
+def to_json(record: Any) -> str:
+    """Serialize a result record to compact JSON, omitting None values."""
+    cls = type(record)
+    names = _field_names.get(cls)
+    if names is None:
+        names = _field_names[cls] = tuple(f.name for f in fields(cls))
+    return _encoder.encode(
+        {name: value for name in names if (value := getattr(record, name)) is not None}
+    )
@@ -0,0 +1,188 @@
+"""Process-wide cache for web search results.
+
+All three search tools go through this cache, so identical queries issued within the
+TTL (including ones warmed in the background by the prefetcher) are served without
+another round trip to the search backend. An optional `SharedCache` tier shares results
+between worker processes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict
+
+from langchain_community.tools.tavily_search import TavilySearchResults
+
+from travel_master.metrics import get_counters
+from travel_master.shared_cache import SharedCache
+
+SearchBackend = Callable[[str, int], Awaitable[Any]]
+
+
+@lru_cache(maxsize=8)
+def _tavily_tool(max_results: int) -> TavilySearchResults:
+    # One tool (and API client) per result count instead of one per search
+    return TavilySearchResults(max_results=max_results)
+
+
+async def tavily_search(query: str, max_results: int) -> Any:
+    """Run a query against the Tavily search API."""
+    return await _tavily_tool(max_results).ainvoke({"query": query})
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    prefetched: bool = False
+
+
+class SearchCache:
+    """An LRU cache of search results with per-entry expiry.
+
+    Concurrent lookups for the same key share a single backend call.
+    """
+
+    def __init__(
+        self, backend: SearchBackend = tavily_search, max_entries: int = 512
+    ) -> None:
+        """Create a cache in front of the given search backend."""
+        self.backend = backend
+        self.max_entries = max_entries
+        self.counters = get_counters("search_cache")
+        self.shared: SharedCache | None = None
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future[Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        """Build the cache key for a query."""
+        return f"{' '.join(query.lower().split())}|{max_results}"
+
+    def get(self, key: str) -> Any | None:
+        """Get a cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            if entry.prefetched:
+                # Only the first real lookup of a warmed entry counts as a prefetch hit
+                entry.prefetched = False
+                self.counters.incr("prefetch_hits")
+            return entry.value
+
+    def put(self, key: str, value: Any, ttl: float, prefetched: bool = False) -> None:
+        """Store a value, evicting the least recently used entries if needed."""
+        with self._lock:
+            self._entries[key] = _Entry(value, time.monotonic() + ttl, prefetched)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.incr("evictions")
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether an unexpired entry exists without touching LRU order."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.monotonic()
+
+    def __len__(self) -> int:
+        """Return the number of stored entries."""
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    async def search(
+        self,
+        query: str,
+        max_results: int,
+        ttl: float,
+        *,
+        prefetched: bool = False,
+        refresh: bool = False,
+    ) -> Any:
+        """Return cached results for a query, running the backend on a miss.
+
+        Args:
+            query: The search query.
+            max_results: Maximum number of results to request from the backend.
+            ttl: How long a fresh result stays valid, in seconds.
+            prefetched: Whether this lookup is a speculative background warm-up.
+            refresh: Whether to skip the cached results and run the backend, storing
+                what it returns for the next lookups.
+        """
+        key = self.make_key(query, max_results)
+        if refresh:
+            cached = None
+        else:
+            cached = self.get(key) if not prefetched else self._peek(key)
+        if cached is not None:
+            self.counters.incr("hits")
+            return cached
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            value = await asyncio.shield(pending)
+            if not prefetched:
+                self.counters.incr("inflight_joins")
+                # Consumes the prefetch marker if a background warm-up produced it
+                self.get(key)
+            return value
+
+        if self.shared is not None and not refresh:
+            found = self.shared.get("search", key)
+            if found is not None:
+                value, expires_at = found
+                self.counters.incr("shared_hits")
+                self.put(key, value, expires_at - time.time(), prefetched=prefetched)
+                return value
+
+        if refresh:
+            self.counters.incr("refreshes")
+        else:
+            self.counters.incr("prefetch_misses" if prefetched else "misses")
+        future: asyncio.Future[Any] = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await self.backend(query, max_results)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when no one else was waiting on it
+            future.exception()
+            raise
+        else:
+            self.put(key, value, ttl, prefetched=prefetched)
+            if self.shared is not None:
+                self.shared.put("search", key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _peek(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            return entry.value
+
+
+search_cache = SearchCache()
@@ -0,0 +1,295 @@
+"""A local full-text index of harvested search results.
+
+Every web search result the search tools receive is worth keeping: the next user asking
+for hotels in the same city on the same dates would be served the same pages. With
+`enable_search_index`, `indexed_search` sits in front of the search cache:
+
+1. The documents of earlier searches are looked up in a SQLite FTS5 index at
+   `search_index_path` and ranked with BM25 against the query. Only the documents
+   harvested by the same search (the same query, up to case and spacing, and so the same
+   dates, passengers, guests, ...) qualify; hits older than
+   `search_index_max_age_seconds` are ignored.
+2. With at least `search_index_min_hits` fresh hits, the search is answered locally.
+3. Otherwise the search goes to the network (through the search cache); its results are
+   added to the index and topped up with the local hits they do not already include.
+
+The index is updated incrementally, one document per result URL and search, and a
+document seen again is refreshed in place. Every `COMPACT_EVERY` added documents, the
+documents older than `search_index_retention_seconds` are deleted and the FTS segments
+merged. Answered, pre-filled and missed searches are counted in the `search_index`
+counter group.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Literal
+
+from travel_master.configuration import Configuration
+from travel_master.metrics import get_counters
+from travel_master.search_cache import search_cache
+
+Domain = Literal["flight", "hotel", "car"]
+
+# Added documents between two compactions
+COMPACT_EVERY = 500
+
+search_index_counters = get_counters("search_index")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    search_key TEXT NOT NULL,
+    location TEXT NOT NULL,
+    date TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    UNIQUE (domain, search_key, url)
+);
+CREATE INDEX IF NOT EXISTS documents_indexed_at ON documents (indexed_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, content, content='documents', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS documents_insert AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_delete AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, title, content)
+    VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_update AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, title, content)
+    VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO documents_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+"""
+
+_TOKEN = re.compile(r"\w+")
+
+
+def search_key(query: str) -> str:
+    """Normalize a search query into the key its documents are indexed under."""
+    return " ".join(query.lower().split())
+
+
+def match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query matching any of its words."""
+    tokens = dict.fromkeys(token.lower() for token in _TOKEN.findall(query))
+    return " OR ".join(f'"{token}"' for token in tokens)
+
+
+class SearchIndex:
+    """An on-disk BM25 index of search result documents, tagged by domain, search, location and date."""
+
+    def __init__(self, path: str) -> None:
+        """Open (or create) the index database at the given path."""
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, timeout=10.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.added_since_compaction = 0
+
+    def add(
+        self,
+        domain: Domain,
+        query: str,
+        location: str,
+        date: str,
+        results: Any,
+        *,
+        now: float | None = None,
+    ) -> int:
+        """Add the documents of a search, refreshing the ones already indexed.
+
+        Returns the number of documents written; results that are not a list of documents
+        with a URL (e.g. an error message from the backend) are ignored.
+        """
+        if not isinstance(results, list):
+            return 0
+        indexed_at = time.time() if now is None else now
+        key = search_key(query)
+        rows = [
+            (
+                domain,
+                key,
+                location,
+                date,
+                r["url"],
+                r.get("title") or "",
+                r.get("content") or "",
+                indexed_at,
+            )
+            for r in results
+            if isinstance(r, dict) and r.get("url")
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO documents (domain, search_key, location, date, url, title, content, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (domain, search_key, url) DO UPDATE SET "
+                    "location = excluded.location, date = excluded.date, "
+                    "title = excluded.title, content = excluded.content, indexed_at = excluded.indexed_at",
+                    rows,
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self.added_since_compaction += len(rows)
+        return len(rows)
+
+    def search(
+        self,
+        domain: Domain,
+        query: str,
+        *,
+        same_search: bool = False,
+        location: str | None = None,
+        date: str | None = None,
+        max_age_seconds: float | None = None,
+        limit: int = 5,
+        now: float | None = None,
+    ) -> List[Dict[str, str]]:
+        """Get the documents best matching a query, best first.
+
+        Args:
+            domain: The kind of search the documents were harvested by.
+            query: The search query, ranked against the documents' title and content.
+            same_search: Only documents harvested by this very query.
+            location: Only documents harvested for this location.
+            date: Only documents harvested for this date.
+            max_age_seconds: Only documents indexed at most this long ago.
+            limit: How many documents to return.
+            now: The current time, for tests.
+        """
+        expression = match_expression(query)
+        if not expression:
+            return []
+        sql = (
+            "SELECT d.title, d.url, d.content FROM documents_fts "
+            "JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ? AND d.domain = ?"
+        )
+        params: List[Any] = [expression, domain]
+        if same_search:
+            sql += " AND d.search_key = ?"
+            params.append(search_key(query))
+        if location is not None:
+            sql += " AND d.location = ?"
+            params.append(location)
+        if date is not None:
+            sql += " AND d.date = ?"
+            params.append(date)
+        if max_age_seconds is not None:
+            sql += " AND d.indexed_at > ?"
+            params.append((time.time() if now is None else now) - max_age_seconds)
+        sql += " ORDER BY bm25(documents_fts), d.id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"title": title, "url": url, "content": content}
+            for title, url, content in rows
+        ]
+
+    def compact(self, retention_seconds: float, *, now: float | None = None) -> int:
+        """Delete the documents older than the retention and merge the index segments.
+
+        Returns the number of documents deleted.
+        """
+        cutoff = (time.time() if now is None else now) - retention_seconds
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM documents WHERE indexed_at <= ?", (cutoff,)
+            ).rowcount
+            self._conn.execute(
+                "INSERT INTO documents_fts (documents_fts) VALUES ('optimize')"
+            )
+            self.added_since_compaction = 0
+        search_index_counters.incr("compactions")
+        search_index_counters.incr("compacted_documents", deleted)
+        return deleted
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        with self._lock:
+            count: int = self._conn.execute(
+                "SELECT COUNT(*) FROM documents"
+            ).fetchone()[0]
+            return count
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=8)
+def open_search_index(path: str) -> SearchIndex:
+    """Get the index at a path, shared by every search of this process."""
+    return SearchIndex(path)
+
+
+async def indexed_search(
+    domain: Domain, query: str, location: str, date: str, configuration: Configuration
+) -> Any:
+    """Run a search, answering it from the local index when the same search has enough fresh hits.
+
+    Args:
+        domain: The kind of search.
+        query: The search query.
+        location: The location the search is for, as tagged in the index.
+        date: The (first) date the search is for, as tagged in the index.
+        configuration: The run's configuration.
+    """
+    max_results = configuration.max_search_results
+    if not configuration.enable_search_index:
+        return await search_cache.search(
+            query, max_results, configuration.search_cache_ttl_seconds
+        )
+
+    # SQLite calls block; keep them off the event loop
+    index = await asyncio.to_thread(open_search_index, configuration.search_index_path)
+    hits = await asyncio.to_thread(
+        index.search,
+        domain,
+        query,
+        same_search=True,
+        max_age_seconds=configuration.search_index_max_age_seconds,
+        limit=max_results,
+    )
+    if hits and len(hits) >= configuration.search_index_min_hits:
+        search_index_counters.incr("answered")
+        return hits
+
+    results = await search_cache.search(
+        query, max_results, configuration.search_cache_ttl_seconds
+    )
+    await asyncio.to_thread(index.add, domain, query, location, date, results)
+    if index.added_since_compaction >= COMPACT_EVERY:
+        await asyncio.to_thread(
+            index.compact, configuration.search_index_retention_seconds
+        )
+    if not hits or not isinstance(results, list):
+        search_index_counters.incr("misses")
+        return results
+
+    # Pre-fill: the local hits the network did not return make up the shortfall
+    search_index_counters.incr("prefilled")
+    urls = {r.get("url") for r in results if isinstance(r, dict)}
+    extra = [hit for hit in hits if hit["url"] not in urls]
+    return [*results, *extra][: max(max_results, len(results))]
@@ -0,0 +1,83 @@
+"""A cross-process cache tier backed by a local SQLite file.
+
+When the graph runs in several worker processes (see `travel_master.worker_pool`), each
+process keeps its own in-memory search and response caches. Attaching a `SharedCache` to
+them adds a second tier that every process on the machine reads and writes, so a search
+run by one worker is a cache hit for all the others.
+
+Values are stored as JSON with an absolute (wall clock) expiry time. The database runs
+in WAL mode so readers never block the writer.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, List, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SharedCache:
+    """A TTL cache shared by all processes that open the same file."""
+
+    def __init__(self, path: str) -> None:
+        """Open (or create) the cache database at the given path."""
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, timeout=10.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Tuple[Any, float] | None:
+        """Get an unexpired value and its expiry time, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a value for `ttl` seconds."""
+        payload = json.dumps(value, separators=(",", ":"), default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, payload, time.time() + ttl),
+            )
+
+    def since(self, namespace: str, rowid: int) -> List[Tuple[int, str, Any, float]]:
+        """Get the unexpired entries written after the given row id, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rowid, key, value, expires_at FROM entries "
+                "WHERE namespace = ? AND rowid > ? AND expires_at > ? ORDER BY rowid",
+                (namespace, rowid, time.time()),
+            ).fetchall()
+        return [(r[0], r[1], json.loads(r[2]), r[3]) for r in rows]
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM entries WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
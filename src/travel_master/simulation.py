@@ -0,0 +1,351 @@
+"""Simulated chat models and search backend for load tests and offline benchmarks.
+
+Once registered (`install()` or `register_simulated_models()`), `load_chat_model`
+resolves `simulated/<role>` model names to `SimulatedChatModel`, which plays the supervisor (`simulated/supervisor`) or a sub-assistant (`simulated/assistant`)
+deterministically from the conversation: the supervisor hands each turn to the assistant
+for the domain the user mentions (to all the assistants mentioned, when it may hand off
+to several at once), and the assistant maps the user's intent (search,
+refine, book, change, cancel) to one tool call and then answers from its result. Model
+and search latencies are drawn from configurable distributions, so the graph, the tool
+node and the caches run for real while no network call is made.
+
+Use `SIMULATED_CONFIGURABLE` as configurable overrides, and `install()` (or the
+`simulated_graph` factory in worker processes) to register the simulated models and swap
+in the simulated search backend.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from travel_master.utils import get_message_text, register_chat_model_provider
+
+SIMULATED_CONFIGURABLE: Dict[str, Any] = {
+    "supervisor_model": "simulated/supervisor",
+    "sub_assistant_model": "simulated/assistant",
+    "small_model": "simulated/supervisor",
+    "fallback_model": "simulated/supervisor",
+}
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """A latency distribution in seconds: `fixed:S`, `uniform:LO,HI` or `lognormal:P50,P95`."""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> LatencyDistribution:
+        """Parse a distribution from its `kind:params` form."""
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v] or [0.0]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"unknown latency distribution: {spec!r}")
+        return cls(kind, values[0], values[-1])
+
+    def sample(self) -> float:
+        """Draw a latency."""
+        if self.kind == "uniform":
+            return random.uniform(self.a, self.b)
+        if self.kind == "lognormal" and self.a > 0:
+            # a is the median, b the 95th percentile
+            sigma = math.log(max(self.b, self.a) / self.a) / 1.645
+            return random.lognormvariate(math.log(self.a), sigma)
+        return self.a
+
+
+@dataclass
+class SimulationSettings:
+    """The latency distributions used by the simulated backends."""
+
+    model_latency: LatencyDistribution = LatencyDistribution()
+    search_latency: LatencyDistribution = LatencyDistribution()
+    recording: Dict[str, Any] = field(default_factory=dict)
+    """Recorded search results by query, replayed instead of the canned ones."""
+
+
+settings = SimulationSettings()
+
+_DOMAINS = (
+    ("car", re.compile(r"\b(car|rental|vehicle)\b", re.IGNORECASE)),
+    ("hotel", re.compile(r"\b(hotels?|room|stay|accommodation)\b", re.IGNORECASE)),
+    ("flight", re.compile(r"\b(flights?|fly)\b", re.IGNORECASE)),
+)
+_ASSISTANTS = {
+    "flight": "flight_assistant",
+    "hotel": "accommodation_assistant",
+    "car": "car_rental_assistant",
+}
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_ROUTE = re.compile(
+    r"from ([A-Za-z .]+?) to ([A-Za-z .]+?)(?: on| from|,|$)", re.IGNORECASE
+)
+_IN = re.compile(r"\bin ([A-Za-z .]+?)(?: from| on|,|$)", re.IGNORECASE)
+_CONFIRMATION = re.compile(r"\b(?:FL|HT|CR)\d{6}\b")
+
+
+def _domains(text: str) -> List[str]:
+    return [domain for domain, pattern in _DOMAINS if pattern.search(text)]
+
+
+def _last_human_index(messages: Sequence[BaseMessage]) -> int:
+    return next(
+        (
+            i
+            for i in range(len(messages) - 1, -1, -1)
+            if isinstance(messages[i], HumanMessage)
+        ),
+        -1,
+    )
+
+
+def _last_human(messages: Sequence[BaseMessage]) -> str:
+    return next(
+        (
+            get_message_text(m)
+            for m in reversed(messages)
+            if isinstance(m, HumanMessage)
+        ),
+        "",
+    )
+
+
+def _tool_call(
+    name: str, args: Dict[str, Any], messages: Sequence[BaseMessage]
+) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": f"call_{len(messages)}_{name}"}],
+    )
+
+
+class SimulatedChatModel(BaseChatModel):
+    """A deterministic stand-in for the supervisor and assistant models."""
+
+    model: str
+    tool_names: List[str] = []
+    tool_choice: str | None = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> SimulatedChatModel:
+        """Record the names of the tools the model may call."""
+        names = [convert_to_openai_tool(t)["function"]["name"] for t in tools]
+        return self.model_copy(
+            update={"tool_names": names, "tool_choice": kwargs.get("tool_choice")}
+        )
+
+    def _supervisor(self, messages: Sequence[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        if isinstance(last, ToolMessage) and (last.name or "").startswith(
+            "transfer_back"
+        ):
+            # The answers of every assistant handed the turn, without the handoff messages
+            turn = messages[_last_human_index(messages) + 1 :]
+            answers = [
+                get_message_text(m)
+                for m in turn
+                if isinstance(m, AIMessage) and m.content and not m.tool_calls
+            ]
+            return AIMessage(content="\n\n".join(answers) or "Done.")
+        assistants = [_ASSISTANTS[domain] for domain in _domains(_last_human(messages))]
+        if len(assistants) > 1 and "transfer_to_assistants" in self.tool_names:
+            return _tool_call(
+                "transfer_to_assistants", {"assistants": assistants}, messages
+            )
+        transfer = f"transfer_to_{assistants[0]}" if assistants else None
+        if transfer in self.tool_names:
+            return _tool_call(transfer, {}, messages)
+        return AIMessage(
+            content="I can help with flights, hotels and car rentals. What do you need?"
+        )
+
+    def _assistant(self, messages: Sequence[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        if isinstance(last, ToolMessage) and last.name in self.tool_names:
+            return AIMessage(content=f"Here is what I found: {get_message_text(last)}")
+        text = _last_human(messages)
+        domain = next(
+            (d for d in _ASSISTANTS if f"book_{d}" in self.tool_names), "flight"
+        )
+        dates = _DATE.findall(text)
+        lowered = text.lower()
+        if "cancel" in lowered or "change" in lowered:
+            history = " ".join(get_message_text(m) for m in messages)
+            numbers = _CONFIRMATION.findall(history)
+            if not numbers:
+                return AIMessage(content="Which confirmation number should I use?")
+            if "cancel" in lowered:
+                return _tool_call(
+                    f"cancel_{domain}", {"confirmation_number": numbers[-1]}, messages
+                )
+            field = {
+                "flight": "new_departure_date",
+                "hotel": "new_check_in_date",
+                "car": "new_pickup_date",
+            }[domain]
+            return _tool_call(
+                f"change_{domain}",
+                {
+                    "confirmation_number": numbers[-1],
+                    field: dates[0] if dates else None,
+                },
+                messages,
+            )
+        if "book" in lowered:
+            contact = {"email": "traveller@example.com", "phone": "+1 555 0100"}
+            args = {
+                "flight": {
+                    "flight_id": "SIM100",
+                    "passenger_name": "Sam Traveller",
+                    **contact,
+                },
+                "hotel": {
+                    "hotel_id": "SIMHOTEL",
+                    "guest_name": "Sam Traveller",
+                    **contact,
+                },
+                "car": {
+                    "car_id": "SIMCAR",
+                    "driver_name": "Sam Traveller",
+                    "license_number": "D1234567",
+                    **contact,
+                },
+            }[domain]
+            return _tool_call(f"book_{domain}", args, messages)
+        start, end = (dates + [None, None])[:2]
+        if domain == "flight":
+            route = _ROUTE.search(text)
+            origin, destination = route.groups() if route else ("New York", "London")
+            return _tool_call(
+                "search_flights",
+                {
+                    "origin": origin.strip(),
+                    "destination": destination.strip(),
+                    "departure_date": start,
+                    "return_date": end,
+                },
+                messages,
+            )
+        place = _IN.search(text)
+        location = place.group(1).strip() if place else "London"
+        if domain == "hotel":
+            return _tool_call(
+                "search_hotels",
+                {"location": location, "check_in_date": start, "check_out_date": end},
+                messages,
+            )
+        return _tool_call(
+            "search_cars",
+            {"location": location, "pickup_date": start, "dropoff_date": end},
+            messages,
+        )
+
+    def _reply(self, messages: Sequence[BaseMessage]) -> AIMessage:
+        if self.tool_choice == "none":
+            return AIMessage(content="Here is what I found so far.")
+        if self.model == "supervisor":
+            return self._supervisor(messages)
+        return self._assistant(messages)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay = settings.model_latency.sample()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._generate(messages)
+
+
+async def simulated_search(query: str, max_results: int) -> Any:
+    """Return recorded or canned search results with prices after a simulated delay."""
+    delay = settings.search_latency.sample()
+    if delay:
+        await asyncio.sleep(delay)
+    if query in settings.recording:
+        return settings.recording[query][:max_results]
+    seed = sum(map(ord, query))
+    return [
+        {
+            "title": f"Option {i + 1} for {query[:60]}",
+            "url": f"https://example.com/{seed % 9973}/{i}",
+            "content": f"Prices from ${80 + (seed + 37 * i) % 400}. Free cancellation on selected fares.",
+        }
+        for i in range(max_results)
+    ]
+
+
+def register_simulated_models() -> None:
+    """Make `load_chat_model` resolve `simulated/<role>` model names to `SimulatedChatModel`."""
+    register_chat_model_provider(
+        "simulated", lambda model: SimulatedChatModel(model=model)
+    )
+
+
+def install(
+    model_latency: LatencyDistribution | None = None,
+    search_latency: LatencyDistribution | None = None,
+    recording_path: str | None = None,
+    *,
+    search: bool = True,
+) -> None:
+    """Register the simulated models, set the simulated latencies and use the simulated search backend.
+
+    `recording_path` is a JSONL file of `{"query": ..., "results": [...]}` lines, e.g.
+    captured from real searches, whose results are replayed for matching queries. With
+    `search=False`, the configured search backend is kept.
+    """
+    from travel_master.search_cache import search_cache
+
+    register_simulated_models()
+    if model_latency is not None:
+        settings.model_latency = model_latency
+    if search_latency is not None:
+        settings.search_latency = search_latency
+    if recording_path is not None:
+        with open(recording_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    settings.recording[record["query"]] = record["results"]
+    if search:
+        search_cache.backend = simulated_search
+
+
+def simulated_graph() -> Any:
+    """Get the Travel Master graph with the simulated search backend (a worker pool factory).
+
+    Runs must pass `SIMULATED_CONFIGURABLE` so the simulated models are used.
+    """
+    install()
+    from travel_master.travel_master import graph
+
+    return graph
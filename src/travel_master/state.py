@@ -8,8 +8,11 @@ from typing import Sequence
 from langchain_core.messages import AnyMessage
 from langgraph.graph import add_messages
 from langgraph.managed import IsLastStep
+from langgraph.prebuilt.chat_agent_executor import AgentState
 from typing_extensions import Annotated
 
+from travel_master.itinerary import Itinerary, merge_itinerary
+
 
 @dataclass
 class InputState:
@@ -37,6 +40,15 @@ class InputState:
     updating by ID to maintain an "append-only" state unless a message with the same ID is provided.
     """
 
+    itinerary: Annotated[Itinerary, merge_itinerary] = field(default_factory=dict)
+    """
+    The trip details and bookings gathered so far (destination, dates, travellers, confirmation numbers).
+
+    Filled in by the tool node from tool arguments and results, and passed between the supervisor
+    and the assistants so they do not have to recover these details from the message history.
+    `merge_itinerary` merges partial updates; known details are never cleared by missing values.
+    """
+
 
 @dataclass
 class State(InputState):
@@ -58,3 +70,9 @@ class State(InputState):
     # retrieved_documents: List[Document] = field(default_factory=list)
     # extracted_entities: Dict[str, Any] = field(default_factory=dict)
     # api_connections: Dict[str, Any] = field(default_factory=dict)
+
+
+class SupervisorState(AgentState, total=False):
+    """The state of the supervisor workflow, which carries the itinerary between assistants."""
+
+    itinerary: Annotated[Itinerary, merge_itinerary]
@@ -0,0 +1,274 @@
+"""Execution of the tool calls requested by the assistants.
+
+`TravelToolNode` replaces the prebuilt `ToolNode` in the assistant graphs. Before any tool
+runs, every call goes through the argument validators in `travel_master.validation`:
+safely correctable arguments are rewritten in place (the AI message is replaced so the
+history shows the arguments that actually ran), and calls with invalid arguments are
+answered with a compact error without touching the backend. Successful calls also update
+the structured itinerary in the state (see `travel_master.itinerary`). With
+`direct_tool_responses` enabled, booking, cancellation and change results are answered from
+templates (see `travel_master.responses`) and `route_after_tools` ends the assistant graph.
+Calls repeating an earlier call of the turn are answered with its result, and repeated
+too often they end the assistant graph as a loop (see `travel_master.loop_guard`).
+Bookings, cancellations and changes are recorded in the audit log when it is enabled
+(see `travel_master.audit_log`).
+
+The tools are coroutines, and the calls of one step run concurrently, at most
+`max_concurrent_tool_calls` at a time, so a step takes as long as its slowest call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Sequence,
+    cast,
+)
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langchain_core.tools import tool as create_tool
+from pydantic import BaseModel
+
+from travel_master.audit_log import is_audited, open_audit_log
+from travel_master.configuration import Configuration
+from travel_master.itinerary import Itinerary, itinerary_update, merge_itinerary
+from travel_master.loop_guard import find_repeat, loop_counters
+from travel_master.metrics import get_counters
+from travel_master.responses import DIRECT_RESPONSE_TOOLS, render_tool_response
+from travel_master.state import State
+from travel_master.validation import validate_tool_args
+
+TOOL_ERROR_TEMPLATE = "Error: {error}\n Please fix your mistakes."
+LOOP_ABORT_RESPONSE = (
+    "Sorry, I keep getting the same results for this request. "
+    "Could you rephrase it or give me more details?"
+)
+
+
+def _dumps(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+def _loads(content: Any) -> Dict[str, Any]:
+    try:
+        payload = json.loads(content) if isinstance(content, str) else content
+    except ValueError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+class TravelToolNode:
+    """Run the tool calls of the latest AI message, validating arguments first."""
+
+    def __init__(self, tools: Sequence[Callable[..., Any]]) -> None:
+        """Create a node for the given tool functions."""
+        self.tools_by_name: Dict[str, BaseTool] = {}
+        self.required_args: Dict[str, FrozenSet[str]] = {}
+        for fn in tools:
+            tool = fn if isinstance(fn, BaseTool) else create_tool(fn)
+            self.tools_by_name[tool.name] = tool
+            schema = tool.tool_call_schema
+            required = (
+                schema.model_json_schema().get("required", [])
+                if isinstance(schema, type) and issubclass(schema, BaseModel)
+                else schema.get("required", [])
+                if isinstance(schema, dict)
+                else []
+            )
+            self.required_args[tool.name] = frozenset(required)
+        self.counters = get_counters("tool_node")
+
+    def validate(
+        self, tool_call: ToolCall, configuration: Configuration
+    ) -> tuple[ToolCall, Dict[str, str]]:
+        """Normalize a tool call's arguments and collect argument errors."""
+        name = tool_call["name"]
+        if name not in self.tools_by_name:
+            return tool_call, {
+                "name": f"unknown tool; choose one of: {', '.join(self.tools_by_name)}"
+            }
+        today = datetime.fromisoformat(configuration.get_current_time()).date()
+        args, errors = validate_tool_args(name, tool_call["args"], today)
+        for arg in sorted(self.required_args[name] - args.keys()):
+            errors.setdefault(arg, "required")
+        return cast(ToolCall, {**tool_call, "args": args}), errors
+
+    async def run_tool(
+        self,
+        tool_call: ToolCall,
+        config: RunnableConfig,
+        slots: asyncio.Semaphore | None = None,
+    ) -> ToolMessage:
+        """Invoke a single (validated) tool call, holding one of the step's slots if given."""
+        if slots is not None:
+            async with slots:
+                return await self.run_tool(tool_call, config)
+        tool = self.tools_by_name[tool_call["name"]]
+        try:
+            output = cast(
+                ToolMessage,
+                await tool.ainvoke({**tool_call, "type": "tool_call"}, config),
+            )
+        except Exception as e:
+            self.counters.incr("tool_errors")
+            output = ToolMessage(
+                content=TOOL_ERROR_TEMPLATE.format(error=repr(e)),
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                status="error",
+            )
+        configuration = Configuration.from_runnable_config(config)
+        if configuration.enable_audit_log and is_audited(tool_call["name"]):
+            # Only queued here; the audit log is written in the background
+            result = _loads(output.content) or {
+                "status": "error",
+                "message": output.content,
+            }
+            open_audit_log(
+                configuration.audit_log_dir, configuration.audit_log_segment_bytes
+            ).record(
+                tool_call["name"],
+                tool_call["args"],
+                result,
+                thread_id=config.get("configurable", {}).get("thread_id"),
+            )
+        return output
+
+    def itinerary_updates(
+        self, calls: Sequence[ToolCall], outputs: Sequence[AnyMessage]
+    ) -> Itinerary:
+        """Collect the itinerary updates of the successful tool calls."""
+        args_by_id = {call["id"]: call["args"] for call in calls}
+        update: Itinerary = {}
+        for output in outputs:
+            if not isinstance(output, ToolMessage) or output.status == "error":
+                continue
+            update = merge_itinerary(
+                update,
+                itinerary_update(
+                    output.name or "",
+                    args_by_id.get(output.tool_call_id, {}),
+                    _loads(output.content),
+                ),
+            )
+        return update
+
+    def direct_response(
+        self, calls: Sequence[ToolCall], outputs: Sequence[AnyMessage]
+    ) -> AIMessage | None:
+        """Answer from templates when every call is a successful deterministic tool call."""
+        if not calls or any(
+            call["name"] not in DIRECT_RESPONSE_TOOLS for call in calls
+        ):
+            return None
+        args_by_id = {call["id"]: call["args"] for call in calls}
+        parts: List[str] = []
+        for output in outputs:
+            if not isinstance(output, ToolMessage) or output.status == "error":
+                return None
+            text = render_tool_response(
+                output.name or "",
+                args_by_id.get(output.tool_call_id, {}),
+                _loads(output.content),
+            )
+            if text is None:
+                return None
+            parts.append(text)
+        self.counters.incr("direct_responses")
+        return AIMessage(
+            content="\n\n".join(parts), response_metadata={"direct_response": True}
+        )
+
+    async def __call__(self, state: State, config: RunnableConfig) -> Dict[str, Any]:
+        """Validate and execute the tool calls of the last AI message."""
+        configuration = Configuration.from_runnable_config(config)
+        message = cast(AIMessage, state.messages[-1])
+
+        validated: List[ToolCall] = []
+        pending: List[Awaitable[ToolMessage]] = []
+        slots = asyncio.Semaphore(max(configuration.max_concurrent_tool_calls, 1))
+        # One output per call, in the order of the calls; None until the tool has run.
+        # Repeats and invalid arguments are answered without running the tool.
+        answered: List[AnyMessage | None] = []
+        looping = False
+        for tool_call in message.tool_calls:
+            call, errors = self.validate(tool_call, configuration)
+            validated.append(call)
+            repeat = (
+                find_repeat(state.messages, call["name"], call["args"])
+                if configuration.enable_loop_detection and not errors
+                else None
+            )
+            if repeat is not None:
+                loop_counters.incr("exact_repeats" if repeat.exact else "near_repeats")
+                looping = looping or repeat.count > configuration.loop_max_repeats
+                answered.append(
+                    ToolMessage(
+                        content=repeat.prior.content,
+                        name=call["name"],
+                        tool_call_id=call["id"],
+                        response_metadata={"repeat_of": repeat.prior.tool_call_id},
+                    )
+                )
+            elif errors:
+                self.counters.incr("rejected_calls")
+                answered.append(
+                    ToolMessage(
+                        content=_dumps({"status": "error", "errors": errors}),
+                        name=call["name"],
+                        tool_call_id=call["id"],
+                        status="error",
+                    )
+                )
+            else:
+                answered.append(None)
+                pending.append(self.run_tool(call, config, slots))
+        if len(pending) > 1:
+            self.counters.incr("concurrent_steps")
+        ran = iter(await asyncio.gather(*pending))
+        outputs: List[AnyMessage] = [
+            next(ran) if output is None else output for output in answered
+        ]
+
+        messages: List[AnyMessage] = []
+        if validated != message.tool_calls:
+            # Same ID, so the reducer replaces the original message with the corrected calls
+            self.counters.incr("corrected_messages")
+            messages.append(message.model_copy(update={"tool_calls": validated}))
+        messages.extend(outputs)
+        if looping:
+            loop_counters.incr("loop_aborts")
+            messages.append(
+                AIMessage(
+                    content=LOOP_ABORT_RESPONSE, response_metadata={"loop_abort": True}
+                )
+            )
+        elif configuration.direct_tool_responses:
+            response = self.direct_response(validated, outputs)
+            if response is not None:
+                messages.append(response)
+        itinerary = self.itinerary_updates(validated, outputs)
+        if itinerary:
+            return {"messages": messages, "itinerary": itinerary}
+        return {"messages": messages}
+
+
+def route_after_tools(state: State) -> str:
+    """Route back to the assistant, or end when the tool node already answered."""
+    last = state.messages[-1] if state.messages else None
+    if isinstance(last, AIMessage) and (
+        last.response_metadata.get("direct_response")
+        or last.response_metadata.get("loop_abort")
+    ):
+        return "__end__"
+    return "assistant"
@@ -2,53 +2,254 @@
 
 This module creates a supervisor that coordinates between the Flight assistant,
 Accommodation assistant, and Car Rental assistant to provide comprehensive travel services.
+
+Independently of the checkpointer, `CheckpointDurability` sets how often a turn is
+checkpointed (see `compile_graph`). Every step of the assistants' graphs (assistant,
+tools, assistant again...) is a checkpoint by default; with "subgraph_exit" an
+assistant's graph is checkpointed once, as a step of the supervisor, when it exits; with
+"turn_end" only the state at the end of the turn is written.
 """
 
-from langgraph_supervisor import create_supervisor
+from dataclasses import replace
+from typing import Annotated, Any, Dict, List, Literal, cast
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.tools import BaseTool, InjectedToolCallId, StructuredTool, tool
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph import StateGraph
+from langgraph.prebuilt import InjectedState
+from langgraph.pregel import Pregel
+from langgraph.types import Command, Durability
+from langgraph_supervisor import create_handoff_tool, create_supervisor
 
-from travel_master.configuration import Configuration
-from travel_master.flight_assistant.flight_assistant import graph as flight_assistant
+from travel_master.accommodation_assistant.accommodation_assistant import (
+    compile_graph as compile_accommodation_assistant,
+)
 from travel_master.accommodation_assistant.accommodation_assistant import (
     graph as accommodation_assistant,
 )
-from travel_master.car_rental_assistant.car_rental_assistant import graph as car_rental_assistant
-from travel_master.utils import load_chat_model
+from travel_master.car_rental_assistant.car_rental_assistant import (
+    compile_graph as compile_car_rental_assistant,
+)
+from travel_master.car_rental_assistant.car_rental_assistant import (
+    graph as car_rental_assistant,
+)
+from travel_master.commands import handle_command, route_after_command, route_turn
+from travel_master.configuration import Configuration
+from travel_master.flight_assistant.flight_assistant import (
+    compile_graph as compile_flight_assistant,
+)
+from travel_master.flight_assistant.flight_assistant import (
+    graph as flight_assistant,
+)
+from travel_master.model_tiering import TieredChatModel
+from travel_master.profiling import profiled
+from travel_master.response_cache import lookup_cached_response, store_response
+from travel_master.state import InputState, State, SupervisorState
 
-# Initialize the model using Configuration
+# Initialize the model using Configuration; the concrete model is chosen per call
 config = Configuration()
-model = load_chat_model(config.supervisor_model)
+model = TieredChatModel(role="supervisor")
 
 # Get current system time with configured timezone
 system_time = config.get_current_time()
 
-# Create supervisor workflow with recursion limit
-workflow = create_supervisor(
-    [flight_assistant, accommodation_assistant, car_rental_assistant],
-    model=model,
-    prompt=(
-        "You are the Travel Master, a team supervisor managing a flight assistant, an accommodation assistant, and a car rental assistant. "
-        "You can use all the assistants to help users plan and book their travel needs. "
-        "Choose the appropriate assistant based on the user's travel requirements:\n"
-        "• Flight assistant can help search, book, cancel, and change flight reservations.\n"
-        "• Accommodation assistant can help search, book, cancel, and change hotel and lodging reservations.\n"
-        "• Car rental assistant can help search, book, cancel, and change car rental reservations.\n\n"
-        "IMPORTANT: When responding to the user:\n"
-        "1. Forward the entire message from the sub-assistant without modification if it has follow-up questions. Do not analyze, hallucinate, or take any other actions apart from forwarding the message and assigning tasks to the sub-assistant.\n"
-        "2. Include ALL information and details provided by the assistants in your response.\n"
-        "3. Present the information as if it's coming directly from you - do not mention which assistant provided what.\n"
-        "4. NEVER assume the user has seen any previous information - always provide COMPLETE context.\n"
-        "5. Organize the information in a clear, logical flow without revealing the underlying assistant structure.\n"
-        "6. Make sure NO important details from any assistant are lost or summarized away.\n"
-        "7. Do not summarize or selectively choose which fields to include - you MUST include ALL fields from ALL responses.\n"
-        "8. COPY ALL DETAILS EXACTLY as provided by the assistants - do not paraphrase or omit any information.\n"
-        "9. When an assistant provides a complete answer, respond to the user immediately without further delegation.\n"
-        "10. Only delegate to assistants when the user explicitly asks for travel-related help.\n"
-        f"\n\nSystem time: {system_time} ({config.timezone})"
+AssistantName = Literal[
+    "flight_assistant", "accommodation_assistant", "car_rental_assistant"
+]
+
+
+@tool("transfer_to_assistants")
+def transfer_to_assistants(
+    assistants: List[AssistantName],
+    state: Annotated[Dict[str, Any], InjectedState],
+    tool_call_id: Annotated[str, InjectedToolCallId],
+) -> Command[str]:
+    """Ask several assistants for help at once, e.g. for a flight and a hotel for the same trip."""
+    names = list(dict.fromkeys(assistants))
+    tool_message = ToolMessage(
+        content=f"Successfully transferred to {', '.join(names)}",
+        name="transfer_to_assistants",
+        tool_call_id=tool_call_id,
     )
+    # One handoff to every assistant; they run in the same step and all report back. Like a
+    # single handoff, the update keeps the handoff call and its result in the shared
+    # history (the tool node drops the update of a handoff made of Sends)
+    return Command(
+        graph=Command.PARENT,
+        goto=names,
+        update={"messages": [*state["messages"], tool_message]},
+    )
+
+
+# Only offered to the supervisor model with the `parallel_tool_calls` configuration
+transfer_to_assistants.metadata = {"parallel_tool_calls": True}
+
+
+def create_transfer_tool(agent_name: AssistantName) -> BaseTool:
+    """Create the library's handoff tool to an assistant, minus the supervisor agent's step counter.
+
+    The library's tool copies the whole state of the supervisor's agent into the handoff,
+    including its managed `remaining_steps`, which the supervisor workflow has no channel
+    for (LangGraph would log that the write is ignored on every handoff).
+    """
+    handoff = create_handoff_tool(agent_name=agent_name)
+    assert isinstance(handoff, StructuredTool) and handoff.func is not None
+    run = handoff.func
+
+    @tool(handoff.name, description=handoff.description)
+    def transfer(
+        state: Annotated[Dict[str, Any], InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ) -> Command[str]:
+        state = {key: value for key, value in state.items() if key != "remaining_steps"}
+        return cast(Command[str], run(state, tool_call_id))
+
+    transfer.metadata = handoff.metadata
+    return transfer
+
+
+TRANSFER_TOOLS = [
+    create_transfer_tool("flight_assistant"),
+    create_transfer_tool("accommodation_assistant"),
+    create_transfer_tool("car_rental_assistant"),
+]
+
+SUPERVISOR_PROMPT = (
+    "You are the Travel Master, a team supervisor managing a flight assistant, an accommodation assistant, and a car rental assistant. "
+    "You can use all the assistants to help users plan and book their travel needs. "
+    "Choose the appropriate assistant based on the user's travel requirements:\n"
+    "• Flight assistant can help search, book, cancel, and change flight reservations.\n"
+    "• Accommodation assistant can help search, book, cancel, and change hotel and lodging reservations.\n"
+    "• Car rental assistant can help search, book, cancel, and change car rental reservations.\n\n"
+    "IMPORTANT: When responding to the user:\n"
+    "1. Forward the entire message from the sub-assistant without modification if it has follow-up questions. Do not analyze, hallucinate, or take any other actions apart from forwarding the message and assigning tasks to the sub-assistant.\n"
+    "2. Include ALL information and details provided by the assistants in your response.\n"
+    "3. Present the information as if it's coming directly from you - do not mention which assistant provided what.\n"
+    "4. NEVER assume the user has seen any previous information - always provide COMPLETE context.\n"
+    "5. Organize the information in a clear, logical flow without revealing the underlying assistant structure.\n"
+    "6. Make sure NO important details from any assistant are lost or summarized away.\n"
+    "7. Do not summarize or selectively choose which fields to include - you MUST include ALL fields from ALL responses.\n"
+    "8. COPY ALL DETAILS EXACTLY as provided by the assistants - do not paraphrase or omit any information.\n"
+    "9. When an assistant provides a complete answer, respond to the user immediately without further delegation.\n"
+    "10. Only delegate to assistants when the user explicitly asks for travel-related help.\n"
+    f"\n\nSystem time: {system_time} ({config.timezone})"
 )
 
-# Compile the workflow with recursion limit and set the name
-graph = workflow.compile()
-# Set recursion limit
-graph = graph.with_config({"recursion_limit": 15})
-graph.name = "travel_master" 
\ No newline at end of file
+
+CheckpointDurability = Literal["step", "subgraph_exit", "turn_end"]
+
+# The LangGraph durability of the runs of each mode; the graphs below the supervisor are
+# not checkpointed on their own below "step"
+RUN_DURABILITY: Dict[CheckpointDurability, Durability] = {
+    "step": "async",
+    "subgraph_exit": "async",
+    "turn_end": "exit",
+}
+
+
+def build_supervisor(
+    durability: CheckpointDurability = "step",
+) -> Pregel[Any, Any, Any, Any]:
+    """Compile the supervisor over the assistants' graphs compiled for a durability mode."""
+    checkpoint_steps = durability == "step"
+    assistants = (
+        [flight_assistant, accommodation_assistant, car_rental_assistant]
+        if checkpoint_steps
+        else [
+            compile_flight_assistant(checkpoint_steps),
+            compile_accommodation_assistant(checkpoint_steps),
+            compile_car_rental_assistant(checkpoint_steps),
+        ]
+    )
+    workflow = create_supervisor(
+        assistants,
+        model=model,
+        tools=[transfer_to_assistants, *TRANSFER_TOOLS],
+        prompt=SUPERVISOR_PROMPT,
+        # Carry the itinerary through the supervisor so every assistant sees it
+        state_schema=SupervisorState,
+    )
+    if not checkpoint_steps:
+        # The supervisor's own agent is a graph too: use a copy of it built without a
+        # checkpointer, like the assistants' graphs
+        node = workflow.nodes["supervisor"]
+        agent = node.runnable
+        assert isinstance(agent, Pregel)
+        workflow.nodes["supervisor"] = replace(
+            node, runnable=agent.copy(update={"checkpointer": False})
+        )
+    # Compile the supervisor workflow so it can run as a node of the outer graph
+    return workflow.compile(name="supervisor")
+
+
+supervisor = build_supervisor()
+
+
+def route_after_cache_lookup(state: State) -> str:
+    """Skip the supervisor when the response cache already answered the turn."""
+    last = state.messages[-1] if state.messages else None
+    if isinstance(last, AIMessage) and last.response_metadata.get("cache"):
+        return "__end__"
+    return "supervisor"
+
+
+def build_graph(
+    supervisor: Pregel[Any, Any, Any, Any],
+) -> StateGraph[Any, Any, Any, Any]:
+    """Define the outer graph: (direct command ->) response cache lookup -> supervisor -> response cache store."""
+    builder = StateGraph(State, context_schema=Configuration, input_schema=InputState)
+    builder.add_node("direct_command", handle_command)
+    builder.add_node("response_cache_lookup", lookup_cached_response)
+    builder.add_node("supervisor", supervisor)
+    builder.add_node("response_cache_store", store_response)
+    builder.add_conditional_edges(
+        "__start__", route_turn, ["direct_command", "response_cache_lookup"]
+    )
+    builder.add_conditional_edges(
+        "direct_command", route_after_command, ["response_cache_lookup", "__end__"]
+    )
+    builder.add_conditional_edges(
+        "response_cache_lookup", route_after_cache_lookup, ["supervisor", "__end__"]
+    )
+    builder.add_edge("supervisor", "response_cache_store")
+    builder.add_edge("response_cache_store", "__end__")
+    return builder
+
+
+builder = build_graph(supervisor)
+
+
+def compile_graph(
+    checkpointer: BaseCheckpointSaver[Any] | None = None,
+    durability: CheckpointDurability = "step",
+) -> Runnable[Any, Any]:
+    """Compile the Travel Master with a checkpointer and how often it checkpoints a turn.
+
+    Args:
+        checkpointer: The saver of the conversations' state.
+        durability: "step" checkpoints every step, including each step of the assistants'
+            graphs; "subgraph_exit" checkpoints an assistant's graph once, when it exits;
+            "turn_end" only writes the state at the end of the turn.
+    """
+    graph_builder = (
+        builder if durability == "step" else build_graph(build_supervisor(durability))
+    )
+    # Compile the graph with recursion limit and set the name
+    compiled = graph_builder.compile(checkpointer=checkpointer)
+    # Set recursion limit
+    compiled = compiled.with_config({"recursion_limit": 15})
+    compiled.name = "travel_master"
+    if RUN_DURABILITY[durability] == "async":
+        # The LangGraph default
+        return compiled
+    return compiled.bind(durability=RUN_DURABILITY[durability])
+
+
+graph = cast(Pregel[Any, Any, Any, Any], compile_graph())
+
+
+def make_graph(config: RunnableConfig) -> Pregel[Any, Any, Any, Any]:
+    """Get the graph for one run; the LangGraph server calls this for every run."""
+    return profiled(graph, config)
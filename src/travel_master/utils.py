@@ -1,9 +1,22 @@
 """Utility & helper functions."""
 
+from functools import lru_cache
+from typing import Callable, Dict
+
 from langchain.chat_models import init_chat_model
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import BaseMessage
 
+_providers: Dict[str, Callable[[str], BaseChatModel]] = {}
+
+
+def register_chat_model_provider(
+    provider: str, factory: Callable[[str], BaseChatModel]
+) -> None:
+    """Make `load_chat_model` build the models of a provider with a factory of the model name."""
+    _providers[provider] = factory
+    load_chat_model.cache_clear()
+
 
 def get_message_text(msg: BaseMessage) -> str:
     """Get the text content of a message."""
@@ -17,28 +30,34 @@ def get_message_text(msg: BaseMessage) -> str:
         return "".join(txts).strip()
 
 
+@lru_cache(maxsize=32)
 def load_chat_model(fully_specified_name: str) -> BaseChatModel:
     """Load a chat model from a fully specified name.
 
+    Models are cached by name, so every caller shares one client and connection pool.
+
     Args:
         fully_specified_name (str): String in the format 'provider/model'.
     """
     provider, model = fully_specified_name.split("/", maxsplit=1)
-    
+
+    if provider in _providers:
+        return _providers[provider](model)
+
     if provider == "azure_openai":
         # For Azure OpenAI, we need to pass additional parameters
         from langchain_openai import AzureChatOpenAI
 
         from travel_master.configuration import Configuration
-        
+
         # Get configuration
         config = Configuration()
-        
+
         return AzureChatOpenAI(
             model=model,
             api_version=config.azure_api_version,
             azure_endpoint=config.azure_endpoint,
-            temperature=0.1
+            temperature=0.1,
         )
     else:
         return init_chat_model(model, model_provider=provider, temperature=0.1)
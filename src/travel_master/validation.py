@@ -0,0 +1,375 @@
+"""Pre-execution validation of tool call arguments.
+
+Malformed arguments (wrong date formats, check-out before check-in, past dates, bad
+confirmation numbers) would otherwise surface deep inside a tool as a generic error, or
+worse, as a wasted backend search. Every tool has a validator compiled once at import
+time. Validators normalize what they safely can (e.g. "2030/3/5" -> "2030-03-05",
+"9am" -> "09:00", "fl 123456" -> "FL123456") and report precise, compact errors for the
+rest so the model can fix the call in one go.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# Formats that can be converted to YYYY-MM-DD without guessing the day/month order
+_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y.%m.%d",
+    "%Y%m%d",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%B %d %Y",
+    "%b %d %Y",
+)
+_ORDINAL_SUFFIX = re.compile(r"(?<=\d)(st|nd|rd|th)\b", re.IGNORECASE)
+_TIME = re.compile(
+    r"^\s*(\d{1,2})(?::?(\d{2}))?\s*([ap])?\.?\s*m?\.?\s*$", re.IGNORECASE
+)
+_CONFIRMATION = re.compile(r"^\s*([A-Za-z]{2})[\s-]*(\d{6})\s*$")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+CONFIRMATION_PREFIXES = {"flight": "FL", "hotel": "HT", "car": "CR"}
+
+
+class ArgumentError(ValueError):
+    """Raised by a field rule when an argument cannot be used or safely corrected."""
+
+
+FieldRule = Callable[[Any, date], Any]
+CrossCheck = Callable[[Dict[str, Any]], Tuple[str, str] | None]
+
+
+def parse_date(value: Any) -> date:
+    """Parse a date in any of the unambiguous accepted formats."""
+    text = _ORDINAL_SUFFIX.sub("", str(value).strip()).replace(",", " ")
+    text = " ".join(text.split())
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ArgumentError(f"'{value}' is not a valid date; use YYYY-MM-DD")
+
+
+def date_rule(allow_past: bool = False) -> FieldRule:
+    """Build a rule normalizing a date to YYYY-MM-DD and rejecting past dates."""
+
+    def rule(value: Any, today: date) -> str:
+        parsed = parse_date(value)
+        if not allow_past and parsed < today:
+            raise ArgumentError(
+                f"{parsed.isoformat()} is in the past (today is {today.isoformat()})"
+            )
+        return parsed.isoformat()
+
+    return rule
+
+
+def time_rule(value: Any, today: date) -> str:
+    """Normalize a time of day to HH:MM."""
+    match = _TIME.match(str(value))
+    if not match:
+        raise ArgumentError(f"'{value}' is not a valid time; use HH:MM")
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = (match.group(3) or "").lower()
+    if meridiem and not 1 <= hour <= 12:
+        raise ArgumentError(f"'{value}' is not a valid time; use HH:MM")
+    if meridiem == "p" and hour != 12:
+        hour += 12
+    elif meridiem == "a" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        raise ArgumentError(f"'{value}' is not a valid time; use HH:MM")
+    return f"{hour:02d}:{minute:02d}"
+
+
+def int_rule(minimum: int, maximum: int) -> FieldRule:
+    """Build a rule coercing an integer and checking its range."""
+
+    def rule(value: Any, today: date) -> int:
+        try:
+            number = int(str(value).strip())
+        except ValueError:
+            raise ArgumentError(f"'{value}' is not a whole number") from None
+        if not minimum <= number <= maximum:
+            raise ArgumentError(f"must be between {minimum} and {maximum}")
+        return number
+
+    return rule
+
+
+def number_rule(minimum: float, maximum: float) -> FieldRule:
+    """Build a rule coercing a number (ignoring currency symbols and commas) and checking its range."""
+
+    def rule(value: Any, today: date) -> float:
+        try:
+            number = float(str(value).strip().lstrip("$€£¥").replace(",", ""))
+        except ValueError:
+            raise ArgumentError(f"'{value}' is not a number") from None
+        if not minimum <= number <= maximum:
+            raise ArgumentError(f"must be between {minimum:g} and {maximum:g}")
+        return number
+
+    return rule
+
+
+def text_rule(value: Any, today: date) -> str:
+    """Strip a required text argument and reject empty values."""
+    text = str(value).strip()
+    if not text:
+        raise ArgumentError("must not be empty")
+    return text
+
+
+def email_rule(value: Any, today: date) -> str:
+    """Check an email address."""
+    email = str(value).strip()
+    if not _EMAIL.match(email):
+        raise ArgumentError(f"'{value}' is not a valid email address")
+    return email
+
+
+def confirmation_rule(domain: str) -> FieldRule:
+    """Build a rule normalizing a confirmation number for a booking domain."""
+    prefix = CONFIRMATION_PREFIXES[domain]
+
+    def rule(value: Any, today: date) -> str:
+        match = _CONFIRMATION.match(str(value))
+        if not match:
+            raise ArgumentError(
+                f"'{value}' is not a valid confirmation number (expected {prefix} followed by 6 digits)"
+            )
+        number = match.group(1).upper() + match.group(2)
+        if not number.startswith(prefix):
+            other = next(
+                (d for d, p in CONFIRMATION_PREFIXES.items() if number.startswith(p)),
+                None,
+            )
+            hint = f" - it looks like a {other} booking" if other else ""
+            raise ArgumentError(
+                f"{domain} confirmation numbers start with {prefix}, got {number}{hint}"
+            )
+        return number
+
+    return rule
+
+
+def ordered(earlier: str, later: str, strict: bool) -> CrossCheck:
+    """Build a check that one date argument falls on or after another."""
+
+    def check(args: Dict[str, Any]) -> Tuple[str, str] | None:
+        if not args.get(earlier) or not args.get(later):
+            return None
+        if args[later] < args[earlier] or (strict and args[later] == args[earlier]):
+            relation = "after" if strict else "on or after"
+            return later, f"must be {relation} {earlier} ({args[earlier]})"
+        return None
+
+    return check
+
+
+def distinct(first: str, second: str) -> CrossCheck:
+    """Build a check that two arguments differ."""
+
+    def check(args: Dict[str, Any]) -> Tuple[str, str] | None:
+        if (
+            args.get(first)
+            and str(args[first]).lower() == str(args.get(second, "")).lower()
+        ):
+            return second, f"must differ from {first}"
+        return None
+
+    return check
+
+
+def any_of(*names: str) -> CrossCheck:
+    """Build a check that at least one of several optional arguments is given."""
+
+    def check(args: Dict[str, Any]) -> Tuple[str, str] | None:
+        if not any(args.get(name) not in (None, "") for name in names):
+            return names[0], f"provide at least one of: {', '.join(names)}"
+        return None
+
+    return check
+
+
+@dataclass
+class ToolValidator:
+    """Validation rules for the arguments of a single tool."""
+
+    rules: Dict[str, FieldRule]
+    checks: List[CrossCheck] = field(default_factory=list)
+
+    def __call__(
+        self, args: Dict[str, Any], today: date
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Validate arguments.
+
+        Returns:
+            tuple: The normalized arguments and a mapping of argument name to error.
+        """
+        normalized = dict(args)
+        errors: Dict[str, str] = {}
+        for name, rule in self.rules.items():
+            value = normalized.get(name)
+            if value is None or value == "":
+                continue
+            try:
+                normalized[name] = rule(value, today)
+            except ArgumentError as e:
+                errors[name] = str(e)
+        if not errors:
+            for check in self.checks:
+                problem = check(normalized)
+                if problem:
+                    errors[problem[0]] = problem[1]
+        return normalized, errors
+
+
+_future_date = date_rule()
+_passengers = int_rule(1, 9)
+_max_price = number_rule(1, 1_000_000)
+
+VALIDATORS: Dict[str, ToolValidator] = {
+    "search_flights": ToolValidator(
+        {
+            "origin": text_rule,
+            "destination": text_rule,
+            "departure_date": _future_date,
+            "return_date": _future_date,
+            "passengers": _passengers,
+            "max_price": _max_price,
+            "max_stops": int_rule(0, 3),
+        },
+        [
+            ordered("departure_date", "return_date", strict=False),
+            distinct("origin", "destination"),
+        ],
+    ),
+    "book_flight": ToolValidator(
+        {
+            "flight_id": text_rule,
+            "passenger_name": text_rule,
+            "email": email_rule,
+            "phone": text_rule,
+        }
+    ),
+    "cancel_flight": ToolValidator(
+        {"confirmation_number": confirmation_rule("flight")}
+    ),
+    "change_flight": ToolValidator(
+        {
+            "confirmation_number": confirmation_rule("flight"),
+            "new_departure_date": _future_date,
+            "new_return_date": _future_date,
+            "new_passengers": _passengers,
+        },
+        [
+            any_of("new_departure_date", "new_return_date", "new_passengers"),
+            ordered("new_departure_date", "new_return_date", strict=False),
+        ],
+    ),
+    "search_hotels": ToolValidator(
+        {
+            "location": text_rule,
+            "check_in_date": _future_date,
+            "check_out_date": _future_date,
+            "guests": int_rule(1, 20),
+            "rooms": int_rule(1, 10),
+            "max_price": _max_price,
+            "min_stars": number_rule(1, 5),
+        },
+        [ordered("check_in_date", "check_out_date", strict=True)],
+    ),
+    "book_hotel": ToolValidator(
+        {
+            "hotel_id": text_rule,
+            "guest_name": text_rule,
+            "email": email_rule,
+            "phone": text_rule,
+        }
+    ),
+    "cancel_hotel": ToolValidator({"confirmation_number": confirmation_rule("hotel")}),
+    "change_hotel": ToolValidator(
+        {
+            "confirmation_number": confirmation_rule("hotel"),
+            "new_check_in_date": _future_date,
+            "new_check_out_date": _future_date,
+            "new_guests": int_rule(1, 20),
+            "new_rooms": int_rule(1, 10),
+        },
+        [
+            any_of(
+                "new_check_in_date",
+                "new_check_out_date",
+                "new_guests",
+                "new_rooms",
+                "new_room_type",
+            ),
+            ordered("new_check_in_date", "new_check_out_date", strict=True),
+        ],
+    ),
+    "search_cars": ToolValidator(
+        {
+            "location": text_rule,
+            "pickup_date": _future_date,
+            "dropoff_date": _future_date,
+            "pickup_time": time_rule,
+            "dropoff_time": time_rule,
+            "age": int_rule(18, 99),
+            "max_price": _max_price,
+        },
+        [ordered("pickup_date", "dropoff_date", strict=False)],
+    ),
+    "book_car": ToolValidator(
+        {
+            "car_id": text_rule,
+            "driver_name": text_rule,
+            "email": email_rule,
+            "phone": text_rule,
+            "license_number": text_rule,
+        }
+    ),
+    "cancel_car": ToolValidator({"confirmation_number": confirmation_rule("car")}),
+    "change_car": ToolValidator(
+        {
+            "confirmation_number": confirmation_rule("car"),
+            "new_pickup_date": _future_date,
+            "new_dropoff_date": _future_date,
+            "new_pickup_time": time_rule,
+            "new_dropoff_time": time_rule,
+        },
+        [
+            any_of(
+                "new_pickup_date",
+                "new_dropoff_date",
+                "new_pickup_time",
+                "new_dropoff_time",
+                "new_car_type",
+                "new_pickup_location",
+            ),
+            ordered("new_pickup_date", "new_dropoff_date", strict=False),
+        ],
+    ),
+}
+
+
+def validate_tool_args(
+    name: str, args: Dict[str, Any], today: date
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Validate and normalize the arguments of a tool call.
+
+    Tools without a registered validator are passed through unchanged.
+
+    Returns:
+        tuple: The normalized arguments and a mapping of argument name to error.
+    """
+    validator = VALIDATORS.get(name)
+    if validator is None:
+        return args, {}
+    return validator(args, today)
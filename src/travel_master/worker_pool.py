@@ -0,0 +1,456 @@
+"""Run the graph in a pool of worker processes with sticky routing by thread ID.
+
+A single process runs every conversation on one event loop and one core, so CPU work
+(serialization, message merging, prompt formatting) competes with I/O. `WorkerPool`
+spawns N worker processes, each with its own event loop and graph, and routes every
+conversation to the worker chosen by a stable hash of its thread ID. Because routing is
+sticky, a worker keeps the state of its conversations in memory between turns. Beyond
+`max_threads_per_worker` conversations, the least recently used ones are spilled to the
+shared cache file (or to a private file of the worker when caches are not shared) and
+restored from it on their next turn.
+
+A worker process that dies fails the turns it had in progress with `WorkerDied`, and so
+do later turns routed to it.
+
+Workers share search results and cached responses through a `SharedCache` file, so a
+search run by one worker is a cache hit for the others. With `admission` limits, each
+worker admits turns into its graph by priority lane (see `travel_master.admission`) and
+answers the turns it sheds with a fast "busy" reply.
+
+Example:
+    async with WorkerPool(workers=4) as pool:
+        reply = await pool.submit("thread-1", "Find flights from Paris to Rome on 2030-05-01")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import multiprocessing as mp
+import os
+import queue
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import nullcontext
+from itertools import count
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    messages_from_dict,
+    messages_to_dict,
+)
+from langchain_core.runnables import RunnableConfig
+
+from travel_master.admission import (
+    BUSY_RESPONSE,
+    AdmissionController,
+    AdmissionLimits,
+    Lane,
+    Overloaded,
+    classify_turn,
+)
+from travel_master.audit_log import close_audit_logs
+from travel_master.memory_diagnostics import MemoryDiagnostics
+from travel_master.metrics import get_counters
+from travel_master.profiling import profiled
+from travel_master.shared_cache import SharedCache
+from travel_master.utils import get_message_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRAPH = "travel_master.travel_master:graph"
+
+# How long the state of a conversation evicted from worker memory is kept on disk
+SPILLED_THREAD_TTL_SECONDS = 30 * 86400
+
+# How often the pool checks that its workers are alive
+LIVENESS_INTERVAL_SECONDS = 1.0
+
+pool_counters = get_counters("worker_pool")
+
+
+class WorkerDied(RuntimeError):
+    """Raised for a turn whose worker process is no longer running."""
+
+
+def shard_for(thread_id: str, workers: int) -> int:
+    """Get the worker index a thread is routed to; stable across processes and restarts."""
+    return zlib.crc32(thread_id.encode()) % workers
+
+
+def load_object(reference: str) -> Any:
+    """Import a `module:attribute` reference."""
+    module, _, attribute = reference.partition(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+async def _serve(
+    index: int,
+    graph_reference: str,
+    cache_path: str | None,
+    configurable: Dict[str, Any],
+    max_threads: int,
+    memory_diagnostics: Tuple[int, int | None] | None,
+    admission: AdmissionLimits | None,
+    requests: Any,
+    responses: Any,
+) -> None:
+    graph = load_object(graph_reference)
+    if callable(graph) and not hasattr(graph, "ainvoke"):
+        # A factory, e.g. one that wires the simulated backends for benchmarks
+        graph = graph()
+    if cache_path:
+        from travel_master.response_cache import response_cache
+        from travel_master.search_cache import search_cache
+
+        shared = SharedCache(cache_path)
+        search_cache.shared = shared
+        response_cache.shared = shared
+        spill = shared
+    else:
+        spill = SharedCache(
+            os.path.join(
+                tempfile.mkdtemp(prefix="travel_master_"), f"threads-{index}.sqlite"
+            )
+        )
+
+    loop = asyncio.get_running_loop()
+    threads: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+    # One lock per conversation with turns in progress or waiting, and how many there are
+    locks: Dict[str, asyncio.Lock] = {}
+    turns: Dict[str, int] = {}
+    tasks: set[asyncio.Task[None]] = set()
+    controller = AdmissionController(admission) if admission is not None else None
+    diagnostics: MemoryDiagnostics | None = None
+    if memory_diagnostics is not None:
+        interval, port = memory_diagnostics
+        diagnostics = MemoryDiagnostics(interval_seconds=interval)
+        diagnostics.start()
+        diagnostics.track_states(threads)
+        diagnostics.install_signal()
+        if port is not None:
+            diagnostics.serve(port + index)
+
+    def restore(thread_id: str) -> Dict[str, Any]:
+        found = spill.get("thread", thread_id)
+        if found is None:
+            return {"messages": [], "itinerary": {}}
+        pool_counters.incr(f"worker_{index}.restored")
+        value = found[0]
+        return {
+            "messages": messages_from_dict(value["messages"]),
+            "itinerary": value["itinerary"],
+        }
+
+    def evict(thread_id: str, state: Dict[str, Any]) -> None:
+        value = {
+            "messages": messages_to_dict(state["messages"]),
+            "itinerary": state.get("itinerary") or {},
+        }
+        spill.put("thread", thread_id, value, SPILLED_THREAD_TTL_SECONDS)
+        pool_counters.incr(f"worker_{index}.spilled")
+
+    async def handle(
+        request_id: int,
+        thread_id: str,
+        text: str,
+        overrides: Dict[str, Any],
+        lane: Lane | None,
+    ) -> None:
+        lock = locks.setdefault(thread_id, asyncio.Lock())
+        turns[thread_id] = turns.get(thread_id, 0) + 1
+        try:
+            await run_turn(lock, request_id, thread_id, text, overrides, lane)
+        finally:
+            turns[thread_id] -= 1
+            if not turns[thread_id]:
+                del turns[thread_id], locks[thread_id]
+
+    async def run_turn(
+        lock: asyncio.Lock,
+        request_id: int,
+        thread_id: str,
+        text: str,
+        overrides: Dict[str, Any],
+        lane: Lane | None,
+    ) -> None:
+        async with lock:
+            started = time.perf_counter()
+            state = threads.pop(thread_id, None) or restore(thread_id)
+            messages = [*state["messages"], HumanMessage(content=text)]
+            try:
+                config: RunnableConfig = {
+                    "configurable": {
+                        **configurable,
+                        **overrides,
+                        "thread_id": thread_id,
+                    }
+                }
+                admitted = (
+                    controller.admit(lane or classify_turn(messages))
+                    if controller
+                    else nullcontext()
+                )
+                async with admitted:
+                    state = await profiled(graph, config).ainvoke(
+                        {"messages": messages, "itinerary": state.get("itinerary", {})},
+                        config,
+                    )
+                final = next(
+                    (
+                        m
+                        for m in reversed(state["messages"])
+                        if isinstance(m, AIMessage)
+                    ),
+                    None,
+                )
+                reply: Dict[str, Any] = {
+                    "thread_id": thread_id,
+                    "status": "ok",
+                    "response": get_message_text(final) if final else None,
+                    "itinerary": state.get("itinerary") or {},
+                }
+            except Overloaded:
+                # The conversation is left as it was, so the user can simply send the message again
+                reply = {
+                    "thread_id": thread_id,
+                    "status": "busy",
+                    "response": BUSY_RESPONSE,
+                }
+            except Exception as e:
+                logger.exception("Worker %s failed on thread %s", index, thread_id)
+                reply = {"thread_id": thread_id, "status": "error", "error": repr(e)}
+            threads[thread_id] = state
+            while len(threads) > max_threads:
+                evicted, evicted_state = threads.popitem(last=False)
+                evict(evicted, evicted_state)
+            reply.update(worker=index, seconds=round(time.perf_counter() - started, 4))
+            responses.put((request_id, reply))
+
+    while True:
+        message = await loop.run_in_executor(None, requests.get)
+        if message is None:
+            break
+        task = asyncio.create_task(handle(*message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+    # multiprocessing children exit without running atexit handlers, whatever the start method
+    close_audit_logs()
+    if diagnostics is not None:
+        diagnostics.stop()
+
+
+def _worker_main(*args: Any) -> None:
+    asyncio.run(_serve(*args))
+
+
+def _settle(
+    future: asyncio.Future[Dict[str, Any]],
+    reply: Dict[str, Any] | None,
+    error: BaseException | None,
+) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(reply or {})
+
+
+class WorkerPool:
+    """A pool of graph worker processes with sticky routing by thread ID."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        *,
+        graph: str = DEFAULT_GRAPH,
+        cache_path: str | None = None,
+        share_caches: bool = True,
+        configurable: Dict[str, Any] | None = None,
+        max_threads_per_worker: int = 1000,
+        memory_diagnostics: bool = False,
+        memory_diagnostics_interval: int = 300,
+        memory_diagnostics_port: int | None = None,
+        admission: AdmissionLimits | None = None,
+    ) -> None:
+        """Configure a pool; processes are started by `start()`.
+
+        Args:
+            workers: Number of processes (defaults to the CPU count).
+            graph: `module:attribute` reference to the compiled graph, or to a function
+                returning it, imported in each worker.
+            cache_path: SQLite file for the shared cache tier (a temporary file by default).
+            share_caches: Whether workers share search results and cached responses.
+            configurable: Configuration overrides applied to every run.
+            max_threads_per_worker: Conversations kept in memory per worker; the least
+                recently used are spilled to disk beyond this.
+            memory_diagnostics: Whether workers trace their memory (see
+                `travel_master.memory_diagnostics`); a worker logs its report on SIGUSR1.
+            memory_diagnostics_interval: Seconds between periodic memory snapshots.
+            memory_diagnostics_port: Worker i serves its memory report on this port + i.
+            admission: Limits of the admission controller of each worker; turns are
+                admitted without limit when None.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.graph = graph
+        self.configurable = configurable or {}
+        self.max_threads_per_worker = max_threads_per_worker
+        self.memory_diagnostics = (
+            (memory_diagnostics_interval, memory_diagnostics_port)
+            if memory_diagnostics
+            else None
+        )
+        self.admission = admission
+        self.cache_path = cache_path
+        if share_caches and cache_path is None:
+            self.cache_path = os.path.join(
+                tempfile.mkdtemp(prefix="travel_master_"), "shared_cache.sqlite"
+            )
+        self._context = mp.get_context("spawn")
+        self._processes: List[Any] = []
+        self._requests: List[Any] = []
+        self._responses: Any = None
+        self._collector: threading.Thread | None = None
+        self._pending: Dict[
+            int, Tuple[int, asyncio.AbstractEventLoop, asyncio.Future[Dict[str, Any]]]
+        ] = {}
+        self._ids = count()
+
+    def start(self) -> None:
+        """Spawn the worker processes."""
+        if self.cache_path:
+            # Create the schema once so workers do not race on it
+            SharedCache(self.cache_path).close()
+        self._responses = self._context.Queue()
+        for index in range(self.workers):
+            requests = self._context.Queue()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(
+                    index,
+                    self.graph,
+                    self.cache_path,
+                    self.configurable,
+                    self.max_threads_per_worker,
+                    self.memory_diagnostics,
+                    self.admission,
+                    requests,
+                    self._responses,
+                ),
+                daemon=True,
+                name=f"travel-master-worker-{index}",
+            )
+            process.start()
+            self._requests.append(requests)
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _collect(self) -> None:
+        checked = time.monotonic()
+        while True:
+            try:
+                item = self._responses.get(timeout=LIVENESS_INTERVAL_SECONDS)
+            except queue.Empty:
+                pass
+            else:
+                if item is None:
+                    return
+                self._resolve(*item)
+            # On a timer: while other workers keep replying, the queue never goes idle
+            if time.monotonic() - checked >= LIVENESS_INTERVAL_SECONDS:
+                self._check_workers()
+                checked = time.monotonic()
+
+    def _resolve(self, request_id: int, reply: Dict[str, Any]) -> None:
+        pending = self._pending.pop(request_id, None)
+        if pending is not None:
+            _, loop, future = pending
+            loop.call_soon_threadsafe(_settle, future, reply, None)
+
+    def _check_workers(self) -> None:
+        dead = {
+            shard
+            for shard, process in enumerate(self._processes)
+            if not process.is_alive()
+        }
+        if not dead:
+            return
+        # Replies a worker sent just before it exited are still delivered
+        while True:
+            try:
+                item = self._responses.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # close() is stopping the collector: let the main loop see it again
+                self._responses.put(None)
+                break
+            self._resolve(*item)
+        for request_id, (shard, loop, future) in list(self._pending.items()):
+            if shard in dead:
+                del self._pending[request_id]
+                pool_counters.incr(f"worker_{shard}.lost")
+                error = WorkerDied(
+                    f"worker {shard} exited with code {self._processes[shard].exitcode}"
+                )
+                loop.call_soon_threadsafe(_settle, future, None, error)
+
+    async def submit(
+        self,
+        thread_id: str,
+        message: str,
+        configurable: Dict[str, Any] | None = None,
+        lane: Lane | None = None,
+    ) -> Dict[str, Any]:
+        """Run one user turn of a conversation on its worker and return the reply.
+
+        `lane` is the admission lane of the turn (e.g. "batch" for batch jobs); by default
+        it is chosen from the conversation. The reply's status is "busy" when the worker
+        shed the turn.
+
+        Raises:
+            WorkerDied: The worker of the conversation exited before replying.
+        """
+        shard = shard_for(thread_id, self.workers)
+        process = self._processes[shard]
+        if not process.is_alive():
+            raise WorkerDied(f"worker {shard} exited with code {process.exitcode}")
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Dict[str, Any]] = loop.create_future()
+        request_id = next(self._ids)
+        self._pending[request_id] = (shard, loop, future)
+        pool_counters.incr(f"worker_{shard}.submitted")
+        self._requests[shard].put(
+            (request_id, thread_id, message, configurable or {}, lane)
+        )
+        return await future
+
+    def close(self) -> None:
+        """Let the workers finish their turns in progress and stop them."""
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            process.join()
+        if self._responses is not None:
+            self._responses.put(None)
+        if self._collector is not None:
+            self._collector.join()
+        self._processes, self._requests = [], []
+
+    async def __aenter__(self) -> WorkerPool:
+        """Start the pool."""
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Stop the pool."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
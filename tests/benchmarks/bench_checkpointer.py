@@ -0,0 +1,100 @@
+"""Step latency and memory of the tiered checkpointer against a single in-memory saver.
+
+Runs simulated conversations through the graph with each checkpointer, a few
+conversations at a time, so most threads go idle once their conversation ends. Reports
+the turn latency and the checkpoint data held in memory at the end. With the
+tiered saver, memory is bounded by `--max-hot-threads` while latency stays close to the
+in-memory saver, since only the first turn after a spill reads the disk.
+
+    python tests/benchmarks/bench_checkpointer.py --conversations 400
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+from travel_master.checkpointer import TieredCheckpointSaver, saver_bytes  # noqa: E402
+from travel_master.loadtest import make_script, percentile  # noqa: E402
+from travel_master.simulation import SIMULATED_CONFIGURABLE, install  # noqa: E402
+
+
+async def run(saver, conversations: int, concurrency: int, revisit: float) -> None:
+    from travel_master.travel_master import builder
+
+    graph = builder.compile(checkpointer=saver).with_config({"recursion_limit": 15})
+    rng = random.Random(0)
+    latencies = []
+
+    async def turn(thread_id: str, text: str) -> None:
+        config = {"configurable": {**SIMULATED_CONFIGURABLE, "thread_id": thread_id}}
+        started = time.perf_counter()
+        await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    async def conversation(index: int) -> None:
+        for text in make_script(rng):
+            await turn(f"thread-{index}", text)
+        # Some users come back to an earlier conversation
+        if index and rng.random() < revisit:
+            await turn(f"thread-{rng.randrange(index)}", "Thanks, that's all")
+
+    for start in range(0, conversations, concurrency):
+        await asyncio.gather(
+            *(
+                conversation(i)
+                for i in range(start, min(start + concurrency, conversations))
+            )
+        )
+        if isinstance(saver, TieredCheckpointSaver):
+            # Let the spill thread keep up, as it would between requests
+            await asyncio.sleep(0)
+    held = (
+        saver.memory_bytes()
+        if isinstance(saver, TieredCheckpointSaver)
+        else saver_bytes(saver)
+    ) / 2**20
+    name = type(saver).__name__
+    print(
+        f"{name:22} turns={len(latencies):5} p50={percentile(latencies, 50):6.1f}ms "
+        f"p95={percentile(latencies, 95):6.1f}ms p99={percentile(latencies, 99):6.1f}ms held={held:6.1f}MB"
+    )
+
+
+async def main(
+    conversations: int, concurrency: int, max_hot_threads: int, revisit: float
+) -> None:
+    install()
+    await run(InMemorySaver(), conversations, concurrency, revisit)
+    with tempfile.TemporaryDirectory() as directory:
+        saver = TieredCheckpointSaver(
+            os.path.join(directory, "checkpoints.sqlite"),
+            max_hot_threads=max_hot_threads,
+            idle_seconds=1.0,
+            spill_interval_seconds=0.2,
+        )
+        await run(saver, conversations, concurrency, revisit)
+        print(f"hot threads={saver.hot_threads()} {saver.counters.snapshot()}")
+        saver.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-hot-threads", type=int, default=64)
+    parser.add_argument("--revisit", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.conversations, args.concurrency, args.max_hot_threads, args.revisit)
+    )
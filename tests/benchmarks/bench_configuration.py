@@ -0,0 +1,62 @@
+"""Microbenchmarks of configuration resolution on the hot path.
+
+Compares resolving a configuration from a RunnableConfig (memoized) with building a new
+instance each time, and the cached timezone lookup in `get_current_time` with a fresh
+`pytz.timezone` call.
+
+    python tests/benchmarks/bench_configuration.py
+"""
+
+import os
+import sys
+import timeit
+from dataclasses import fields
+from datetime import datetime
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+import pytz  # noqa: E402
+
+from travel_master.configuration import Configuration  # noqa: E402
+
+CONFIG = {
+    "configurable": {
+        "thread_id": "t-1",
+        "timezone": "Europe/Paris",
+        "enable_model_tiering": True,
+        "max_search_results": 5,
+    }
+}
+
+
+def uncached() -> Configuration:
+    configurable = CONFIG["configurable"]
+    names = {f.name for f in fields(Configuration) if f.init}
+    return Configuration(**{k: v for k, v in configurable.items() if k in names})
+
+
+def fresh_timezone() -> str:
+    return datetime.now(pytz.timezone("Europe/Paris")).isoformat()
+
+
+def main() -> None:
+    configuration = Configuration.from_runnable_config(CONFIG)
+    cases = [
+        (
+            "from_runnable_config (memoized)",
+            lambda: Configuration.from_runnable_config(CONFIG),
+        ),
+        ("build a new instance", uncached),
+        ("get_current_time (cached tz)", configuration.get_current_time),
+        ("pytz.timezone per call", fresh_timezone),
+    ]
+    for name, fn in cases:
+        runs = 20000
+        seconds = min(timeit.repeat(fn, number=runs, repeat=5))
+        print(f"{name:34} {seconds / runs * 1e6:7.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Checkpoint writes and turn latency of each checkpoint durability mode.
+
+Runs the same simulated conversations through the graph compiled with each
+`CheckpointDurability`, against an in-memory saver that can add a fixed latency to every
+write (as a disk or a remote store would). Reports the checkpoints and pending-write
+batches stored per turn, and the turn latency.
+
+    python tests/benchmarks/bench_durability.py --conversations 40 --write-ms 2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, get_args
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+from travel_master.loadtest import make_script, percentile  # noqa: E402
+from travel_master.simulation import SIMULATED_CONFIGURABLE, install  # noqa: E402
+from travel_master.travel_master import CheckpointDurability, compile_graph  # noqa: E402
+
+
+class CountingSaver(InMemorySaver):
+    """An in-memory saver that counts its writes and makes each one take `write_ms`."""
+
+    def __init__(self, write_ms: float = 0.0) -> None:
+        super().__init__()
+        self.write_seconds = write_ms / 1000
+        self.checkpoints = 0
+        self.write_batches = 0
+
+    async def aput(self, config: Any, *args: Any, **kwargs: Any) -> Any:
+        self.checkpoints += 1
+        await asyncio.sleep(self.write_seconds)
+        return await super().aput(config, *args, **kwargs)
+
+    async def aput_writes(self, config: Any, *args: Any, **kwargs: Any) -> None:
+        self.write_batches += 1
+        await asyncio.sleep(self.write_seconds)
+        await super().aput_writes(config, *args, **kwargs)
+
+
+async def run(
+    durability: CheckpointDurability,
+    conversations: int,
+    concurrency: int,
+    write_ms: float,
+) -> None:
+    saver = CountingSaver(write_ms)
+    graph = compile_graph(saver, durability)
+    rng = random.Random(0)
+    latencies = []
+
+    async def conversation(index: int) -> None:
+        config = {
+            "configurable": {**SIMULATED_CONFIGURABLE, "thread_id": f"thread-{index}"}
+        }
+        for text in make_script(rng):
+            started = time.perf_counter()
+            await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    for start in range(0, conversations, concurrency):
+        await asyncio.gather(
+            *(
+                conversation(i)
+                for i in range(start, min(start + concurrency, conversations))
+            )
+        )
+    turns = len(latencies)
+    print(
+        f"{durability:14} turns={turns:4} checkpoints/turn={saver.checkpoints / turns:5.1f} "
+        f"write batches/turn={saver.write_batches / turns:5.1f} "
+        f"p50={percentile(latencies, 50):6.1f}ms p95={percentile(latencies, 95):6.1f}ms"
+    )
+
+
+async def main(conversations: int, concurrency: int, write_ms: float) -> None:
+    install()
+    for durability in get_args(CheckpointDurability):
+        await run(durability, conversations, concurrency, write_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--write-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.conversations, args.concurrency, args.write_ms))
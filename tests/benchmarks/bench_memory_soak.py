@@ -0,0 +1,77 @@
+"""Soak test of memory growth over many conversations.
+
+Runs rounds of simulated conversations through the graph in-process while tracing
+memory, and fails if traced memory keeps growing once the caches are warm: after the
+warm-up rounds, growth over the remaining rounds must stay within a small bound. The
+warm-up must be long enough to fill the search and response caches up to their entry
+limits (about 6 rounds of 50 conversations).
+
+    python tests/benchmarks/bench_memory_soak.py --rounds 12 --conversations 50
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from travel_master.loadtest import InProcessTarget, make_script, rss_mb  # noqa: E402
+from travel_master.memory_diagnostics import MemoryDiagnostics, format_sizes  # noqa: E402
+from travel_master.simulation import SIMULATED_CONFIGURABLE, install  # noqa: E402
+
+
+async def soak(
+    rounds: int, conversations: int, warmup: int, max_growth_mb: float
+) -> None:
+    install()
+    from travel_master.travel_master import graph
+
+    target = InProcessTarget(graph, dict(SIMULATED_CONFIGURABLE))
+    rng = random.Random(0)
+    diagnostics = MemoryDiagnostics(interval_seconds=3600)
+    diagnostics.start()
+
+    async def conversation(name: str) -> None:
+        session = await target.start(name)
+        for text in make_script(rng):
+            await target.turn(session, text)
+
+    traced = []
+    for index in range(rounds):
+        await asyncio.gather(
+            *(conversation(f"soak-{index}-{i}") for i in range(conversations))
+        )
+        gc.collect()
+        record = diagnostics.sample()
+        traced.append(record["traced_bytes"] / 2**20)
+        print(
+            f"round={index:<3} traced={traced[-1]:7.2f}MB rss={rss_mb():7.1f}MB {format_sizes(record['groups'])}"
+        )
+
+    growth = traced[-1] - traced[warmup - 1]
+    print(f"growth after warm-up: {growth:+.2f}MB over {rounds - warmup} rounds")
+    for diff in diagnostics.top_diffs(5):
+        print(f"  {diff['size_diff'] / 1024:8.1f}kB {diff['site']}")
+    diagnostics.stop()
+    assert growth <= max_growth_mb, (
+        f"traced memory grew {growth:.2f}MB after warm-up (limit {max_growth_mb}MB)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=6)
+    parser.add_argument("--max-growth-mb", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(soak(args.rounds, args.conversations, args.warmup, args.max_growth_mb))
+
+
+if __name__ == "__main__":
+    main()
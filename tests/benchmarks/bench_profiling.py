@@ -0,0 +1,70 @@
+"""Cost of the sampling profiler.
+
+Times simulated turns through the graph as picked by `profiled()` for runs that are not
+profiled (the plain graph), with any callback handler attached (which is why the
+profiling handler is only attached to profiled runs), and for profiled runs.
+
+    python tests/benchmarks/bench_profiling.py --turns 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from langchain_core.callbacks import BaseCallbackHandler  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from travel_master.profiling import profiled  # noqa: E402
+from travel_master.simulation import SIMULATED_CONFIGURABLE, install  # noqa: E402
+
+
+class NoopHandler(BaseCallbackHandler):
+    run_inline = True
+
+
+async def per_turn(graph, turns: int, **configurable) -> float:
+    started = time.process_time()
+    for turn in range(turns):
+        config = {"configurable": {**SIMULATED_CONFIGURABLE, **configurable}}
+        await profiled(graph, config).ainvoke(
+            {
+                "messages": [
+                    HumanMessage(
+                        content=f"Find flights from Paris to Rome on 2030-05-{turn % 28 + 1:02d}"
+                    )
+                ]
+            },
+            config,
+        )
+    return (time.process_time() - started) / turns * 1000
+
+
+async def main(turns: int) -> None:
+    install()
+    from travel_master.travel_master import graph
+
+    hooked = graph.with_config(callbacks=[NoopHandler()])
+    await per_turn(graph, 20)
+    plain, with_handler = [], []
+    for _ in range(5):
+        plain.append(await per_turn(graph, turns))
+        with_handler.append(await per_turn(hooked, turns))
+    profiled_ms = await per_turn(
+        graph, 20, profile=True, profiling_output_dir=tempfile.mkdtemp()
+    )
+    print(f"not profiled      {min(plain):6.2f}ms CPU/turn")
+    print(f"with a handler    {min(with_handler):6.2f}ms CPU/turn")
+    print(f"profiled          {profiled_ms:6.2f}ms CPU/turn")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    asyncio.run(main(parser.parse_args().turns))
@@ -0,0 +1,117 @@
+"""Compare the legacy dict tool payloads with the compact result records.
+
+For a flight search and a booking, reports the serialized ToolMessage size, the size of
+the ToolMessage as written to a checkpoint, and the bytes allocated to build and
+serialize the payload.
+
+    python tests/benchmarks/bench_tool_results.py
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from langchain_core.messages import ToolMessage  # noqa: E402
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+
+from travel_master.results import (  # noqa: E402
+    BookingResult,
+    FlightSearchResult,
+    compact_search_results,
+    to_json,
+)
+
+RESULTS = [
+    {
+        "title": f"Cheap flights Paris to Rome - Airline {i}",
+        "url": f"https://example.com/flights/{i}",
+        "content": f"Round trip Paris (PAR) to Rome (ROM) from ${120 + 9 * i}. Nonstop and one-stop options.",
+        "score": 0.91 - i / 100,
+        "raw_content": None,
+    }
+    for i in range(10)
+]
+
+
+def legacy_search() -> str:
+    return json.dumps(
+        {
+            "status": "success",
+            "search_query": "flights from Paris (PAR) to Rome (ROM) 2030-05-01 return 2030-05-08 2 passengers best deals airlines",
+            "trip_type": "round trip",
+            "origin": "PAR",
+            "destination": "ROM",
+            "departure_date": "2030-05-01",
+            "return_date": "2030-05-08",
+            "passengers": 2,
+            "results": RESULTS,
+            "message": "Found flight options for round trip from PAR to ROM",
+        }
+    )
+
+
+def compact_search() -> str:
+    return to_json(
+        FlightSearchResult("PAR", "ROM", "round trip", compact_search_results(RESULTS))
+    )
+
+
+def legacy_booking() -> str:
+    return json.dumps(
+        {
+            "status": "success",
+            "booking_confirmed": True,
+            "confirmation_number": "FL123456",
+            "booking_reference": "TM12345",
+            "flight_id": "AF1404",
+            "passenger_name": "Jane Doe",
+            "email": "jane@example.com",
+            "phone": "+33 1 23 45 67 89",
+            "booking_date": "2030-04-01 10:00:00",
+            "message": "Flight booking confirmed! Confirmation number: FL123456. You will receive an email confirmation at jane@example.com.",
+        }
+    )
+
+
+def compact_booking() -> str:
+    return to_json(BookingResult("FL123456", "TM12345", "2030-04-01 10:00:00"))
+
+
+def measure(build: Callable[[], str]) -> Dict[str, Any]:
+    serde = JsonPlusSerializer()
+    content = build()
+    _, checkpoint_bytes = serde.dumps_typed(
+        ToolMessage(content=content, tool_call_id="call-1", name="tool")
+    )
+    tracemalloc.start()
+    for _ in range(1000):
+        build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "content_bytes": len(content.encode()),
+        "checkpoint_bytes": len(checkpoint_bytes),
+        "peak_alloc_bytes": peak,
+    }
+
+
+def main() -> None:
+    for name, legacy, compact in [
+        ("search", legacy_search, compact_search),
+        ("booking", legacy_booking, compact_booking),
+    ]:
+        before, after = measure(legacy), measure(compact)
+        for key in before:
+            print(
+                f"{name:8} {key:18} legacy={before[key]:7} compact={after[key]:7} ({after[key] / before[key]:.0%})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Offline throughput benchmark of the multi-process worker pool.
+
+Runs the same set of conversations through pools of 1, 2, 4, ... workers (up to the CPU
+count) with the simulated models and search backend, and reports turns per second and the
+speed-up over a single worker.
+
+    python tests/benchmarks/bench_worker_pool.py --conversations 64 --turns 3
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from travel_master.simulation import SIMULATED_CONFIGURABLE  # noqa: E402
+from travel_master.worker_pool import WorkerPool  # noqa: E402
+
+
+async def run(workers: int, conversations: int, turns: int) -> float:
+    async with WorkerPool(
+        workers,
+        graph="travel_master.simulation:simulated_graph",
+        configurable=SIMULATED_CONFIGURABLE,
+    ) as pool:
+        # Warm up every worker (imports, graph compilation) before timing
+        await asyncio.gather(
+            *(pool.submit(f"warmup-{i}", "hello") for i in range(workers * 4))
+        )
+        started = time.perf_counter()
+
+        async def conversation(index: int) -> None:
+            for turn in range(turns):
+                reply = await pool.submit(
+                    f"thread-{index}", f"Flights from Paris to Rome, turn {turn}"
+                )
+                assert reply["status"] == "ok", reply
+
+        await asyncio.gather(*(conversation(i) for i in range(conversations)))
+        return conversations * turns / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    counts = [1]
+    while counts[-1] * 2 <= args.max_workers:
+        counts.append(counts[-1] * 2)
+    baseline = None
+    for workers in counts:
+        throughput = asyncio.run(run(workers, args.conversations, args.turns))
+        baseline = baseline or throughput
+        print(
+            f"workers={workers:<3} turns/s={throughput:8.1f} speedup={throughput / baseline:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""Shared fixtures for the unit tests."""
+
+import os
+
+# The graphs build their chat models at import time; unit tests never reach the API
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "unit-test")
+os.environ.setdefault("TAVILY_API_KEY", "unit-test")
+
+from travel_master.simulation import register_simulated_models  # noqa: E402
+
+# Tests of the load tester, benchmarks and checkpointers run on the "simulated/..." models
+register_simulated_models()
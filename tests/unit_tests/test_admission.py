@@ -0,0 +1,148 @@
+"""Test admission control and its priority lanes."""
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from travel_master.admission import (
+    AdmissionController,
+    AdmissionLimits,
+    Overloaded,
+    admission_counters,
+    classify_turn,
+)
+from travel_master.worker_pool import WorkerPool
+
+
+class SlowGraph:
+    """A stand-in graph whose turns take a while."""
+
+    async def ainvoke(
+        self, state: Dict[str, Any], config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        await asyncio.sleep(0.5)
+        return {
+            "messages": [*state["messages"], AIMessage(content="done")],
+            "itinerary": {},
+        }
+
+
+slow_graph = SlowGraph()
+
+
+def test_turns_are_classified_into_lanes() -> None:
+    assert (
+        classify_turn([HumanMessage(content="Find hotels in Rome next week")])
+        == "interactive"
+    )
+    assert classify_turn([HumanMessage(content="Book the second flight")]) == "booking"
+    assert classify_turn([HumanMessage(content="What about HT123456?")]) == "booking"
+    question = AIMessage(
+        content="Please confirm: should I cancel your flight booking FL123456? Reply yes to proceed."
+    )
+    assert (
+        classify_turn(
+            [HumanMessage(content="cancel it"), question, HumanMessage(content="yes")]
+        )
+        == "booking"
+    )
+    answer = AIMessage(content="Here are three hotels.")
+    assert (
+        classify_turn(
+            [
+                HumanMessage(content="hotels"),
+                answer,
+                HumanMessage(content="cheaper ones?"),
+            ]
+        )
+        == "interactive"
+    )
+
+
+@pytest.mark.asyncio
+async def test_waiting_turns_are_admitted_by_lane_priority() -> None:
+    controller = AdmissionController(AdmissionLimits(max_concurrent=1))
+    order: List[str] = []
+
+    async def turn(name: str, lane: str) -> None:
+        async with controller.admit(lane):  # type: ignore[arg-type]
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    first = asyncio.create_task(turn("running", "interactive"))
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.create_task(turn(name, lane))
+        for name, lane in [
+            ("batch", "batch"),
+            ("search", "interactive"),
+            ("booking", "booking"),
+        ]
+    ]
+    await asyncio.sleep(0)
+    assert controller.queued() == {"booking": 1, "interactive": 1, "batch": 1}
+
+    await asyncio.gather(first, *waiting)
+    assert order == ["running", "booking", "search", "batch"]
+    assert controller.running == 0
+
+
+@pytest.mark.asyncio
+async def test_load_is_shed_by_queue_depth_and_wait() -> None:
+    admission_counters.reset()
+    controller = AdmissionController(
+        AdmissionLimits(
+            max_concurrent=1,
+            booking_max_queued=3,
+            interactive_max_queued=2,
+            batch_max_queued=1,
+            max_wait_seconds=0.05,
+        )
+    )
+    await controller.acquire("interactive")
+    queued = [
+        asyncio.create_task(controller.acquire("batch")),
+        asyncio.create_task(controller.acquire("interactive")),
+    ]
+    await asyncio.sleep(0)
+
+    # Two turns are queued: batch and interactive turns are shed, bookings still queue
+    for lane in ("batch", "interactive"):
+        with pytest.raises(Overloaded):
+            await controller.acquire(lane)  # type: ignore[arg-type]
+    booking = asyncio.create_task(controller.acquire("booking"))
+    await asyncio.sleep(0)
+    controller.release()
+    await booking
+
+    # The others waited too long
+    for task in queued:
+        with pytest.raises(Overloaded, match="waited too long"):
+            await task
+    assert controller.queued() == {"booking": 0, "interactive": 0, "batch": 0}
+    counters = admission_counters.snapshot()
+    assert counters["booking.admitted"] == counters["interactive.admitted"] == 1
+    assert counters["batch.shed"] == 2 and counters["interactive.shed"] == 2
+    assert (
+        counters["batch.queued"]
+        == counters["interactive.queued"]
+        == counters["booking.queued"]
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_answers_shed_turns_with_a_busy_reply() -> None:
+    limits = AdmissionLimits(max_concurrent=1, batch_max_queued=0, max_wait_seconds=5.0)
+    async with WorkerPool(
+        1, graph=f"{__name__}:slow_graph", share_caches=False, admission=limits
+    ) as pool:
+        replies = await asyncio.gather(
+            pool.submit("thread-a", "Find flights to Rome"),
+            pool.submit("thread-b", "Find flights to Paris", lane="batch"),
+        )
+
+    assert [r["status"] for r in replies] == ["ok", "busy"]
+    assert replies[1]["response"].startswith("Sorry, we are very busy")
@@ -0,0 +1,145 @@
+"""Test the write-behind audit log of booking operations."""
+
+import json
+import os
+
+import pytest
+
+from travel_master import audit_log
+from travel_master.audit_log import (
+    AuditLog,
+    AuditReader,
+    audit_counters,
+    close_audit_logs,
+    segment_paths,
+)
+from travel_master.flight_assistant.flight_assistant_tools import FLIGHT_ASSISTANT_TOOLS
+from travel_master.tool_node import TravelToolNode
+
+
+def test_records_are_written_in_batches_and_looked_up_by_confirmation_number(
+    tmp_path,
+) -> None:
+    audit_counters.reset()
+    log = AuditLog(str(tmp_path), segment_max_bytes=400)
+    for i in range(10):
+        log.record(
+            "book_hotel",
+            {"hotel_id": f"H{i}"},
+            {"confirmation_number": f"HT00000{i}", "status": "success"},
+        )
+    assert log.flush(timeout=5)
+    log.record(
+        "cancel_hotel",
+        {"confirmation_number": "HT000003"},
+        {"status": "success"},
+        thread_id="t1",
+    )
+    assert log.flush(timeout=5)
+
+    counters = audit_counters.snapshot()
+    assert counters["written"] == 11
+    # At least one sync per flush, and the first ones filled a segment
+    assert 2 <= counters["syncs"] <= 11 and counters["rotations"] >= 1
+    assert len(segment_paths(str(tmp_path))) == counters["rotations"] + 1
+
+    reader = AuditReader(str(tmp_path))
+    records = reader.lookup("HT000003")
+    assert [(r["operation"], r["thread_id"]) for r in records] == [
+        ("book_hotel", None),
+        ("cancel_hotel", "t1"),
+    ]
+    assert reader.refresh() == 0
+
+    # Records appended later, by a log reopened on the same directory, are indexed too
+    log.close()
+    reopened = AuditLog(str(tmp_path))
+    reopened.record(
+        "change_hotel", {"confirmation_number": "HT000003"}, {"status": "success"}
+    )
+    reopened.close()
+    assert [r["operation"] for r in reader.lookup("HT000003")][-1] == "change_hotel"
+    with pytest.raises(RuntimeError):
+        reopened.record("book_hotel", {}, {})
+
+
+@pytest.mark.asyncio
+async def test_tool_node_audits_booking_operations(tmp_path) -> None:
+    node = TravelToolNode(FLIGHT_ASSISTANT_TOOLS)
+    directory = str(tmp_path / "audit")
+    config = {
+        "configurable": {
+            "enable_audit_log": True,
+            "audit_log_dir": directory,
+            "thread_id": "t1",
+        }
+    }
+    call = {
+        "name": "cancel_flight",
+        "args": {"confirmation_number": "FL123456"},
+        "id": "1",
+        "type": "tool_call",
+    }
+
+    output = await node.run_tool(call, config)
+    close_audit_logs()
+
+    (segment,) = segment_paths(directory)
+    with open(segment, encoding="utf-8") as f:
+        (record,) = [json.loads(line) for line in f]
+    assert record["operation"] == "cancel_flight" and record["thread_id"] == "t1"
+    assert record["confirmation_number"] == "FL123456"
+    assert record["result"] == json.loads(output.content)
+    assert os.path.basename(segment) == f"audit-{os.getpid()}-00000001.jsonl"
+
+
+def test_writers_keep_their_own_segments(tmp_path) -> None:
+    first, second = (
+        AuditLog(str(tmp_path), writer="w0"),
+        AuditLog(str(tmp_path), writer="w1"),
+    )
+    first.record("book_car", {}, {"confirmation_number": "CR000001"})
+    first.flush(timeout=5)
+    second.record(
+        "cancel_car", {"confirmation_number": "CR000001"}, {"status": "success"}
+    )
+    first.close()
+    second.close()
+
+    assert [os.path.basename(p) for p in segment_paths(str(tmp_path))] == [
+        "audit-w0-00000001.jsonl",
+        "audit-w1-00000001.jsonl",
+    ]
+    assert [r["operation"] for r in AuditReader(str(tmp_path)).lookup("CR000001")] == [
+        "book_car",
+        "cancel_car",
+    ]
+
+
+def test_failed_writes_are_retried(monkeypatch, tmp_path) -> None:
+    audit_counters.reset()
+    monkeypatch.setattr(audit_log, "RETRY_SECONDS", 0.01)
+    fsync = os.fsync
+    failures = iter([OSError("disk full")])
+
+    def flaky_fsync(fd: int) -> None:
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", flaky_fsync)
+    log = AuditLog(str(tmp_path))
+    log.record(
+        "book_hotel", {}, {"confirmation_number": "HT000001", "status": "success"}
+    )
+    assert log.flush(timeout=5)
+    log.close()
+
+    assert (
+        audit_counters.get("write_errors") == 1 and audit_counters.get("written") == 1
+    )
+    # The failed attempt left nothing behind
+    (segment,) = segment_paths(str(tmp_path))
+    with open(segment, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
@@ -0,0 +1,115 @@
+"""Test the batch runner."""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from travel_master import batch
+from travel_master.batch import read_items, run_batch
+
+
+class EchoGraph:
+    """A stand-in graph that answers every turn with the user's message."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def ainvoke(
+        self, state: Dict[str, Any], config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        self.calls += 1
+        if "fail" in state["messages"][-1].content:
+            raise RuntimeError("boom")
+        reply = AIMessage(content=f"echo: {state['messages'][-1].content}")
+        return {
+            "messages": [*state["messages"], reply],
+            "itinerary": {"turns": self.calls},
+        }
+
+
+@pytest.mark.asyncio
+async def test_batch_writes_results_and_resumes(tmp_path) -> None:
+    source = tmp_path / "requests.csv"
+    source.write_text(
+        "id,message\na,Flights to Rome\nb,please fail\nc,Hotels in Oslo\n"
+    )
+    output = tmp_path / "results.jsonl"
+    # Item "a" succeeded and "c" failed before an interruption that cut the next line short;
+    # "z" is the result of an item that is not in this input
+    previous = [
+        {"id": "a", "status": "ok"},
+        {"id": "z", "status": "ok"},
+        {"id": "c", "status": "error"},
+    ]
+    output.write_text(
+        "".join(json.dumps(r) + "\n" for r in previous) + '{"id": "b", "sta'
+    )
+
+    graph = EchoGraph()
+    counts = await run_batch(str(source), str(output), graph=graph, concurrency=2)
+
+    assert counts == {"run": 2, "succeeded": 1, "failed": 1, "skipped": 1}
+    assert graph.calls == 2
+    results = {}
+    for line in output.read_text().splitlines()[4:]:
+        record = json.loads(line)
+        results[record["id"]] = record
+    assert results["c"]["response"] == "echo: Hotels in Oslo"
+    assert results["c"]["turns"] == 1 and results["c"]["duration_seconds"] >= 0
+    assert results["b"]["status"] == "error" and "boom" in results["b"]["error"]
+
+
+def test_jsonl_items_replay_several_turns(tmp_path) -> None:
+    source = tmp_path / "requests.jsonl"
+    source.write_text(
+        '{"id": 7, "messages": ["Flights to Rome", "Book the first"]}\n\n{"message": "Hi"}\n'
+    )
+
+    items = list(read_items(str(source)))
+
+    assert [(i.id, i.messages) for i in items] == [
+        ("7", ["Flights to Rome", "Book the first"]),
+        ("3", ["Hi"]),
+    ]
+
+
+class BusyOncePool:
+    """A stand-in worker pool that sheds the first turn it is given."""
+
+    def __init__(self) -> None:
+        self.submitted: List[Tuple[str, str, Optional[str]]] = []
+
+    async def submit(
+        self,
+        thread_id: str,
+        message: str,
+        configurable: Optional[Dict[str, Any]] = None,
+        lane: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        self.submitted.append((thread_id, message, lane))
+        if len(self.submitted) == 1:
+            return {"status": "busy", "response": "busy"}
+        return {"status": "ok", "response": f"echo: {message}", "itinerary": {}}
+
+
+@pytest.mark.asyncio
+async def test_pool_turns_run_in_the_batch_lane(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(batch, "BUSY_RETRY_SECONDS", 0.01)
+    source = tmp_path / "requests.jsonl"
+    source.write_text('{"id": "a", "messages": ["Flights to Rome", "Book it"]}\n')
+    output = tmp_path / "results.jsonl"
+    pool = BusyOncePool()
+
+    counts = await run_batch(str(source), str(output), pool=pool)  # type: ignore[arg-type]
+
+    assert counts["succeeded"] == 1
+    # The shed turn was submitted again, every turn in the batch lane
+    assert pool.submitted == [
+        ("a", "Flights to Rome", "batch"),
+        ("a", "Flights to Rome", "batch"),
+        ("a", "Book it", "batch"),
+    ]
+    (record,) = [json.loads(line) for line in output.read_text().splitlines()]
+    assert record["response"] == "echo: Book it" and record["turns"] == 2
@@ -0,0 +1,118 @@
+"""Test the tiered checkpointer."""
+
+from typing import get_args
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from tests.benchmarks.bench_durability import CountingSaver
+from travel_master.checkpointer import TieredCheckpointSaver, _export
+from travel_master.search_cache import search_cache
+from travel_master.simulation import SIMULATED_CONFIGURABLE, simulated_search
+from travel_master.travel_master import CheckpointDurability, builder, compile_graph
+
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = TieredCheckpointSaver(
+        str(tmp_path / "checkpoints.sqlite"),
+        shards=2,
+        max_hot_threads=2,
+        spill_interval_seconds=3600,
+    )
+    yield saver
+    saver.close()
+
+
+async def _turn(graph, thread_id: str, text: str) -> dict:
+    config = {"configurable": {**SIMULATED_CONFIGURABLE, "thread_id": thread_id}}
+    return await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+
+
+@pytest.mark.asyncio
+async def test_idle_threads_spill_to_disk_and_rehydrate(saver, monkeypatch) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    graph = builder.compile(checkpointer=saver)
+
+    first = await _turn(graph, "t-1", "Find flights from Paris to Rome on 2030-05-01")
+    assert saver.hot_threads() == 1
+    assert saver.spill(idle_seconds=0) == 1
+    assert saver.hot_threads() == 0
+
+    # Listing every thread reads the spilled ones without rehydrating them
+    assert {item.config["configurable"]["thread_id"] for item in saver.list(None)} == {
+        "t-1"
+    }
+    assert saver.hot_threads() == 0
+
+    # The next turn continues the conversation from the disk copy
+    second = await _turn(graph, "t-1", "Thanks!")
+    assert saver.hot_threads() == 1
+    assert saver.counters.get("rehydrated") >= 1
+    assert [m.content for m in second["messages"][: len(first["messages"])]] == [
+        m.content for m in first["messages"]
+    ]
+    assert len(second["messages"]) > len(first["messages"])
+
+
+@pytest.mark.asyncio
+async def test_hot_threads_are_bounded_least_recently_used_first(saver) -> None:
+    for thread_id in "abcde":
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": "",
+                "checkpoint_id": "1",
+            }
+        }
+        await saver.aput_writes(config, [("x", 1)], "task")
+    saver.spill()
+    assert saver.hot_threads() <= 2
+    assert "e" in {t for shard in saver._shards for t in shard.threads}
+
+    saver.delete_thread("a")
+    assert saver._read("a") is None
+    assert saver._read("b") is not None
+
+
+@pytest.mark.asyncio
+async def test_threads_taken_back_while_spilling_leave_no_disk_copy(saver) -> None:
+    config = {
+        "configurable": {"thread_id": "a", "checkpoint_ns": "", "checkpoint_id": "1"}
+    }
+    await saver.aput_writes(config, [("x", 1)], "task")
+    shard = saver._shard("a")
+    with shard.lock:
+        hot = shard.threads.pop("a")
+        del shard.last_used["a"]
+        shard.spilling["a"] = hot
+        data = _export(hot, "a")
+        # Accessed while the spill is being written
+        saver._hot(shard, "a")
+
+    saver._spill_one(shard, "a", hot, data)
+    assert saver._read("a") is None and saver.hot_threads() == 1
+
+
+@pytest.mark.asyncio
+async def test_durability_modes_write_fewer_checkpoints_for_the_same_state(
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    checkpoints = {}
+    for durability in get_args(CheckpointDurability):
+        saver = CountingSaver()
+        graph = compile_graph(saver, durability)
+        await _turn(graph, "t-1", "Find flights from Paris to Rome on 2030-05-01")
+        state = await _turn(graph, "t-1", "Book the cheapest flight")
+        checkpoints[durability] = saver.checkpoints
+        assert len(state["messages"]) == 14
+        (booking,) = state["itinerary"]["bookings"].values()
+        assert booking["status"] == "booked"
+
+    assert (
+        checkpoints["step"]
+        > checkpoints["subgraph_exit"]
+        > checkpoints["turn_end"]
+        == 2
+    )
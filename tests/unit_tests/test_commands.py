@@ -0,0 +1,118 @@
+"""Test the direct handling of explicit cancel and change commands."""
+
+from datetime import date
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from travel_master.commands import Command, parse_command, resolve_date
+from travel_master.simulation import SIMULATED_CONFIGURABLE
+from travel_master.travel_master import graph
+
+TODAY = date(2030, 5, 10)
+
+
+def test_resolve_date() -> None:
+    assert resolve_date("the 20th", TODAY) == "2030-05-20"
+    assert resolve_date("2nd", TODAY) == "2030-06-02"
+    assert resolve_date("May 3", TODAY) == "2031-05-03"
+    assert resolve_date("20 June", TODAY) == "2030-06-20"
+    assert resolve_date("2030-07-01", TODAY) == "2030-07-01"
+
+
+def test_parse_command() -> None:
+    assert parse_command("cancel FL123456", TODAY) == Command(
+        "cancel_flight", {"confirmation_number": "FL123456"}
+    )
+    assert parse_command(
+        "Please cancel my hotel booking ht-123456 because plans changed.", TODAY
+    ) == Command(
+        "cancel_hotel", {"confirmation_number": "HT123456", "reason": "plans changed"}
+    )
+    assert parse_command(
+        "change CR654321 pickup to the 20th and drop-off to June 2", TODAY
+    ) == Command(
+        "change_car",
+        {
+            "confirmation_number": "CR654321",
+            "new_pickup_date": "2030-05-20",
+            "new_dropoff_date": "2030-06-02",
+        },
+    )
+    # End dates follow the start date given in the same command, in either order
+    assert parse_command(
+        "change FL123456 departure to May 20, 2031 and return to May 27", TODAY
+    ) == Command(
+        "change_flight",
+        {
+            "confirmation_number": "FL123456",
+            "new_departure_date": "2031-05-20",
+            "new_return_date": "2031-05-27",
+        },
+    )
+    assert parse_command(
+        "change HT123456 check-out to the 3rd and check-in to 2030-06-28", TODAY
+    ) == Command(
+        "change_hotel",
+        {
+            "confirmation_number": "HT123456",
+            "new_check_out_date": "2030-07-03",
+            "new_check_in_date": "2030-06-28",
+        },
+    )
+    assert parse_command("change HT123456 to 3 guests", TODAY) == Command(
+        "change_hotel", {"confirmation_number": "HT123456", "new_guests": 3}
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "cancel FL123456 and book the next flight",
+        "change FL123456 departure to next week",
+        "change FL123456 pickup to the 20th",
+        "can you cancel FL123456?",
+        "change FL123456",
+    ],
+)
+def test_ambiguous_commands_are_left_to_the_models(text: str) -> None:
+    assert parse_command(text, TODAY) is None
+
+
+async def _turn(messages, text):
+    config = {"configurable": {**SIMULATED_CONFIGURABLE, "direct_commands": True}}
+    return await graph.ainvoke(
+        {"messages": [*messages, HumanMessage(content=text)]}, config
+    )
+
+
+@pytest.mark.asyncio
+async def test_commands_are_confirmed_before_they_run() -> None:
+    state = await _turn([], "cancel CR654321")
+    question = state["messages"][-1]
+    assert question.name == "car_rental_assistant"
+    assert question.response_metadata["direct_command"]["status"] == "pending"
+    assert "CR654321" in question.content
+    assert not state.get("itinerary")
+
+    state = await _turn(state["messages"], "yes")
+    answer = state["messages"][-1]
+    assert answer.content.startswith(
+        "Your car rental booking CR654321 has been cancelled."
+    )
+    assert answer.response_metadata["direct_command"]["status"] == "executed"
+    assert state["itinerary"]["bookings"]["CR654321"] == {
+        "domain": "car",
+        "status": "cancelled",
+    }
+
+
+@pytest.mark.asyncio
+async def test_declined_commands_do_not_run() -> None:
+    state = await _turn([], "cancel FL123456")
+    state = await _turn(state["messages"], "no")
+    assert (
+        state["messages"][-1].content
+        == "OK, your flight booking FL123456 has not been cancelled."
+    )
+    assert not state.get("itinerary")
@@ -1,5 +1,11 @@
 """Test the configuration module."""
 
+import dataclasses
+
+import pytest
+
+from travel_master.configuration import Configuration
+
 
 def test_dummy() -> None:
     """A dummy test to get started."""
@@ -9,3 +15,53 @@ def test_dummy() -> None:
 def test_another_dummy() -> None:
     """Another dummy test."""
     assert 1 + 1 == 2
+
+
+def test_resolved_configurations_are_memoized_and_frozen() -> None:
+    config = {
+        "configurable": {"timezone": "UTC", "thread_id": "t-1", "max_search_results": 5}
+    }
+
+    first = Configuration.from_runnable_config(config)
+    second = Configuration.from_runnable_config(
+        {
+            "configurable": {
+                "max_search_results": 5,
+                "timezone": "UTC",
+                "thread_id": "t-2",
+            }
+        }
+    )
+
+    assert first is second
+    assert first.max_search_results == 5 and first.get_current_time().endswith("+00:00")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.max_search_results = 3  # type: ignore[misc]
+
+
+def test_unhashable_overrides_are_resolved_without_the_cache() -> None:
+    configuration = Configuration.from_runnable_config(
+        {"configurable": {"max_search_results": [1]}}
+    )
+
+    assert configuration.max_search_results == [1]
+
+
+def test_turn_deadline_is_set_on_a_copy_of_the_memoized_configuration() -> None:
+    base = Configuration.from_runnable_config(
+        {"configurable": {"max_search_results": 4}}
+    )
+
+    first, second = (
+        Configuration.from_runnable_config(
+            {"configurable": {"max_search_results": 4, "turn_deadline": deadline}}
+        )
+        for deadline in (100.0, 200.0)
+    )
+
+    assert (first.turn_deadline, second.turn_deadline) == (100.0, 200.0)
+    assert base.turn_deadline is None and first.max_search_results == 4
+    assert (
+        Configuration.from_runnable_config({"configurable": {"max_search_results": 4}})
+        is base
+    )
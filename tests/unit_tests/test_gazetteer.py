@@ -0,0 +1,48 @@
+"""Test the offline location gazetteer."""
+
+from travel_master.gazetteer import (
+    Gazetteer,
+    describe_location,
+    normalize_location,
+)
+
+
+def test_equivalent_names_share_a_code() -> None:
+    for text in ["NYC", "New York", "JFK", "new york city", "  Newark "]:
+        assert normalize_location(text) == "NYC"
+
+
+def test_lookup_handles_accents_and_country_suffix() -> None:
+    assert normalize_location("Zürich") == "ZRH"
+    assert normalize_location("Paris, France") == "PAR"
+    assert normalize_location("Portland, OR") == "PDX"
+    assert normalize_location("Sydney, NSW, Australia") == "SYD"
+
+
+def test_suffix_naming_another_region_is_not_resolved() -> None:
+    for text in [
+        "Portland, Maine",
+        "Paris, Texas",
+        "London, Ontario",
+        "Sydney, Nova Scotia",
+    ]:
+        assert normalize_location(text) == text
+        assert describe_location(text) == text
+
+
+def test_unknown_location_is_passed_through() -> None:
+    assert normalize_location(" Springfield ") == "Springfield"
+    assert describe_location("Springfield") == "Springfield"
+
+
+def test_describe_location_renders_codes() -> None:
+    assert describe_location("PAR") == "Paris (PAR)"
+
+
+def test_records_are_sorted_and_complete_by_prefix() -> None:
+    gazetteer = Gazetteer()
+    keys = [gazetteer._key_at(gazetteer._load(), i) for i in range(len(gazetteer))]
+    assert keys == sorted(keys)
+
+    codes = [place.code for place in gazetteer.complete("san")]
+    assert {"SAN", "SFO", "SJC", "SCL"} <= set(codes)
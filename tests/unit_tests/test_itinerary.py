@@ -0,0 +1,159 @@
+"""Test the structured itinerary and the compacted assistant history."""
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from travel_master.history import compact_history, history_counters, scope_history
+from travel_master.itinerary import itinerary_update, merge_itinerary, render_itinerary
+
+
+def test_itinerary_is_built_from_tool_results() -> None:
+    itinerary = merge_itinerary(
+        {},
+        itinerary_update(
+            "search_flights",
+            {
+                "origin": "new york",
+                "destination": "london",
+                "departure_date": "2030-03-10",
+            },
+            {
+                "status": "success",
+                "origin": "NYC",
+                "destination": "LON",
+                "passengers": 2,
+            },
+        ),
+    )
+    itinerary = merge_itinerary(
+        itinerary,
+        itinerary_update(
+            "book_flight",
+            {"flight_id": "BA117"},
+            {"status": "success", "confirmation_number": "FL123456"},
+        ),
+    )
+    itinerary = merge_itinerary(
+        itinerary,
+        itinerary_update(
+            "change_flight",
+            {"confirmation_number": "FL123456", "new_departure_date": "2030-03-11"},
+            {"status": "success"},
+        ),
+    )
+
+    assert itinerary == {
+        "origin": "NYC",
+        "destination": "LON",
+        "departure_date": "2030-03-10",
+        "travellers": 2,
+        "bookings": {
+            "FL123456": {
+                "domain": "flight",
+                "status": "changed",
+                "item": "BA117",
+                "departure_date": "2030-03-11",
+            }
+        },
+    }
+    assert render_itinerary(itinerary).splitlines() == [
+        "- Flights: NYC -> LON departing 2030-03-10",
+        "- Travellers: 2",
+        "- Booking FL123456: flight changed (item=BA117, departure_date=2030-03-11)",
+    ]
+
+
+def test_missing_values_and_failed_calls_keep_known_details() -> None:
+    itinerary = {"hotel_location": "PAR", "rooms": 1}
+
+    assert merge_itinerary(itinerary, {"hotel_location": None, "rooms": 2}) == {
+        "hotel_location": "PAR",
+        "rooms": 2,
+    }
+    assert (
+        itinerary_update("search_hotels", {"location": "Rome"}, {"status": "error"})
+        == {}
+    )
+    assert render_itinerary({}) == ""
+
+
+def test_compact_history_drops_tool_traffic_of_earlier_turns() -> None:
+    call = AIMessage(
+        content="", tool_calls=[{"name": "search_hotels", "args": {}, "id": "1"}]
+    )
+    result = ToolMessage(content="{}", tool_call_id="1", name="search_hotels")
+    answer = AIMessage(content="Here are three hotels.")
+    messages = [
+        HumanMessage(content="Hotels in Paris"),
+        call,
+        result,
+        answer,
+        HumanMessage(content="Book the first one"),
+        call,
+        result,
+    ]
+
+    compacted = compact_history(messages)
+
+    assert compacted == [messages[0], answer, *messages[4:]]
+
+
+def handoff_back(name: str, call_id: str) -> list:
+    call = {"name": "transfer_back_to_supervisor", "args": {}, "id": call_id}
+    return [
+        AIMessage(
+            content="Transferring back to supervisor", name=name, tool_calls=[call]
+        ),
+        ToolMessage(
+            content="Successfully transferred back",
+            name="transfer_back_to_supervisor",
+            tool_call_id=call_id,
+        ),
+    ]
+
+
+def test_scoped_history_keeps_the_user_and_the_assistants_own_messages() -> None:
+    hotels = AIMessage(
+        content="Here are three hotels in Rome: " + "Hotel Roma, $120 per night. " * 20
+    )
+    flights = AIMessage(content="Here are two flights from Paris to Rome.")
+    handoff = AIMessage(
+        content="",
+        name="supervisor",
+        tool_calls=[{"name": "transfer_to_flight_assistant", "args": {}, "id": "3"}],
+    )
+    search = AIMessage(
+        content="", tool_calls=[{"name": "search_flights", "args": {}, "id": "4"}]
+    )
+    messages = [
+        HumanMessage(content="Flights from Paris to Rome and a hotel there"),
+        hotels,
+        *handoff_back("accommodation_assistant", "1"),
+        flights,
+        *handoff_back("flight_assistant", "2"),
+        AIMessage(content=f"{hotels.content} {flights.content}", name="supervisor"),
+        HumanMessage(content="Any cheaper flights?"),
+        handoff,
+        ToolMessage(
+            content="Successfully transferred",
+            name="transfer_to_flight_assistant",
+            tool_call_id="3",
+        ),
+        search,
+        ToolMessage(content="{}", name="search_flights", tool_call_id="4"),
+    ]
+    history_counters.reset()
+
+    scoped, context = scope_history(
+        messages, "flight_assistant", frozenset({"search_flights"})
+    )
+
+    assert scoped == [messages[0], flights, messages[8], search, messages[-1]]
+    assert context.startswith(
+        "- accommodation_assistant: Here are three hotels in Rome"
+    )
+    assert context.endswith("...") and len(context) < 250
+    counters = history_counters.snapshot()
+    assert (
+        counters["flight_assistant.prompt_tokens_scoped"]
+        < counters["flight_assistant.prompt_tokens_full"] / 3
+    )
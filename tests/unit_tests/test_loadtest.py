@@ -0,0 +1,102 @@
+"""Test the load tester and the simulated backends."""
+
+import pytest
+
+from travel_master.loadtest import (
+    InProcessTarget,
+    StageReport,
+    percentile,
+    run_load_test,
+    saturation_point,
+)
+from travel_master.search_cache import search_cache
+from travel_master.simulation import (
+    SIMULATED_CONFIGURABLE,
+    LatencyDistribution,
+    simulated_search,
+)
+from travel_master.travel_master import graph
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([], 95) is None
+
+
+def test_saturation_point() -> None:
+    def stage(users: int, throughput: float, p95: float = 100.0) -> StageReport:
+        return StageReport(concurrency=users, turns_per_second=throughput, p95_ms=p95)
+
+    assert saturation_point([stage(1, 10), stage(2, 19), stage(4, 30)]) is None
+    assert saturation_point([stage(1, 10), stage(2, 19), stage(4, 20)]) == 2
+    assert saturation_point([stage(1, 10), stage(2, 19, p95=900)], max_p95_ms=500) == 1
+
+
+def test_latency_distributions() -> None:
+    assert LatencyDistribution.parse("fixed:0.25").sample() == 0.25
+    assert 0.1 <= LatencyDistribution.parse("uniform:0.1,0.2").sample() <= 0.2
+    assert LatencyDistribution.parse("lognormal:0.5,1.5").sample() > 0
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse("gamma:1")
+
+
+@pytest.mark.asyncio
+async def test_load_test_runs_scripted_conversations(monkeypatch) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    target = InProcessTarget(graph, dict(SIMULATED_CONFIGURABLE))
+
+    reports = await run_load_test(target, [1, 2], 0.3)
+
+    assert [r.concurrency for r in reports] == [1, 2]
+    for report in reports:
+        assert report.turns > 0
+        assert report.errors == 0
+        assert report.p50_ms is not None and report.p50_ms <= report.p99_ms
+        assert report.rss_mb is not None
+
+
+@pytest.mark.asyncio
+async def test_simulated_assistant_books_and_changes(monkeypatch) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    target = InProcessTarget(graph, dict(SIMULATED_CONFIGURABLE))
+    session = await target.start("conversation")
+
+    await target.turn(
+        session, "Find flights from Paris to Rome on 2030-05-01 returning 2030-05-08"
+    )
+    await target.turn(session, "Book the cheapest flight")
+    await target.turn(session, "Change my flight to 2030-05-03")
+
+    itinerary = session["itinerary"]
+    assert itinerary["origin"] == "PAR" and itinerary["destination"] == "ROM"
+    (booking,) = itinerary["bookings"].values()
+    assert booking["status"] == "changed"
+    assert booking["departure_date"] == "2030-05-03"
+
+
+@pytest.mark.asyncio
+async def test_supervisor_hands_off_to_several_assistants_with_parallel_tool_calls(
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    target = InProcessTarget(
+        graph, {**SIMULATED_CONFIGURABLE, "parallel_tool_calls": True}
+    )
+    session = await target.start("conversation")
+
+    # The simulated hotel assistant takes the first two dates as check-in and check-out
+    await target.turn(
+        session,
+        "Find flights from Paris to Rome on 2030-05-01 and a hotel in Rome, leaving 2030-05-04",
+    )
+
+    itinerary = session["itinerary"]
+    assert itinerary["origin"] == "PAR" and itinerary["departure_date"] == "2030-05-01"
+    assert (
+        itinerary["hotel_location"] == "ROM"
+        and itinerary["check_out_date"] == "2030-05-04"
+    )
+    assert session["messages"][-1].content.count("Here is what I found") == 2
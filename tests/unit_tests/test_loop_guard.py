@@ -0,0 +1,161 @@
+"""Test loop detection and step budgets."""
+
+import time
+from collections import defaultdict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import travel_master.model_tiering as model_tiering
+from travel_master.car_rental_assistant.car_rental_assistant import car_rental_assistant
+from travel_master.car_rental_assistant.car_rental_assistant_tools import (
+    CAR_RENTAL_ASSISTANT_TOOLS,
+)
+from travel_master.configuration import Configuration
+from travel_master.loop_guard import (
+    find_repeat,
+    fingerprint,
+    loop_counters,
+    mean_step_seconds,
+    step_limit,
+)
+from travel_master.model_tiering import tiering_counters
+from travel_master.simulation import SimulatedChatModel
+from travel_master.state import State
+from travel_master.tool_node import TravelToolNode, route_after_tools
+
+ARGS = {
+    "location": "Paris",
+    "pickup_date": "2030-05-01",
+    "dropoff_date": "2030-05-04",
+    "car_type": None,
+}
+
+
+def _call(call_id: str, **args) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": "search_cars", "args": {**ARGS, **args}, "id": call_id}],
+    )
+
+
+def _result(call_id: str) -> ToolMessage:
+    return ToolMessage(
+        content='{"results":[]}', name="search_cars", tool_call_id=call_id
+    )
+
+
+def test_fingerprint() -> None:
+    assert fingerprint("search_cars", ARGS) == fingerprint(
+        "search_cars", {k: v for k, v in ARGS.items() if v}
+    )
+    assert fingerprint("search_cars", ARGS) != fingerprint(
+        "search_cars", {**ARGS, "location": "paris."}
+    )
+    assert fingerprint("search_cars", ARGS, near=True) == fingerprint(
+        "search_cars", {**ARGS, "location": " paris."}, near=True
+    )
+
+
+def test_find_repeat_only_looks_at_the_current_turn() -> None:
+    earlier = [
+        HumanMessage(content="cars in Paris"),
+        _call("call-1"),
+        _result("call-1"),
+    ]
+    assert find_repeat(earlier, "search_cars", ARGS).exact
+    assert (
+        find_repeat([*earlier, HumanMessage(content="again")], "search_cars", ARGS)
+        is None
+    )
+    near = find_repeat(earlier, "search_cars", {**ARGS, "location": "PARIS"})
+    assert near.prior.tool_call_id == "call-1" and not near.exact and near.count == 1
+    assert find_repeat(earlier, "search_cars", {**ARGS, "location": "Lyon"}) is None
+
+
+@pytest.mark.asyncio
+async def test_repeats_are_answered_from_the_earlier_result_then_aborted() -> None:
+    node = TravelToolNode(CAR_RENTAL_ASSISTANT_TOOLS)
+    messages = [
+        HumanMessage(content="cars in Paris"),
+        _call("call-1"),
+        _result("call-1"),
+        _call("call-2", location="paris"),
+    ]
+    aborts = loop_counters.get("loop_aborts")
+
+    result = await node(State(messages=messages), {})
+    (repeat,) = result["messages"]
+    assert repeat.content == '{"results":[]}' and repeat.response_metadata == {
+        "repeat_of": "call-1"
+    }
+    assert (
+        route_after_tools(State(messages=[*messages, *result["messages"]]))
+        == "assistant"
+    )
+
+    messages = [*messages, repeat, _call("call-3")]
+    result = await node(State(messages=messages), {})
+    assert result["messages"][-1].response_metadata == {"loop_abort": True}
+    assert (
+        route_after_tools(State(messages=[*messages, *result["messages"]])) == "__end__"
+    )
+    assert loop_counters.get("loop_aborts") == aborts + 1
+
+
+def test_step_limit() -> None:
+    names = {"search_cars"}
+    turn = [HumanMessage(content="cars in Paris"), _call("call-1"), _result("call-1")]
+    configuration = Configuration()
+    assert step_limit(turn, names, 3, configuration) is None
+    assert step_limit(turn, names, 2, configuration) == "steps"
+    # Earlier turns do not count
+    assert (
+        step_limit([*turn, HumanMessage(content="and Lyon?")], names, 2, configuration)
+        is None
+    )
+
+    assert (
+        step_limit(turn, names, 3, Configuration(turn_deadline=time.time() - 1))
+        == "deadline"
+    )
+    assert (
+        step_limit(turn, names, 3, Configuration(turn_deadline=time.time() + 3600))
+        is None
+    )
+
+
+def test_mean_step_seconds_only_counts_sub_assistant_calls(monkeypatch) -> None:
+    monkeypatch.setattr(tiering_counters, "_values", defaultdict(float))
+    configuration = Configuration()
+    assert mean_step_seconds(configuration) == configuration.assistant_step_seconds
+    tiering_counters.incr("supervisor.calls", 10)
+    tiering_counters.incr("supervisor.latency_seconds", 100.0)
+    tiering_counters.incr("sub_assistant.calls", 2)
+    tiering_counters.incr("sub_assistant.latency_seconds", 3.0)
+    assert mean_step_seconds(configuration) == 1.5
+
+
+@pytest.mark.asyncio
+async def test_the_last_step_is_called_without_tools(monkeypatch) -> None:
+    monkeypatch.setattr(
+        model_tiering,
+        "load_chat_model",
+        lambda name: SimulatedChatModel(model="assistant"),
+    )
+    turn = [HumanMessage(content="cars in Paris"), _call("call-1"), _result("call-1")]
+    configurable = {
+        "sub_assistant_model": "test/last-step",
+        "car_rental_assistant_max_steps": 2,
+    }
+
+    result = await car_rental_assistant(
+        State(messages=turn), {"configurable": configurable}
+    )
+    assert result["messages"][0].content == "Here is what I found so far."
+
+    configurable["car_rental_assistant_max_steps"] = 3
+    result = await car_rental_assistant(
+        State(messages=turn), {"configurable": configurable}
+    )
+    assert result["messages"][0].content.startswith("Here is what I found:")
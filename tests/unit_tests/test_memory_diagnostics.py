@@ -0,0 +1,61 @@
+"""Test the memory diagnostics."""
+
+import json
+import urllib.request
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from travel_master.memory_diagnostics import (
+    MemoryDiagnostics,
+    module_group,
+    thread_state_size,
+)
+
+
+def test_module_group() -> None:
+    assert module_group("/app/src/travel_master/tool_node.py") == "travel_master"
+    assert (
+        module_group(
+            "/venv/lib/python3.11/site-packages/langchain_core/messages/base.py"
+        )
+        == "langchain"
+    )
+    assert (
+        module_group("/venv/lib/python3.11/site-packages/aiohttp/client.py") == "http"
+    )
+    assert module_group("/usr/lib/python3.11/json/decoder.py") == "other"
+
+
+def test_thread_state_size() -> None:
+    state = {"messages": [HumanMessage(content="hello"), AIMessage(content="hi there")]}
+    assert thread_state_size(state) == (2, 13)
+    assert thread_state_size({}) == (0, 0)
+
+
+def test_report_groups_growth_and_states() -> None:
+    states = {
+        "t-1": {"messages": [HumanMessage(content="x" * 100)]},
+        "t-2": {"messages": []},
+    }
+    diagnostics = MemoryDiagnostics(interval_seconds=3600)
+    diagnostics.start()
+    try:
+        diagnostics.track_states(states)
+        retained = [bytearray(1000) for _ in range(200)]  # noqa: F841
+        report = diagnostics.report()
+        port = diagnostics.serve(0)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/") as response:
+            served = json.loads(response.read())
+    finally:
+        diagnostics.stop()
+
+    assert report["traced_bytes"] > 0
+    assert report["top_diffs"] and report["top_diffs"][0]["size_diff"] >= 200_000
+    assert report["top_diffs"][0]["site"].startswith(f"{__file__}:")
+    assert report["thread_states"]["threads"] == 2
+    assert report["thread_states"]["largest"][0] == {
+        "thread_id": "t-1",
+        "messages": 1,
+        "characters": 100,
+    }
+    assert served["thread_states"]["messages"] == 1
@@ -0,0 +1,147 @@
+"""Test per-call model tiering."""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+import travel_master.model_tiering as model_tiering
+from travel_master.configuration import Configuration
+from travel_master.model_tiering import TieredChatModel, choose_tier, extract_features
+
+
+class NamedFakeModel(GenericFakeChatModel):
+    delay: float = 0.0
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "NamedFakeModel":
+        return self
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], *args: Any, **kwargs: Any
+    ) -> Any:
+        await asyncio.sleep(self.delay)
+        return await super()._agenerate(messages, *args, **kwargs)
+
+    async def _astream(
+        self, messages: List[BaseMessage], *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        await asyncio.sleep(self.delay)
+        async for chunk in super()._astream(messages, *args, **kwargs):
+            yield chunk
+
+
+class RunRecorder(BaseCallbackHandler):
+    def __init__(self) -> None:
+        self.runs: List[Any] = []
+
+    def on_chat_model_start(
+        self, serialized: Any, messages: Any, *, tags: Any = None, **kwargs: Any
+    ) -> None:
+        self.runs.append((kwargs["parent_run_id"] is not None, tags))
+
+
+@pytest.fixture
+def fake_models(monkeypatch: pytest.MonkeyPatch) -> Dict[str, float]:
+    delays: Dict[str, float] = {}
+
+    def load(name: str) -> NamedFakeModel:
+        def replies() -> Any:
+            while True:
+                yield AIMessage(content=name)
+
+        return NamedFakeModel(messages=replies(), delay=delays.get(name, 0.0))
+
+    monkeypatch.setattr(model_tiering, "load_chat_model", load)
+    return delays
+
+
+def features(text: str, **overrides: Any) -> Any:
+    return extract_features([HumanMessage(content=text)], Configuration(**overrides))
+
+
+def test_policy_sends_simple_turns_to_the_small_tier() -> None:
+    configuration = Configuration()
+    assert choose_tier(features("yes please"), "supervisor", configuration) == "small"
+    assert choose_tier(features("hi there"), "sub_assistant", configuration) == "small"
+    assert (
+        choose_tier(features("find flights to Tokyo"), "sub_assistant", configuration)
+        == "default"
+    )
+    assert (
+        choose_tier(features("flight and hotel in Rome"), "supervisor", configuration)
+        == "default"
+    )
+
+
+@pytest.mark.asyncio
+async def test_model_is_chosen_per_call_from_the_configuration(
+    fake_models: Dict[str, float],
+) -> None:
+    model = TieredChatModel(role="supervisor")
+    config = {
+        "configurable": {"enable_model_tiering": True, "small_model": "fake/small"}
+    }
+
+    small = await model.ainvoke([HumanMessage(content="thanks!")], config)
+    default = await model.ainvoke(
+        [HumanMessage(content="book the hotel and a car")], config
+    )
+
+    assert small.content == "fake/small"
+    assert default.content == Configuration().supervisor_model
+
+
+@pytest.mark.asyncio
+async def test_timeouts_fall_back(fake_models: Dict[str, float]) -> None:
+    fake_models["fake/slow"] = 5.0
+    model = TieredChatModel(role="sub_assistant")
+    config = {
+        "configurable": {
+            "sub_assistant_model": "fake/slow",
+            "fallback_model": "fake/fallback",
+            "model_call_timeout_seconds": 0.01,
+        }
+    }
+
+    response = await model.ainvoke([HumanMessage(content="search hotels")], config)
+
+    assert response.content == "fake/fallback"
+    assert model_tiering.tier_report()["fallback"]["calls"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_streams_and_callbacks_reach_the_chosen_model(
+    fake_models: Dict[str, float],
+) -> None:
+    fake_models["fake/slow"] = 5.0
+    model = TieredChatModel(role="sub_assistant")
+    recorder = RunRecorder()
+    config = {
+        "callbacks": [recorder],
+        "configurable": {
+            "sub_assistant_model": "fake/slow",
+            "fallback_model": "fake/fallback",
+            "model_call_timeout_seconds": 0.01,
+        },
+    }
+
+    chunks = [
+        chunk
+        async for chunk in model.astream(
+            [HumanMessage(content="search hotels")], config
+        )
+    ]
+    assert "".join(str(chunk.content) for chunk in chunks) == "fake/fallback"
+    # Both the tiered model and the tier models report to the callbacks; only the former streams
+    assert (
+        len(recorder.runs) == 3
+        and sum("nostream" in (tags or []) for _, tags in recorder.runs) == 2
+    )
+
+    # Invoked, the tier model runs as a child of the tiered model's run
+    recorder.runs.clear()
+    await model.ainvoke([HumanMessage(content="search hotels")], config)
+    assert [is_child for is_child, _ in recorder.runs] == [False, True, True]
@@ -0,0 +1,137 @@
+"""Test the search cache and the speculative prefetcher."""
+
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+    search_hotels,
+)
+from travel_master.configuration import Configuration
+from travel_master.prefetch import SearchPrefetcher
+from travel_master.search_cache import SearchCache, search_cache
+
+
+class FakeBackend:
+    def __init__(self) -> None:
+        self.queries: List[str] = []
+
+    async def __call__(self, query: str, max_results: int) -> Any:
+        self.queries.append(query)
+        await asyncio.sleep(0)
+        return [{"content": query}]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_normalizes_keys_and_reuses_results() -> None:
+    backend = FakeBackend()
+    cache = SearchCache(backend=backend)
+
+    first = await cache.search("Flights  to Paris", 5, ttl=60)
+    second = await cache.search("flights to paris", 5, ttl=60)
+
+    assert first == second
+    assert len(backend.queries) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_cache_shares_concurrent_lookups() -> None:
+    backend = FakeBackend()
+    cache = SearchCache(backend=backend)
+
+    results = await asyncio.gather(
+        *(cache.search("hotels in rome", 5, ttl=60) for _ in range(5))
+    )
+
+    assert len(backend.queries) == 1
+    assert all(result == results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_prefetch_warms_hotel_and_car_searches() -> None:
+    from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+        build_hotel_search_query,
+    )
+
+    backend = FakeBackend()
+    cache = SearchCache(backend=backend)
+    cache.counters.reset()
+    prefetcher = SearchPrefetcher(cache)
+    prefetcher.counters.reset()
+    configuration = Configuration(enable_search_prefetch=True)
+
+    scheduled = prefetcher.prefetch_after_flight_search(
+        destination="Paris",
+        departure_date="2030-03-10",
+        return_date="2030-03-17",
+        passengers=2,
+        configuration=configuration,
+    )
+    await prefetcher.drain()
+    assert scheduled == 2
+    assert len(backend.queries) == 2
+
+    query = build_hotel_search_query("Paris", "2030-03-10", "2030-03-17", guests=2)
+    await cache.search(query, configuration.max_search_results, ttl=60)
+
+    assert len(backend.queries) == 2
+    assert prefetcher.hit_ratio() == 0.5
+
+
+@pytest.mark.asyncio
+async def test_prefetch_respects_budget_and_one_way_trips() -> None:
+    cache = SearchCache(backend=FakeBackend())
+    prefetcher = SearchPrefetcher(cache)
+    configuration = Configuration(search_prefetch_budget_per_minute=1)
+
+    assert (
+        prefetcher.prefetch_after_flight_search(
+            destination="Rome",
+            departure_date="2030-05-01",
+            return_date=None,
+            passengers=1,
+            configuration=configuration,
+        )
+        == 0
+    )
+    assert (
+        prefetcher.prefetch_after_flight_search(
+            destination="Rome",
+            departure_date="2030-05-01",
+            return_date="2030-05-04",
+            passengers=1,
+            configuration=configuration,
+        )
+        == 1
+    )
+    await prefetcher.drain()
+
+
+@pytest.mark.asyncio
+async def test_prefetched_hotel_search_serves_a_default_search(monkeypatch) -> None:
+    backend = FakeBackend()
+    monkeypatch.setattr(search_cache, "backend", backend)
+    search_cache.clear()
+    search_cache.counters.reset()
+    prefetcher = SearchPrefetcher(search_cache)
+
+    scheduled = prefetcher.prefetch_after_flight_search(
+        destination="ROM",
+        departure_date="2030-05-01",
+        return_date="2030-05-04",
+        passengers=1,
+        configuration=Configuration(search_prefetch_max_concurrency=3),
+    )
+    await prefetcher.drain()
+    # The default two guests and the one passenger are different hotel searches
+    assert scheduled == len(backend.queries) == 3
+
+    await search_hotels(
+        location="Rome",
+        check_in_date="2030-05-01",
+        check_out_date="2030-05-04",
+        config={"configurable": {}},
+    )
+    assert len(backend.queries) == 3
+    assert search_cache.counters.get("prefetch_hits") == 1
@@ -0,0 +1,90 @@
+"""Test price extraction and the price watch scheduler."""
+
+from typing import Any
+
+import pytest
+
+from travel_master.price_watch import PriceWatchScheduler, WatchStore
+from travel_master.pricing import Price, extract_prices, min_price
+from travel_master.search_cache import SearchCache
+
+
+def test_prices_are_extracted_with_their_currency() -> None:
+    assert extract_prices("From $1,249.50 or EUR 980, was £1,100") == [
+        Price(1249.5, "USD"),
+        Price(980.0, "EUR"),
+        Price(1100.0, "GBP"),
+    ]
+    results = [
+        {"title": "Rome deals", "content": "Fares from $420"},
+        {"content": "US$ 399 nonstop"},
+    ]
+    assert min_price(results) == 399.0
+    assert min_price(results, "EUR") is None
+
+
+@pytest.mark.asyncio
+async def test_watches_sharing_a_query_search_once(tmp_path) -> None:
+    prices = iter(["$500", "$430"])
+    calls = []
+
+    async def backend(query: str, max_results: int) -> Any:
+        calls.append(query)
+        return [{"content": f"Round trip from {next(prices)}"}]
+
+    path = str(tmp_path / "watches.json")
+    store = WatchStore(path)
+    flight = {"origin": "Paris", "destination": "rome", "departure_date": "2030-05-01"}
+    first = store.create("flight", flight)
+    store.create("flight", {**flight, "origin": "CDG", "destination": "Rome, Italy"})
+    store.create(
+        "hotel",
+        {
+            "location": "Rome",
+            "check_in_date": "2030-05-01",
+            "check_out_date": "2030-05-03",
+        },
+        baseline_price=450,
+    )
+
+    scheduler = PriceWatchScheduler(
+        store, cache=SearchCache(backend), interval_seconds=0.0
+    )
+    await scheduler.run_once()
+
+    assert len(calls) == 2
+    report = {w["id"]: w for w in scheduler.report()}
+    assert report[first.id]["baseline_price"] == 500.0
+    assert {w["min_price_diff"] for w in report.values()} == {0.0, -20.0}
+
+    # Watches survive a restart
+    assert {w.id for w in WatchStore(path).active()} == set(report)
+
+
+@pytest.mark.asyncio
+async def test_every_run_searches_afresh(tmp_path) -> None:
+    prices = iter(["$500", "$430", "$410"])
+    calls = []
+
+    async def backend(query: str, max_results: int) -> Any:
+        calls.append(query)
+        return [{"content": f"Round trip from {next(prices)}"}]
+
+    store = WatchStore(str(tmp_path / "watches.json"))
+    watch = store.create(
+        "flight",
+        {"origin": "Paris", "destination": "Rome", "departure_date": "2030-05-01"},
+    )
+    cache = SearchCache(backend)
+    scheduler = PriceWatchScheduler(store, cache=cache, interval_seconds=3600.0)
+
+    for _ in range(3):
+        await scheduler.run_once()
+    assert len(calls) == 3
+    assert (watch.last_price, watch.min_price_diff) == (410.0, -90.0)
+
+    # The latest prices serve user searches until the next run
+    assert await cache.search(watch.query, 10, 3600.0) == [
+        {"content": "Round trip from $410"}
+    ]
+    assert len(calls) == 3
@@ -0,0 +1,67 @@
+"""Test the per-run sampling profiler."""
+
+import asyncio
+import sys
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from travel_master.profiling import ProfilingHandler, node_path, profiled
+from travel_master.search_cache import search_cache
+from travel_master.simulation import SIMULATED_CONFIGURABLE, simulated_search
+from travel_master.travel_master import graph
+
+
+def test_node_path() -> None:
+    metadata = {
+        "langgraph_checkpoint_ns": "supervisor:1f0a|flight_assistant:2b3c|tools:4d5e"
+    }
+    assert node_path(metadata) == "supervisor/flight_assistant/tools"
+    assert node_path({}) is None
+
+
+async def _run(tmp_path, **configurable) -> None:
+    config = {
+        "configurable": {
+            **SIMULATED_CONFIGURABLE,
+            "thread_id": "t-1",
+            "profiling_output_dir": str(tmp_path),
+            **configurable,
+        }
+    }
+    await profiled(graph, config).ainvoke(
+        {
+            "messages": [
+                HumanMessage(content="Find flights from Paris to Rome on 2030-05-01")
+            ]
+        },
+        config,
+    )
+
+
+@pytest.mark.asyncio
+async def test_profiled_run_writes_collapsed_stacks(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    switch_interval = sys.getswitchinterval()
+
+    await _run(tmp_path, profile=True, profiling_interval_ms=0.5)
+
+    (profile,) = tmp_path.iterdir()
+    assert profile.name.endswith(".collapsed") and "-t-1-" in profile.name
+    lines = profile.read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("node:") and int(count) > 0
+    assert any(line.startswith("node:supervisor;") for line in lines)
+    # Sampling state is restored once the run ends
+    assert sys.getswitchinterval() == switch_interval
+    assert asyncio.get_running_loop().get_task_factory() is None
+
+
+def test_only_sampled_runs_get_the_profiling_handler() -> None:
+    assert profiled(graph, {"configurable": {}}) is graph
+    assert profiled(graph, {"configurable": {"profiling_sample_rate": 0.0}}) is graph
+    for configurable in ({"profile": True}, {"profiling_sample_rate": 1.0}):
+        (handler,) = profiled(graph, {"configurable": configurable}).config["callbacks"]
+        assert isinstance(handler, ProfilingHandler)
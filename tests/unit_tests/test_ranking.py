@@ -0,0 +1,141 @@
+"""Test the ranking of search candidates."""
+
+import json
+import math
+from typing import Any
+
+import pytest
+
+from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+    search_hotels,
+)
+from travel_master.pricing import extract_prices
+from travel_master.ranking import (
+    Preferences,
+    load_fx_rates,
+    normalized_prices,
+    rank_candidates,
+    ranking_currency,
+)
+from travel_master.search_cache import search_cache
+
+FX = {"USD": 1.0, "EUR": 1.1, "GBP": 1.25}
+
+
+def test_prices_carry_the_unit_they_are_quoted_for() -> None:
+    text = "$120 per night, total $540, €45/day, GBP 300 nightly, $99 pp, A$200"
+    assert [p.unit for p in extract_prices(text)] == [
+        "night",
+        "total",
+        "day",
+        "night",
+        "person",
+        None,
+    ]
+
+
+def test_prices_are_normalized_to_one_currency_and_the_whole_stay() -> None:
+    texts = [
+        "From €100 per night",
+        "Total $480 for your stay",
+        "No price listed",
+        "£90 or $150 a night",
+    ]
+    prices = normalized_prices("hotel", texts, units=4, currency="USD", fx=FX)
+    assert prices[:2].tolist() == pytest.approx([440.0, 480.0])
+    assert math.isnan(prices[2])
+    assert prices[3] == pytest.approx(450.0)
+    # Flight fares are per traveller, not per night
+    assert normalized_prices("flight", ["Fares from €100"], units=4, fx=FX)[
+        0
+    ] == pytest.approx(110.0)
+
+
+def test_unknown_ranking_currency_falls_back_to_usd() -> None:
+    assert ranking_currency("eur", FX) == "EUR"
+    assert ranking_currency("XYZ", FX) == "USD"
+    assert normalized_prices("flight", ["Fares from €100"], currency="XYZ", fx=FX)[
+        0
+    ] == pytest.approx(110.0)
+
+
+def test_offline_fx_table_covers_the_extracted_currencies() -> None:
+    rates = load_fx_rates()
+    assert rates["USD"] == 1.0
+    assert {"EUR", "GBP", "AUD", "JPY"} <= set(rates)
+
+
+def test_hotels_are_ranked_by_price_and_stars_within_budget() -> None:
+    results = [
+        {"title": "Grand Palace", "content": "5-star hotel from $400 per night"},
+        {"title": "Budget Inn", "content": "2 star rooms from $60 per night"},
+        {"title": "City Hotel", "content": "4-star hotel, €110 per night"},
+        {"title": "Mystery", "content": "Great location"},
+    ]
+    ranked = rank_candidates(
+        "hotel",
+        results,
+        Preferences(max_price=600, min_stars=3),
+        units=3,
+        top_k=2,
+        fx=FX,
+    )
+    assert [r["title"] for r in ranked] == ["City Hotel", "Mystery"]
+    assert ranked[0]["price"] == 363.0
+    assert ranked[0]["stars"] == 4.0
+    assert "price" not in ranked[1]
+
+
+def test_flights_prefer_fewer_stops_and_cars_the_requested_class() -> None:
+    flights = [
+        {"title": "A", "content": "2 stops from $300"},
+        {"title": "B", "content": "Nonstop from $320"},
+        {"title": "C", "content": "one stop from $310"},
+    ]
+    ranked = rank_candidates(
+        "flight", flights, Preferences(max_stops=1), top_k=3, fx=FX
+    )
+    assert [(r["title"], r["stops"]) for r in ranked] == [("B", 0), ("C", 1), ("A", 2)]
+
+    cars = [
+        {"title": "Economy", "content": "Economy cars from $30/day"},
+        {"title": "SUV", "content": "Intermediate SUV from $35/day"},
+    ]
+    ranked = rank_candidates(
+        "car", cars, Preferences(car_class="SUV"), units=5, top_k=1, fx=FX
+    )
+    assert ranked == [{**cars[1], "price": 175.0, "car_class": "suv"}]
+
+
+def test_ties_keep_the_search_order() -> None:
+    results = [{"title": str(i), "content": "$100"} for i in range(5)]
+    ranked = rank_candidates("flight", results, Preferences(), top_k=5, fx=FX)
+    assert [r["title"] for r in ranked] == ["0", "1", "2", "3", "4"]
+    assert rank_candidates("flight", "no results", Preferences()) == "no results"
+
+
+@pytest.mark.asyncio
+async def test_search_tools_rank_results_when_enabled(monkeypatch) -> None:
+    async def backend(query: str, max_results: int) -> Any:
+        return [
+            {
+                "title": f"Hotel {i}",
+                "url": "u",
+                "content": f"3-star, ${200 - 10 * i} per night",
+            }
+            for i in range(5)
+        ]
+
+    monkeypatch.setattr(search_cache, "backend", backend)
+    args = {
+        "location": "Ranking Test City",
+        "check_in_date": "2030-06-01",
+        "check_out_date": "2030-06-03",
+    }
+    config = {"configurable": {"enable_result_ranking": True, "ranking_top_k": 2}}
+    result = json.loads(await search_hotels(**args, config=config))
+    assert result["currency"] == "USD"
+    assert [(r["title"], r["price"]) for r in result["results"]] == [
+        ("Hotel 4", 320.0),
+        ("Hotel 3", 340.0),
+    ]
@@ -0,0 +1,114 @@
+"""Test the semantic response cache."""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from travel_master.response_cache import (
+    cosine_similarity,
+    hash_vector,
+    lookup_cached_response,
+    response_cache,
+    store_response,
+)
+from travel_master.state import State
+
+CONFIG = {"configurable": {"enable_response_cache": True}}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    response_cache.clear()
+
+
+def test_similar_messages_have_similar_vectors() -> None:
+    a = hash_vector("What is your cancellation policy?")
+    b = hash_vector("what's your cancellation policy")
+    c = hash_vector("Find me a hotel in Rome next week")
+    assert cosine_similarity(a, b) > 0.8
+    assert cosine_similarity(a, c) < 0.3
+
+
+@pytest.mark.asyncio
+async def test_tool_free_answers_are_reused_for_similar_questions() -> None:
+    answer = AIMessage(
+        content="You can cancel for free up to 24 hours before.", name="supervisor"
+    )
+    await store_response(
+        State(
+            messages=[HumanMessage(content="What is your cancellation policy?"), answer]
+        ),
+        CONFIG,
+    )
+
+    result = await lookup_cached_response(
+        State(messages=[HumanMessage(content="what is your cancellation policy")]),
+        CONFIG,
+    )
+
+    (cached,) = result["messages"]
+    assert cached.content == answer.content
+    assert cached.response_metadata["cache"] == "semantic"
+
+
+@pytest.mark.asyncio
+async def test_turns_with_tools_or_booking_identifiers_are_not_cached() -> None:
+    await store_response(
+        State(
+            messages=[
+                HumanMessage(content="Search flights from Sydney to Tokyo next month"),
+                AIMessage(
+                    content="",
+                    tool_calls=[{"name": "search_flights", "args": {}, "id": "1"}],
+                ),
+                ToolMessage(content="{}", name="search_flights", tool_call_id="1"),
+                AIMessage(content="Here are some flights."),
+            ]
+        ),
+        CONFIG,
+    )
+    await store_response(
+        State(
+            messages=[
+                HumanMessage(content="What is the status of FL123456?"),
+                AIMessage(content="Confirmed."),
+            ]
+        ),
+        CONFIG,
+    )
+
+    for text in [
+        "Search flights from Sydney to Tokyo next month",
+        "What is the status of FL123456?",
+    ]:
+        result = await lookup_cached_response(
+            State(messages=[HumanMessage(content=text)]), CONFIG
+        )
+        assert result["messages"] == []
+
+
+@pytest.mark.asyncio
+async def test_answers_drawing_on_earlier_turns_are_not_shared() -> None:
+    question = HumanMessage(content="Do my travel dates work for the hotel?")
+    await store_response(
+        State(
+            messages=[
+                HumanMessage(content="I'm going to Rome from May 1 to May 5."),
+                AIMessage(content="Noted: Rome, May 1 to May 5."),
+                question,
+                AIMessage(content="Yes, your Rome dates work for the hotel."),
+            ]
+        ),
+        {"configurable": {**CONFIG["configurable"], "thread_id": "a"}},
+    )
+
+    result = await lookup_cached_response(
+        State(
+            messages=[
+                HumanMessage(content="I'm going to Tokyo from June 3 to June 9."),
+                AIMessage(content="Noted: Tokyo, June 3 to June 9."),
+                question,
+            ]
+        ),
+        {"configurable": {**CONFIG["configurable"], "thread_id": "b"}},
+    )
+    assert result["messages"] == []
@@ -0,0 +1,34 @@
+"""Test the compact tool result records."""
+
+from travel_master.results import CancellationResult, compact_search_results, to_json
+
+
+def test_records_serialize_compactly_in_a_stable_order() -> None:
+    payload = to_json(
+        CancellationResult(
+            "CX123456", "pending", "5-7 business days", "2030-01-01 10:00:00"
+        )
+    )
+
+    assert payload == (
+        '{"cancellation_id":"CX123456","refund_status":"pending","refund_timeline":"5-7 business days",'
+        '"cancellation_date":"2030-01-01 10:00:00","status":"success"}'
+    )
+    assert not hasattr(CancellationResult("a", "b", "c", "d"), "__dict__")
+
+
+def test_search_results_keep_only_what_the_assistant_reads() -> None:
+    results = [
+        {
+            "title": "Deals",
+            "url": "https://example.com",
+            "content": "From $99",
+            "score": 0.9,
+            "raw_content": None,
+        }
+    ]
+
+    assert compact_search_results(results) == [
+        {"title": "Deals", "url": "https://example.com", "content": "From $99"}
+    ]
+    assert compact_search_results("Search failed") == "Search failed"
@@ -0,0 +1,161 @@
+"""Test the local full-text index of search results."""
+
+import json
+from typing import Any, List
+
+import pytest
+
+from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+    search_hotels,
+)
+from travel_master.search_cache import search_cache
+from travel_master.search_index import (
+    SearchIndex,
+    match_expression,
+    search_index_counters,
+)
+
+HOTELS = [
+    {
+        "title": "Hotel Roma",
+        "url": "https://example.com/roma",
+        "content": "Boutique hotel near the Colosseum",
+    },
+    {
+        "title": "Budget rooms",
+        "url": "https://example.com/budget",
+        "content": "Cheap hostel rooms",
+    },
+    {
+        "title": "Apartments",
+        "url": "https://example.com/apt",
+        "content": "Apartment rentals, hotel service",
+    },
+]
+
+QUERY = "boutique hotel Colosseum"
+
+
+def test_documents_are_ranked_by_bm25_within_their_tags(tmp_path) -> None:
+    index = SearchIndex(str(tmp_path / "index.sqlite"))
+    assert index.add("hotel", QUERY, "ROM", "2030-05-01", HOTELS, now=1000.0) == 3
+    index.add(
+        "hotel",
+        "hotels Paris",
+        "PAR",
+        "2030-05-01",
+        [{"title": "Hotel Paris", "url": "u", "content": "hotel"}],
+        now=1000.0,
+    )
+    index.add("hotel", QUERY, "ROM", "2030-05-01", "Search failed")
+
+    hits = index.search(
+        "hotel",
+        "boutique hotel Colosseum",
+        location="ROM",
+        date="2030-05-01",
+        now=1000.0,
+    )
+    assert [hit["url"] for hit in hits] == [
+        "https://example.com/roma",
+        "https://example.com/apt",
+    ]
+    assert index.search("car", "hotel", location="ROM") == []
+    assert index.search("hotel", "hotel", location="ROM", date="2030-06-01") == []
+    assert index.search("hotel", "...") == []
+    # Only the documents of the very same search, up to case and spacing
+    assert (
+        len(index.search("hotel", "Boutique  HOTEL colosseum", same_search=True)) == 2
+    )
+    assert (
+        index.search("hotel", "boutique hotel Colosseum 2 guests", same_search=True)
+        == []
+    )
+    assert match_expression('hotel "Rome" hotel') == '"hotel" OR "rome"'
+
+
+def test_freshness_refresh_and_compaction(tmp_path) -> None:
+    index = SearchIndex(str(tmp_path / "index.sqlite"))
+    index.add("hotel", QUERY, "ROM", "2030-05-01", HOTELS, now=1000.0)
+    assert index.search("hotel", "hotel", max_age_seconds=100, now=2000.0) == []
+
+    # Seen again: refreshed in place, with the new content searchable
+    index.add(
+        "hotel",
+        QUERY,
+        "ROM",
+        "2030-05-01",
+        [{**HOTELS[1], "content": "Cheap hotel rooms"}],
+        now=1950.0,
+    )
+    assert len(index) == 3
+    hits = index.search("hotel", "hotel", max_age_seconds=100, now=2000.0)
+    assert hits == [
+        {
+            "title": "Budget rooms",
+            "url": "https://example.com/budget",
+            "content": "Cheap hotel rooms",
+        }
+    ]
+
+    assert index.compact(500, now=2000.0) == 2
+    assert len(index) == 1 and index.added_since_compaction == 0
+    assert index.search("hotel", "colosseum") == []
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_search_is_answered_from_fresh_local_hits(monkeypatch, tmp_path) -> None:
+    queries: List[str] = []
+
+    async def backend(query: str, max_results: int) -> Any:
+        queries.append(query)
+        return [
+            {
+                "title": f"Hotel {name}",
+                "url": f"https://example.com/{name}",
+                "content": "hotel in Lisbon",
+            }
+            for name in ("Alfama", "Baixa")
+        ]
+
+    monkeypatch.setattr(search_cache, "backend", backend)
+    search_index_counters.reset()
+    configurable = {
+        "enable_search_index": True,
+        "search_index_path": str(tmp_path / "index.sqlite"),
+        "search_index_min_hits": 2,
+    }
+    args = {
+        "location": "Lisbon",
+        "check_in_date": "2030-06-01",
+        "check_out_date": "2030-06-03",
+    }
+
+    first = json.loads(
+        await search_hotels(**args, config={"configurable": configurable})
+    )
+    # The same search, expired from the search cache, is answered by the index
+    search_cache.clear()
+    second = json.loads(
+        await search_hotels(**args, config={"configurable": configurable})
+    )
+    assert len(queries) == 1
+    assert second["results"] == first["results"]
+
+    # A search for other guests is not answered with the documents of this one
+    await search_hotels(**args, guests=3, config={"configurable": configurable})
+    assert len(queries) == 2
+
+    # Too few hits to answer alone: they top up the network results
+    configurable["search_index_min_hits"] = 5
+    search_cache.clear()
+    third = json.loads(
+        await search_hotels(**args, config={"configurable": configurable})
+    )
+    assert len(queries) == 3 and len(third["results"]) == 2
+    assert search_index_counters.snapshot() == {
+        "misses": 2,
+        "answered": 1,
+        "prefilled": 1,
+    }
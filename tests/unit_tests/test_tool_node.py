@@ -0,0 +1,238 @@
+"""Test tool call validation and execution."""
+
+import asyncio
+import json
+import time
+from datetime import date
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from travel_master.accommodation_assistant.accommodation_assistant_tools import (
+    ACCOMMODATION_ASSISTANT_TOOLS,
+)
+from travel_master.flight_assistant.flight_assistant_tools import FLIGHT_ASSISTANT_TOOLS
+from travel_master.state import State
+from travel_master.tool_node import TravelToolNode, route_after_tools
+from travel_master.validation import validate_tool_args
+
+TODAY = date(2030, 1, 1)
+
+
+def test_validator_normalizes_correctable_arguments() -> None:
+    args, errors = validate_tool_args(
+        "search_cars",
+        {
+            "location": " Paris ",
+            "pickup_date": "2030/3/5",
+            "dropoff_date": "March 9th, 2030",
+            "pickup_time": "9am",
+            "age": "30",
+        },
+        TODAY,
+    )
+    assert errors == {}
+    assert args == {
+        "location": "Paris",
+        "pickup_date": "2030-03-05",
+        "dropoff_date": "2030-03-09",
+        "pickup_time": "09:00",
+        "age": 30,
+    }
+
+
+def test_validator_reports_precise_errors() -> None:
+    _, errors = validate_tool_args(
+        "search_hotels",
+        {
+            "location": "Rome",
+            "check_in_date": "2030-05-10",
+            "check_out_date": "2030-05-08",
+        },
+        TODAY,
+    )
+    assert errors == {"check_out_date": "must be after check_in_date (2030-05-10)"}
+
+    _, errors = validate_tool_args(
+        "search_flights", {"departure_date": "2029-12-31"}, TODAY
+    )
+    assert "in the past" in errors["departure_date"]
+
+    args, errors = validate_tool_args(
+        "cancel_hotel", {"confirmation_number": "fl-123456"}, TODAY
+    )
+    assert "flight booking" in errors["confirmation_number"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_calls_are_answered_without_running_the_tool() -> None:
+    node = TravelToolNode(ACCOMMODATION_ASSISTANT_TOOLS)
+    message = AIMessage(
+        content="",
+        id="ai-1",
+        tool_calls=[
+            {
+                "name": "search_hotels",
+                "args": {
+                    "location": "Rome",
+                    "check_in_date": "2030-05-10",
+                    "check_out_date": "05/08/2030",
+                },
+                "id": "call-1",
+            }
+        ],
+    )
+
+    result = await node(State(messages=[HumanMessage(content="hi"), message]), {})
+
+    (tool_message,) = result["messages"]
+    assert tool_message.status == "error"
+    assert json.loads(tool_message.content)["errors"]["check_out_date"].startswith(
+        "'05/08/2030'"
+    )
+
+
+@pytest.mark.asyncio
+async def test_corrected_calls_replace_the_ai_message_and_run() -> None:
+    node = TravelToolNode(FLIGHT_ASSISTANT_TOOLS)
+    message = AIMessage(
+        content="",
+        id="ai-1",
+        tool_calls=[
+            {
+                "name": "cancel_flight",
+                "args": {"confirmation_number": "fl 123456"},
+                "id": "call-1",
+            }
+        ],
+    )
+
+    result = await node(State(messages=[message]), {})
+
+    corrected, tool_message = result["messages"]
+    assert corrected.id == "ai-1"
+    assert corrected.tool_calls[0]["args"] == {"confirmation_number": "FL123456"}
+    assert json.loads(tool_message.content)["cancellation_id"].startswith("CX")
+    assert result["itinerary"] == {
+        "bookings": {"FL123456": {"domain": "flight", "status": "cancelled"}}
+    }
+
+
+@pytest.mark.asyncio
+async def test_deterministic_results_are_answered_from_templates() -> None:
+    node = TravelToolNode(FLIGHT_ASSISTANT_TOOLS)
+    message = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "cancel_flight",
+                "args": {"confirmation_number": "FL123456"},
+                "id": "call-1",
+            }
+        ],
+    )
+    config = {"configurable": {"direct_tool_responses": True}}
+
+    result = await node(State(messages=[message]), config)
+
+    _, response = result["messages"]
+    assert response.content.startswith(
+        "Your flight booking FL123456 has been cancelled.\n- Cancellation ID: CX"
+    )
+    assert route_after_tools(State(messages=result["messages"])) == "__end__"
+
+    search = AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "search_flights", "args": {"origin": "Paris"}, "id": "call-2"}
+        ],
+    )
+    result = await node(State(messages=[search]), config)
+    assert route_after_tools(State(messages=result["messages"])) == "assistant"
+
+
+@pytest.mark.asyncio
+async def test_change_responses_list_the_requested_changes() -> None:
+    node = TravelToolNode(FLIGHT_ASSISTANT_TOOLS)
+    message = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "change_flight",
+                "args": {
+                    "confirmation_number": "FL123456",
+                    "new_departure_date": "2030-03-11",
+                },
+                "id": "call-1",
+            }
+        ],
+    )
+
+    result = await node(
+        State(messages=[message]), {"configurable": {"direct_tool_responses": True}}
+    )
+
+    tool_message, response = result["messages"]
+    assert set(json.loads(tool_message.content)) == {
+        "change_id",
+        "change_fee",
+        "change_date",
+        "status",
+    }
+    assert "- Changes: departure date 2030-03-11" in response.content
+
+
+@pytest.mark.asyncio
+async def test_calls_of_a_step_run_concurrently_within_the_bound() -> None:
+    async def slow_lookup(code: str) -> str:
+        """Look up a code slowly."""
+        await asyncio.sleep(0.2)
+        return code
+
+    node = TravelToolNode([slow_lookup])
+    message = AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "slow_lookup", "args": {"code": str(i)}, "id": f"call-{i}"}
+            for i in range(3)
+        ],
+    )
+
+    started = time.perf_counter()
+    result = await node(
+        State(messages=[message]), {"configurable": {"max_concurrent_tool_calls": 3}}
+    )
+    assert time.perf_counter() - started < 0.35
+    assert [m.content for m in result["messages"]] == ["0", "1", "2"]
+
+    started = time.perf_counter()
+    await node(
+        State(messages=[message]), {"configurable": {"max_concurrent_tool_calls": 1}}
+    )
+    assert time.perf_counter() - started >= 0.6
+
+
+@pytest.mark.asyncio
+async def test_outputs_follow_the_order_of_the_calls() -> None:
+    async def lookup(code: str) -> str:
+        """Look up a code."""
+        return code
+
+    node = TravelToolNode([lookup])
+    message = AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "lookup", "args": {"code": "a"}, "id": "call-1"},
+            {"name": "lookup", "args": {}, "id": "call-2"},
+            {"name": "lookup", "args": {"code": "c"}, "id": "call-3"},
+        ],
+    )
+
+    result = await node(State(messages=[message]), {})
+
+    assert [m.tool_call_id for m in result["messages"]] == [
+        "call-1",
+        "call-2",
+        "call-3",
+    ]
+    assert result["messages"][1].status == "error"
@@ -0,0 +1,62 @@
+"""Test the Travel Master graph around the supervisor."""
+
+import logging
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from travel_master.history import message_owners
+from travel_master.search_cache import search_cache
+from travel_master.simulation import SIMULATED_CONFIGURABLE, simulated_search
+from travel_master.travel_master import graph
+
+
+@pytest.mark.asyncio
+async def test_handoffs_write_only_known_channels(caplog, monkeypatch) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    with caplog.at_level(logging.WARNING, logger="langgraph"):
+        result = await graph.ainvoke(
+            {
+                "messages": [
+                    HumanMessage(
+                        content="Find flights from Paris to Rome on 2030-05-01"
+                    )
+                ]
+            },
+            {"configurable": SIMULATED_CONFIGURABLE},
+        )
+
+    assert [m.name for m in result["messages"] if m.type == "tool"] == [
+        "transfer_to_flight_assistant",
+        "transfer_back_to_supervisor",
+    ]
+    assert "unknown channel" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_handing_off_to_several_assistants_keeps_the_handoff_in_the_history(
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(search_cache, "backend", simulated_search)
+    result = await graph.ainvoke(
+        {
+            "messages": [
+                HumanMessage(
+                    content="Find flights from Paris to Rome on 2030-05-01 and a hotel "
+                    "in Rome from 2030-05-01 to 2030-05-05"
+                )
+            ]
+        },
+        {"configurable": {**SIMULATED_CONFIGURABLE, "parallel_tool_calls": True}},
+    )
+
+    messages = result["messages"]
+    call = next(m for m in messages if m.type == "ai" and m.tool_calls)
+    assert [c["name"] for c in call.tool_calls] == ["transfer_to_assistants"]
+    handoff = messages[messages.index(call) + 1]
+    assert handoff.type == "tool" and handoff.name == "transfer_to_assistants"
+    assert handoff.tool_call_id == call.tool_calls[0]["id"]
+
+    owners = message_owners(messages)
+    assert owners[messages.index(call)] == owners[messages.index(handoff)] == "handoff"
+    assert {"flight_assistant", "accommodation_assistant"} <= set(owners)
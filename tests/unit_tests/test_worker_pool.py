@@ -0,0 +1,234 @@
+"""Test the worker pool routing and the shared cache tier."""
+
+import asyncio
+import queue
+import time
+from typing import Any, Dict, List, Set
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from travel_master.response_cache import SemanticResponseCache
+from travel_master.search_cache import SearchCache
+from travel_master.shared_cache import SharedCache
+from travel_master.worker_pool import WorkerDied, WorkerPool, _serve, shard_for
+
+
+class EchoGraph:
+    """A stand-in graph that reports how many turns its conversation has seen."""
+
+    async def ainvoke(
+        self, state: Dict[str, Any], config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        turns = sum(1 for m in state["messages"] if m.type == "human")
+        reply = AIMessage(content=f"turn {turns}: {state['messages'][-1].content}")
+        return {"messages": [*state["messages"], reply], "itinerary": {}}
+
+
+class StuckGraph:
+    """A stand-in graph that never finishes a turn."""
+
+    async def ainvoke(
+        self, state: Dict[str, Any], config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        await asyncio.sleep(3600)
+        raise AssertionError("unreachable")
+
+
+class SlowEchoGraph(EchoGraph):
+    """An echo graph that takes a while per turn, and forever for the message "stuck"."""
+
+    async def ainvoke(
+        self, state: Dict[str, Any], config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        await asyncio.sleep(3600 if state["messages"][-1].content == "stuck" else 0.05)
+        return await super().ainvoke(state, config)
+
+
+class GatedGraph(EchoGraph):
+    """An echo graph whose turns wait until their message is released, noting overlapping turns of a thread."""
+
+    def __init__(self) -> None:
+        self.gates: Dict[str, asyncio.Event] = {}
+        self.running: Set[str] = set()
+        self.overlaps: List[str] = []
+
+    def release(self, *texts: str) -> None:
+        for text in texts:
+            self.gates.setdefault(text, asyncio.Event()).set()
+
+    async def ainvoke(
+        self, state: Dict[str, Any], config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self.running:
+            self.overlaps.append(thread_id)
+        self.running.add(thread_id)
+        text = state["messages"][-1].content
+        await self.gates.setdefault(text, asyncio.Event()).wait()
+        self.running.discard(thread_id)
+        return await super().ainvoke(state, config)
+
+
+echo_graph = EchoGraph()
+stuck_graph = StuckGraph()
+slow_echo_graph = SlowEchoGraph()
+gated_graph = GatedGraph()
+
+
+def test_shard_is_stable_and_in_range() -> None:
+    shards = [shard_for(f"thread-{i}", 4) for i in range(100)]
+    assert shards == [shard_for(f"thread-{i}", 4) for i in range(100)]
+    assert set(shards) == {0, 1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_search_results_are_shared_between_processes(tmp_path) -> None:
+    calls = []
+
+    async def backend(query: str, max_results: int) -> Any:
+        calls.append(query)
+        return [{"content": query}]
+
+    path = str(tmp_path / "shared.sqlite")
+    first, second = SearchCache(backend), SearchCache(backend)
+    first.shared, second.shared = SharedCache(path), SharedCache(path)
+
+    await first.search("flights paris rome", 5, ttl=60)
+    assert await second.search("Flights  Paris Rome", 5, ttl=60) == [
+        {"content": "flights paris rome"}
+    ]
+    assert calls == ["flights paris rome"]
+    assert second.counters.get("shared_hits") >= 1
+
+
+def test_responses_are_shared_between_processes(tmp_path) -> None:
+    path = str(tmp_path / "shared.sqlite")
+    first, second = SemanticResponseCache(), SemanticResponseCache()
+    first.shared, second.shared = SharedCache(path), SharedCache(path)
+
+    first.store(
+        "supervisor",
+        "What is your cancellation policy?",
+        "Free within 24h.",
+        None,
+        ttl=60,
+        max_entries=10,
+    )
+
+    found = second.lookup(
+        "supervisor", "what is your cancellation policy", threshold=0.9
+    )
+    assert found is not None and found[0].content == "Free within 24h."
+
+    # Responses pulled from the shared tier are bounded like local ones
+    for i in range(5):
+        first.store(
+            "supervisor",
+            f"question number {i}",
+            f"answer {i}",
+            None,
+            ttl=60,
+            max_entries=10,
+        )
+    second.lookup("supervisor", "anything", threshold=0.9, max_entries=3)
+    assert len(second._entries) == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_routes_threads_to_sticky_workers() -> None:
+    async with WorkerPool(
+        2, graph=f"{__name__}:echo_graph", share_caches=False
+    ) as pool:
+        first = await pool.submit("thread-a", "hello")
+        second = await pool.submit("thread-a", "again")
+
+    assert first["response"] == "turn 1: hello"
+    assert second["response"] == "turn 2: again"
+    assert first["worker"] == second["worker"] == shard_for("thread-a", 2)
+
+
+@pytest.mark.asyncio
+async def test_evicted_threads_are_restored_from_disk() -> None:
+    async with WorkerPool(
+        1, graph=f"{__name__}:echo_graph", share_caches=False, max_threads_per_worker=1
+    ) as pool:
+        await pool.submit("thread-a", "hello")
+        await pool.submit("thread-b", "hello")
+        again = await pool.submit("thread-a", "again")
+
+    assert again["response"] == "turn 2: again"
+
+
+@pytest.mark.asyncio
+async def test_turns_of_a_dead_worker_fail() -> None:
+    async with WorkerPool(
+        1, graph=f"{__name__}:stuck_graph", share_caches=False
+    ) as pool:
+        turn = asyncio.ensure_future(pool.submit("thread-a", "hello"))
+        await asyncio.sleep(0.5)
+        pool._processes[0].kill()
+
+        with pytest.raises(WorkerDied):
+            await asyncio.wait_for(turn, 10)
+        with pytest.raises(WorkerDied):
+            await pool.submit("thread-a", "hello")
+
+
+@pytest.mark.asyncio
+async def test_turns_of_a_dead_worker_fail_while_others_keep_replying() -> None:
+    threads = [f"thread-{i}" for i in range(20)]
+    dying = next(t for t in threads if shard_for(t, 2) == 0)
+    busy = next(t for t in threads if shard_for(t, 2) == 1)
+    async with WorkerPool(
+        2, graph=f"{__name__}:slow_echo_graph", share_caches=False
+    ) as pool:
+        # Both workers are up before the queue of replies is kept busy
+        await asyncio.gather(pool.submit(dying, "hello"), pool.submit(busy, "hello"))
+        turn = asyncio.ensure_future(pool.submit(dying, "stuck"))
+        await pool.submit(busy, "hello")
+        pool._processes[0].kill()
+
+        # Replies keep coming in more often than the liveness interval
+        deadline = time.monotonic() + 5
+        while not turn.done() and time.monotonic() < deadline:
+            await pool.submit(busy, "hello")
+        assert turn.done()
+        with pytest.raises(WorkerDied):
+            await turn
+
+
+@pytest.mark.asyncio
+async def test_a_thread_evicted_with_a_turn_waiting_keeps_its_lock() -> None:
+    requests: "queue.Queue[Any]" = queue.Queue()
+    responses: "queue.Queue[Any]" = queue.Queue()
+    gated_graph.running.clear()
+    gated_graph.overlaps.clear()
+    serving = asyncio.ensure_future(
+        _serve(
+            0, f"{__name__}:gated_graph", None, {}, 1, None, None, requests, responses
+        )
+    )
+
+    async def send(request_id: int, thread_id: str, text: str) -> None:
+        requests.put((request_id, thread_id, text, {}, None))
+        await asyncio.sleep(0.2)
+
+    await send(0, "thread-a", "a1")
+    await send(1, "thread-b", "b1")
+    # Waits for a1; b1 finishing right after a1 evicts thread-a from memory
+    await send(2, "thread-a", "a2")
+    gated_graph.release("a1", "b1")
+    await asyncio.sleep(0.2)
+    await send(3, "thread-a", "a3")
+    gated_graph.release("a2", "a3")
+    requests.put(None)
+    await asyncio.wait_for(serving, 10)
+
+    assert gated_graph.overlaps == []
+    replies = dict(responses.get_nowait() for _ in range(4))
+    assert [replies[i]["response"] for i in (0, 2, 3)] == [
+        "turn 1: a1",
+        "turn 2: a2",
+        "turn 3: a3",
+    ]